@@ -0,0 +1,243 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+
+from .health import percentile
+
+
+class Overloaded(Exception):
+    """排队已满或等待超时，调用方应返回 429/503 并附带 Retry-After"""
+
+    def __init__(self, status_code: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class AdmissionController:
+    """
+    LLM 调用准入控制：全局并发上限 + 每个上游的并发上限 + 有界等待队列
+
+    - 并发已满时请求进入等待队列，最多等待 queue_timeout 秒，超时返回 503
+    - 等待队列已满时立即返回 429，不再堆积
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 64,
+        per_upstream: int = 32,
+        max_queue: int = 256,
+        queue_timeout: float = 10.0,
+        window: int = 200
+    ):
+        """
+        初始化准入控制
+
+        Args:
+            max_concurrent: 全局同时进行的 LLM 调用上限
+            per_upstream: 单个上游（base_url）同时进行的调用上限
+            max_queue: 等待队列长度上限
+            queue_timeout: 排队最长等待秒数
+            window: 统计等待/处理耗时分位数的滚动窗口大小
+        """
+        self.max_concurrent = max_concurrent
+        self.per_upstream = per_upstream
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._global: Optional[asyncio.Semaphore] = None
+        self._upstreams: Dict[str, asyncio.Semaphore] = {}
+
+        self.active = 0
+        self.waiting = 0
+        # 统计计数
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self.max_waiting = 0
+        self.wait_times: Deque[float] = deque(maxlen=window)
+        self.service_times: Deque[float] = deque(maxlen=window)
+
+    def _semaphores(self, upstream: str) -> Tuple[asyncio.Semaphore, asyncio.Semaphore]:
+        # 信号量在首次使用时创建，绑定到服务运行的事件循环
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.max_concurrent)
+        sem = self._upstreams.get(upstream)
+        if sem is None:
+            sem = self._upstreams[upstream] = asyncio.Semaphore(self.per_upstream)
+        return self._global, sem
+
+    @property
+    def concurrency(self) -> int:
+        """实际可同时进行的调用数：同时受全局与单个上游的并发上限约束（目前只有 Kimi 一个上游）"""
+        return max(1, min(self.max_concurrent, self.per_upstream))
+
+    def retry_after(self) -> int:
+        """按最近的平均处理耗时和队列长度估算客户端应等待的秒数"""
+        avg = sum(self.service_times) / len(self.service_times) if self.service_times else 1.0
+        return max(1, math.ceil(avg * (self.waiting + 1) / self.concurrency))
+
+    def has_capacity(self) -> bool:
+        """等待队列是否还能接收新请求（不计数、不占用名额）"""
+        # 正在调用 + 排队中的请求数达到“实际并发 + 队列长度”时不再接收
+        return self.active + self.waiting < self.concurrency + self.max_queue
+
+    def check_capacity(self):
+        """
+        快速检查等待队列是否已满（不占用名额），用于在开始流式响应前直接返回 429
+
+        Raises:
+            Overloaded: 队列已满
+        """
+        if not self.has_capacity():
+            self.rejected_full += 1
+            raise Overloaded(429, self.retry_after(), "服务繁忙，请稍后重试")
+
+    @staticmethod
+    async def _acquire_slots(global_sem: asyncio.Semaphore, upstream_sem: asyncio.Semaphore):
+        await global_sem.acquire()
+        try:
+            await upstream_sem.acquire()
+        except BaseException:
+            global_sem.release()
+            raise
+
+    @staticmethod
+    def _abandon(task: asyncio.Task, global_sem: asyncio.Semaphore, upstream_sem: asyncio.Semaphore):
+        """放弃排队：取消获取任务；若取消时恰好已获取到名额，则归还"""
+        def cleanup(done: asyncio.Task):
+            if not done.cancelled() and done.exception() is None:
+                upstream_sem.release()
+                global_sem.release()
+
+        task.cancel()
+        task.add_done_callback(cleanup)
+
+    @asynccontextmanager
+    async def admit(self, upstream: str = "default") -> AsyncIterator[None]:
+        """
+        获取一次 LLM 调用的名额（async with），退出时归还
+
+        Args:
+            upstream: 上游标识（通常为 base_url 的 host）
+
+        Raises:
+            Overloaded: 队列已满（429）或排队超时（503）
+        """
+        global_sem, upstream_sem = self._semaphores(upstream)
+        self.check_capacity()
+
+        t0 = time.perf_counter()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        task = asyncio.ensure_future(self._acquire_slots(global_sem, upstream_sem))
+        try:
+            done, _ = await asyncio.wait({task}, timeout=self.queue_timeout)
+        except BaseException:
+            self._abandon(task, global_sem, upstream_sem)
+            raise
+        finally:
+            self.waiting -= 1
+        if not done:
+            self._abandon(task, global_sem, upstream_sem)
+            self.rejected_timeout += 1
+            raise Overloaded(503, self.retry_after(), "排队超时，请稍后重试")
+        task.result()
+
+        started = time.perf_counter()
+        self.wait_times.append(started - t0)
+        self.admitted += 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.service_times.append(time.perf_counter() - started)
+            upstream_sem.release()
+            global_sem.release()
+
+    def stats(self) -> Dict:
+        """准入统计：当前并发/排队深度、拒绝次数、排队等待耗时分位数"""
+        waits = [w * 1000 for w in self.wait_times]
+        return {
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "admitted": self.admitted,
+            "rejected_full": self.rejected_full,
+            "rejected_timeout": self.rejected_timeout,
+            "wait_p50_ms": round(percentile(waits, 50), 1) if waits else None,
+            "wait_p95_ms": round(percentile(waits, 95), 1) if waits else None,
+            "limits": {
+                "concurrency": self.concurrency,
+                "max_concurrent": self.max_concurrent,
+                "per_upstream": self.per_upstream,
+                "max_queue": self.max_queue,
+                "queue_timeout": self.queue_timeout
+            }
+        }
+
+
+class SessionLocks:
+    """
+    按会话串行化对话轮次：同一 session_id 的请求按到达顺序依次处理，
+    后一轮基于前一轮写入后的会话状态，不会出现“后写覆盖先写”
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+        self.contended = 0
+
+    @asynccontextmanager
+    async def hold(self, session_id: str) -> AsyncIterator[None]:
+        """
+        持有会话锁（async with）；没有等待者时自动移除，避免锁字典无限增长
+
+        Args:
+            session_id: 会话ID
+        """
+        lock, users = self._locks.get(session_id, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        elif lock.locked():
+            self.contended += 1
+        self._locks[session_id] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[session_id]
+            if users <= 1:
+                del self._locks[session_id]
+            else:
+                self._locks[session_id] = (lock, users - 1)
+
+    def stats(self) -> Dict:
+        return {"locked_sessions": len(self._locks), "contended": self.contended}
+
+
+def _create_controller_from_env() -> AdmissionController:
+    """
+    根据环境变量创建准入控制
+
+    环境变量：
+        LLM_MAX_CONCURRENCY: 全局并发上限（默认 64）
+        LLM_UPSTREAM_CONCURRENCY: 单个上游并发上限（默认 32）
+        ADMISSION_QUEUE_SIZE: 等待队列长度上限（默认 256）
+        ADMISSION_QUEUE_TIMEOUT: 排队最长等待秒数（默认 10）
+    """
+    return AdmissionController(
+        max_concurrent=int(os.getenv("LLM_MAX_CONCURRENCY", "64")),
+        per_upstream=int(os.getenv("LLM_UPSTREAM_CONCURRENCY", "32")),
+        max_queue=int(os.getenv("ADMISSION_QUEUE_SIZE", "256")),
+        queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+    )
+
+
+# 全局准入控制与会话锁
+admission = _create_controller_from_env()
+session_locks = SessionLocks()
@@ -1,15 +1,40 @@
-from agno.agent import Agent, RunOutput, RunOutputEvent, RunEvent
-from agno.models.deepseek import DeepSeek
+import os
 
-from tools.attraction_select import AmapTools
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+DEEPSEEK_MODEL = "deepseek-chat"
 
-agent = Agent(
-    model=DeepSeek(id="deepseek-chat"),
-    tools=[AmapTools(key="1f13f85e98b8e75644d9681cb2bcc64b")],
-    instructions="XXX",
-    markdown=True
-)
 
-response: RunOutput = agent.run("Trending startups and products.")
-# Print the response
-print(response.content)
+def create_attraction_agent(amap_key: str = None):
+    """
+    创建景点选择 Agent
+
+    agno 与工具只在这里导入，导入本模块不会加载 SDK、也不会发起任何请求。
+
+    Args:
+        amap_key: 高德 Web 服务 Key，默认读取环境变量 AMAP_KEY
+
+    Returns:
+        agno Agent 实例
+    """
+    from agno.agent import Agent
+    from agno.models.deepseek import DeepSeek
+
+    from ..llm_clients import llm_clients
+    from ..tools.attraction_select import AmapTools
+
+    amap_key = amap_key or os.getenv("AMAP_KEY")
+    if not amap_key:
+        raise ValueError("未配置高德 Key，请设置 AMAP_KEY")
+    return Agent(
+        # 复用注册表中的连接池，与其它 Agent 共享 keep-alive 连接
+        model=DeepSeek(id=DEEPSEEK_MODEL, http_client=llm_clients.get(DEEPSEEK_BASE_URL, DEEPSEEK_MODEL).http_client),
+        tools=[AmapTools(key=amap_key)],
+        instructions="XXX",
+        markdown=True
+    )
+
+
+if __name__ == "__main__":
+    # python -m backend.agents.attraction_select_agent
+    response = create_attraction_agent().run("Trending startups and products.")
+    print(response.content)
@@ -0,0 +1,179 @@
+from typing import TYPE_CHECKING, Any, List, Optional, Sequence, Tuple
+
+from ..resilience import ResilientCaller
+from ..single_flight import llm_flight, prompt_key
+from .json_utils import extract_json
+
+if TYPE_CHECKING:  # langchain 只在首次调用时导入，不拖慢服务启动
+    from langchain_core.language_models import BaseChatModel
+    from langchain_core.messages import BaseMessage
+
+NORMALIZE_SYSTEM_PROMPT = (
+    "你是一名地点标准化助手。任务：将用户给出的中文目的地名称补全为更完整、常用、官方的称谓，"
+    "尽量包含城市和区县信息（如能确定），但不要编造不存在的信息。"
+    "每次补全时，只能根据本次输入的 name 字段独立判断，不要参考历史、会话、已确认目的地或任何缓存。"
+    "请只返回 JSON，字段：suggestion (字符串，最佳补全)、alternatives (字符串数组，最多5条不同的合理补全，不包含suggestion)；"
+    "如果无法确定更完整名称，请将 suggestion 设为原始输入。"
+)
+
+NORMALIZE_BATCH_SYSTEM_PROMPT = (
+    "你是一名地点标准化助手。任务：将用户给出的每个中文目的地名称分别补全为更完整、常用、官方的称谓，"
+    "尽量包含城市和区县信息（如能确定），但不要编造不存在的信息。"
+    "输入为编号列表，每条只能根据该条的名称与城市提示独立判断，不要参考其他条目、历史或任何缓存。"
+    "请只返回 JSON：{\"results\": [{\"id\": 编号, \"suggestion\": 最佳补全, \"alternatives\": [最多5条不同的合理补全，不包含suggestion]}]}，"
+    "每个编号对应一条结果；如果无法确定更完整名称，请将该条的 suggestion 设为原始输入。"
+)
+
+MAX_ALTERNATIVES = 5
+
+
+def build_normalize_messages(name: str, city_hint: Optional[str] = None) -> List["BaseMessage"]:
+    """
+    构建地名补全的提示消息
+
+    Args:
+        name: 原始名称
+        city_hint: 城市提示
+
+    Returns:
+        系统消息 + 用户消息
+    """
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    human = (
+        f"原始名称: {name}\n"
+        f"城市提示: {city_hint or '无'}\n"
+        "请输出JSON。示例：{\"suggestion\": \"上海市黄浦区外滩\", \"alternatives\":[\"上海外滩\", \"上海黄浦外滩\"]}"
+    )
+    return [SystemMessage(content=NORMALIZE_SYSTEM_PROMPT), HumanMessage(content=human)]
+
+
+def parse_normalize_response(content: str) -> Optional[Tuple[str, List[str]]]:
+    """
+    解析模型返回的补全结果（容错提取 JSON）
+
+    Args:
+        content: 模型返回的文本
+
+    Returns:
+        (建议名称, 候选列表)；无法解析出 JSON 或缺少有效的 suggestion 时为 None
+    """
+    return _parse_item(extract_json(content))
+
+
+def _parse_item(data: Any) -> Optional[Tuple[str, List[str]]]:
+    """从一条补全结果（字典）中取出建议名称与候选列表；不是字典或 suggestion 缺失/类型不对时返回 None"""
+    if not isinstance(data, dict):
+        return None
+    suggestion = data.get("suggestion")
+    if not isinstance(suggestion, str) or not suggestion.strip():
+        return None
+    alternatives: List[str] = []
+    alts = data.get("alternatives", [])
+    if isinstance(alts, list):
+        alternatives = [str(a).strip() for a in alts if str(a).strip()]
+
+    return suggestion.strip(), alternatives[:MAX_ALTERNATIVES]
+
+
+async def anormalize_destination(
+    llm: "BaseChatModel",
+    name: str,
+    city_hint: Optional[str] = None,
+    resilience: Optional[ResilientCaller] = None
+) -> Optional[Tuple[str, List[str]]]:
+    """
+    使用 LLM 对目的地名称进行补全/规范化
+
+    Args:
+        llm: 聊天模型
+        name: 原始名称
+        city_hint: 城市提示
+        resilience: 限速/重试/熔断层（可选）
+
+    Returns:
+        (建议名称, 候选列表)；模型输出无法解析时为 None（调用方回退为原始名称，且不应缓存）
+    """
+    messages = build_normalize_messages(name, city_hint)
+    # 同一目的地的并发请求只调用一次模型
+    scope = f"{getattr(llm, 'model_name', '')}:normalize"
+    if resilience is not None:
+        call = lambda: resilience.call(lambda: llm.ainvoke(messages))
+    else:
+        call = lambda: llm.ainvoke(messages)
+    res, _ = await llm_flight.run(prompt_key(scope, messages), call)
+    content = getattr(res, "content", "") or ""
+    return parse_normalize_response(content)
+
+
+def build_batch_normalize_messages(items: Sequence[Tuple[str, Optional[str]]]) -> List["BaseMessage"]:
+    """
+    构建批量地名补全的提示消息（多个名称放在一次请求中）
+
+    Args:
+        items: [(原始名称, 城市提示)]，编号从 1 开始
+
+    Returns:
+        系统消息 + 用户消息
+    """
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    lines = [f"{i}. 原始名称: {name} | 城市提示: {city_hint or '无'}" for i, (name, city_hint) in enumerate(items, 1)]
+    human = "\n".join(lines) + "\n请输出JSON。"
+    return [SystemMessage(content=NORMALIZE_BATCH_SYSTEM_PROMPT), HumanMessage(content=human)]
+
+
+def parse_batch_normalize_response(
+    items: Sequence[Tuple[str, Optional[str]]],
+    content: str
+) -> List[Optional[Tuple[str, List[str]]]]:
+    """
+    解析批量补全结果，按编号对应回各条输入
+
+    Args:
+        items: 与请求相同顺序的 [(原始名称, 城市提示)]
+        content: 模型返回的文本
+
+    Returns:
+        与 items 等长的列表；模型漏掉、编号无效或内容无法解析的条目为 None
+    """
+    data = extract_json(content)
+    entries = data.get("results") if isinstance(data, dict) else None
+    results: List[Optional[Tuple[str, List[str]]]] = [None] * len(items)
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            index = int(entry.get("id")) - 1
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < len(items) and results[index] is None:
+            results[index] = _parse_item(entry)
+    return results
+
+
+async def anormalize_destinations(
+    llm: "BaseChatModel",
+    items: Sequence[Tuple[str, Optional[str]]],
+    resilience: Optional[ResilientCaller] = None
+) -> List[Optional[Tuple[str, List[str]]]]:
+    """
+    一次 LLM 调用补全多个目的地名称（调用方负责分块，每块不宜过大）
+
+    Args:
+        llm: 聊天模型
+        items: [(原始名称, 城市提示)]
+        resilience: 限速/重试/熔断层（可选）
+
+    Returns:
+        与 items 等长的 (建议名称, 候选列表)；模型漏掉或无法解析的条目为 None
+    """
+    messages = build_batch_normalize_messages(items)
+    scope = f"{getattr(llm, 'model_name', '')}:normalize_batch"
+    if resilience is not None:
+        call = lambda: resilience.call(lambda: llm.ainvoke(messages))
+    else:
+        call = lambda: llm.ainvoke(messages)
+    res, _ = await llm_flight.run(prompt_key(scope, messages), call)
+    content = getattr(res, "content", "") or ""
+    return parse_batch_normalize_response(items, content)
@@ -0,0 +1,32 @@
+import json
+import re
+from typing import Any, Optional
+
+
+def extract_json(content: str) -> Optional[Any]:
+    """
+    从模型输出中容错提取 JSON
+
+    先直接解析；失败时从文本中提取第一个花括号 JSON 片段（兼容 ```json 代码块和前后说明文字）。
+
+    Args:
+        content: 模型返回的文本
+
+    Returns:
+        解析得到的对象；无法解析时返回 None
+    """
+    if not content:
+        return None
+    try:
+        # 直接解析
+        return json.loads(content)
+    except Exception:
+        pass
+    # 从文本中提取第一个花括号JSON片段
+    try:
+        m = re.search(r"\{[\s\S]*\}", content)
+        if m:
+            return json.loads(m.group(0))
+    except Exception:
+        pass
+    return None
@@ -0,0 +1,439 @@
+import re
+from datetime import date, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from ..base import TravelInfo
+
+# ---- 数字解析 ----
+
+_CN_DIGITS = {"零": 0, "〇": 0, "一": 1, "二": 2, "两": 2, "俩": 2, "三": 3, "四": 4,
+              "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+_CN_UNITS = {"十": 10, "百": 100, "千": 1000}
+
+# 阿拉伯数字（可带小数）或中文数字
+NUM = r"(?:\d+(?:\.\d+)?|[零〇一二两三四五六七八九十百千万]+)"
+# 金额单位
+_AMOUNT_UNITS = {"万": 10000, "w": 10000, "W": 10000, "千": 1000, "k": 1000, "K": 1000}
+
+
+def parse_cn_number(text: str) -> Optional[float]:
+    """
+    解析阿拉伯数字、中文数字及混合写法
+
+    支持：5000、1.5、十二、二十五、一百二十、两千五（2500）、一万二（12000）、一千零五（1005）、3千、1.5万
+
+    两个数字之间没有单位（两三、七八、三五千）表示的是范围而不是一个数，返回 None 交给 LLM。
+
+    Args:
+        text: 数字文本
+
+    Returns:
+        数值；无法解析或是范围写法时返回 None
+    """
+    text = text.strip()
+    if not text:
+        return None
+    if re.fullmatch(r"\d+(?:\.\d+)?", text):
+        return float(text)
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)([十百千万])", text)
+    if m:
+        unit = 10000 if m.group(2) == "万" else _CN_UNITS[m.group(2)]
+        return float(m.group(1)) * unit
+
+    total = 0
+    section = 0
+    number = None
+    last_unit = 1
+    # 末位数字是否紧跟在单位后（中间没有“零”），只有这种情况才按省略单位展开
+    after_unit = False
+    zero = False
+    for ch in text:
+        if ch in _CN_DIGITS:
+            if number is not None:
+                # 相邻两个数字之间没有单位：两三、五六 是范围
+                return None
+            if _CN_DIGITS[ch] == 0:
+                if zero:
+                    return None
+                zero = True
+                after_unit = False
+                continue
+            number = _CN_DIGITS[ch]
+            after_unit = after_unit and not zero
+        elif ch in _CN_UNITS:
+            unit = _CN_UNITS[ch]
+            section += (number if number is not None else 1) * unit
+            number = None
+            last_unit = unit
+            after_unit = True
+            zero = False
+        elif ch == "万":
+            section += number or 0
+            total += (section or 1) * 10000
+            section = 0
+            number = None
+            last_unit = 10000
+            after_unit = True
+            zero = False
+        else:
+            return None
+    if number is not None:
+        # 口语省略末位单位：两千五 = 2500，一万二 = 12000；一千零五 = 1005 不展开
+        if after_unit and last_unit >= 100:
+            number = number * (last_unit // 10)
+        section += number
+    return float(total + section)
+
+
+# ---- 抽取结果 ----
+
+class RuleExtraction(NamedTuple):
+    """规则抽取结果"""
+    info: Dict              # ExtractedInfo 字段 -> 值（仅包含抽取到的字段）
+    confident: bool         # 整条消息都被规则解释，可跳过 LLM
+    leftover: str           # 未被规则解释的剩余文本
+
+
+# ---- 人数 ----
+
+_PEOPLE_PATTERNS: List[Tuple[re.Pattern, Optional[int]]] = [
+    (re.compile(rf"一家({NUM})口"), None),
+    (re.compile(r"(?:我们|咱们|我|咱)俩"), 2),
+    (re.compile(r"(?:我)?(?:自己)?(?:一个人|独自)"), 1),
+    (re.compile(rf"({NUM})\s*(?:个人|口人|位|名|人)(?![均民])"), None),
+]
+_PARTY_MEMBER = re.compile(rf"({NUM})\s*(?:个|位|名)?\s*(?:大人|成人|小孩|孩子|儿童|老人)")
+
+
+def _extract_people(text: str, spans: List[Tuple[int, int]]) -> Optional[int]:
+    members = list(_PARTY_MEMBER.finditer(text))
+    if members:
+        total = 0
+        for m in members:
+            n = parse_cn_number(m.group(1))
+            if n is None:
+                return None
+            total += int(n)
+            spans.append(m.span())
+        return total if 0 < total <= 100 else None
+    for pattern, fixed in _PEOPLE_PATTERNS:
+        m = pattern.search(text)
+        if not m:
+            continue
+        n = fixed if fixed is not None else parse_cn_number(m.group(1))
+        if n is None or not 0 < n <= 100 or n != int(n):
+            continue
+        spans.append(m.span())
+        return int(n)
+    return None
+
+
+# ---- 预算 ----
+
+_BUDGET_KEYWORD = re.compile(
+    rf"(?:预算|经费|花费|费用|总共|一共|总价)[^\d零〇一二两三四五六七八九十百千万]{{0,6}}({NUM})\s*([万千kKwW])?\s*(?:元|块钱|块|rmb|RMB)?"
+)
+_BUDGET_CURRENCY = re.compile(rf"({NUM})\s*([万千kKwW])?\s*(?:元|块钱|块|rmb|RMB)")
+_BUDGET_PER_PERSON = re.compile(rf"人均\s*({NUM})\s*([万千kKwW])?\s*(?:元|块钱|块)?")
+
+
+def _amount(number: str, unit: Optional[str]) -> Optional[float]:
+    n = parse_cn_number(number)
+    if n is None:
+        return None
+    return n * _AMOUNT_UNITS.get(unit or "", 1)
+
+
+def _extract_budget(text: str, spans: List[Tuple[int, int]], num_people: Optional[int]) -> Optional[float]:
+    m = _BUDGET_PER_PERSON.search(text)
+    if m:
+        if not num_people:
+            return None
+        value = _amount(m.group(1), m.group(2))
+        if value is not None and value >= 50:
+            spans.append(m.span())
+            return value * num_people
+        return None
+    for pattern in (_BUDGET_KEYWORD, _BUDGET_CURRENCY):
+        m = pattern.search(text)
+        if m:
+            value = _amount(m.group(1), m.group(2))
+            if value is not None and value >= 50:
+                spans.append(m.span())
+                return value
+    return None
+
+
+# ---- 日期 ----
+
+_SMALL = r"(?:\d{1,2}|[一二三四五六七八九十]{1,3})"
+_FULL_DATE = r"(\d{4})\s*[-/.年]\s*(\d{1,2})\s*[-/.月]\s*(\d{1,2})\s*[日号]?"
+_MONTH_DAY = rf"({_SMALL})\s*月\s*({_SMALL})\s*[日号]?"
+_DAY_ONLY = rf"({_SMALL})\s*[日号]"
+_RANGE_SEP = r"\s*(?:到|至|-|~|～|—|－)\s*"
+
+_RANGE_PATTERNS = [
+    re.compile(_FULL_DATE + _RANGE_SEP + _FULL_DATE),
+    re.compile(_MONTH_DAY + _RANGE_SEP + _MONTH_DAY),
+    re.compile(_MONTH_DAY + _RANGE_SEP + _DAY_ONLY),
+    re.compile(r"(\d{1,2})\.(\d{1,2})" + _RANGE_SEP + r"(\d{1,2})\.(\d{1,2})"),
+]
+_SINGLE_PATTERNS = [re.compile(_FULL_DATE), re.compile(_MONTH_DAY)]
+_END_CUE = re.compile(r"回来|返回|返程|结束|回程")
+_DURATION = re.compile(rf"(?:玩|待|住|呆|去)?\s*({NUM})\s*天(?:\s*({NUM})\s*[晚夜])?")
+
+
+def _to_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _infer_date(month: int, day: int, today: date) -> Optional[date]:
+    """只有月日时推断年份：已过去的日期视为明年"""
+    d = _to_date(today.year, month, day)
+    if d is not None and d < today:
+        d = _to_date(today.year + 1, month, day)
+    return d
+
+
+def _num(text: str) -> Optional[int]:
+    n = parse_cn_number(text)
+    return int(n) if n is not None and n == int(n) else None
+
+
+def _extract_dates(
+    text: str,
+    spans: List[Tuple[int, int]],
+    current: TravelInfo,
+    today: date
+) -> Dict[str, str]:
+    found: Dict[str, str] = {}
+
+    for index, pattern in enumerate(_RANGE_PATTERNS):
+        m = pattern.search(text)
+        if not m:
+            continue
+        g = m.groups()
+        if index == 0:
+            start = _to_date(int(g[0]), int(g[1]), int(g[2]))
+            end = _to_date(int(g[3]), int(g[4]), int(g[5]))
+        else:
+            values = [_num(x) for x in g]
+            if None in values:
+                continue
+            if index == 2:
+                values = [values[0], values[1], values[0], values[2]]
+            start = _infer_date(values[0], values[1], today)
+            end = _to_date(start.year, values[2], values[3]) if start else None
+            if start and end and end < start:
+                end = _to_date(start.year + 1, values[2], values[3])
+        if start and end and start <= end:
+            spans.append(m.span())
+            return {"start_date": start.isoformat(), "end_date": end.isoformat()}
+
+    single: Optional[date] = None
+    for index, pattern in enumerate(_SINGLE_PATTERNS):
+        m = pattern.search(text)
+        if not m:
+            continue
+        g = m.groups()
+        if index == 0:
+            single = _to_date(int(g[0]), int(g[1]), int(g[2]))
+        else:
+            month, day = _num(g[0]), _num(g[1])
+            single = _infer_date(month, day, today) if month and day else None
+        if single:
+            spans.append(m.span())
+            break
+
+    if single:
+        is_end = bool(_END_CUE.search(text)) or (bool(current.start_date) and not current.end_date)
+        found["end_date" if is_end else "start_date"] = single.isoformat()
+
+    # 行程天数：已知开始日期时推算结束日期，如“玩5天”“5天4晚”
+    m = _DURATION.search(text)
+    if m and "end_date" not in found:
+        days = _num(m.group(1))
+        start_text = found.get("start_date") or current.start_date
+        if days and 0 < days <= 60 and start_text:
+            try:
+                start = date.fromisoformat(start_text)
+            except ValueError:
+                start = None
+            if start:
+                found["end_date"] = (start + timedelta(days=days - 1)).isoformat()
+                spans.append(m.span())
+    return found
+
+
+# ---- 目的地（借助本地地名索引，仅接受精确匹配） ----
+
+_DEST_CUE = re.compile(r"(?:想去|要去|打算去|准备去|计划去|去|到|前往|目的地是|目的地)\s*")
+_DEST_CHARS = re.compile(r"[一-龥A-Za-z0-9]{2,12}")
+
+
+def _extract_destination(text: str, spans: List[Tuple[int, int]]) -> Optional[str]:
+    from ..gazetteer import get_gazetteer
+
+    gazetteer = get_gazetteer()
+    if gazetteer is None:
+        return None
+    for cue in _DEST_CUE.finditer(text):
+        m = _DEST_CHARS.match(text, cue.end())
+        if not m:
+            continue
+        chars = m.group(0)
+        # 由长到短尝试，如“杭州玩5天” -> “杭州”
+        for length in range(len(chars), 1, -1):
+            candidate = chars[:length]
+            if gazetteer.find(candidate) is not None:
+                spans.append((cue.start(), m.start() + length))
+                return candidate
+    return None
+
+
+# ---- 偏好 ----
+
+_PREFERENCE_WORDS = ["美食", "文化", "历史", "自然风光", "风景", "购物", "海边", "海岛", "爬山", "徒步",
+                     "博物馆", "古镇", "亲子", "摄影", "温泉", "滑雪", "夜景", "休闲", "探险"]
+_PREFERENCE = re.compile(r"(?:喜欢|偏好|想看|想吃|主要是|侧重|对)?\s*(" + "|".join(_PREFERENCE_WORDS) + r")(?:感兴趣|为主|多一点)?")
+
+
+def _extract_preferences(text: str, spans: List[Tuple[int, int]]) -> Optional[str]:
+    words: List[str] = []
+    for m in _PREFERENCE.finditer(text):
+        if m.group(1) not in words:
+            words.append(m.group(1))
+            spans.append(m.span())
+    return "、".join(words) if words else None
+
+
+# ---- 剩余文本判断 ----
+
+_FILLER = re.compile(
+    r"我们|咱们|我|咱|大概|大约|左右|以内|上下|差不多|一共|总共|预算|人数|日期|时间|"
+    r"是|为|有|的|吧|呢|啊|呀|哦|噢|嗯|好的|好|就|也|还|打算|计划|准备|想|要|出发|回来|返回|开始|结束|"
+    r"玩|旅游|旅行|出行|去|从|到|至|和|跟|以及|然后|另外|那就|那么|那|加上|人|个|元|块|钱|"
+    r"[\s，。！？、,.!?~～；;：:]"
+)
+
+
+def extract_rules(
+    message: str,
+    current_info: Optional[TravelInfo] = None,
+    today: Optional[date] = None
+) -> RuleExtraction:
+    """
+    用规则从用户消息中抽取旅行信息（人数、预算、日期、目的地、偏好）
+
+    只有当整条消息都能被规则解释（去掉已识别片段和语气词后没有剩余内容）时，
+    才认为结果可信，可以跳过 LLM。
+
+    Args:
+        message: 用户消息
+        current_info: 当前已收集的信息（用于推算结束日期、人均预算等）
+        today: 当前日期（推断年份用，默认今天）
+
+    Returns:
+        RuleExtraction
+    """
+    current = current_info or TravelInfo()
+    today = today or date.today()
+    text = message.strip()
+    spans: List[Tuple[int, int]] = []
+    info: Dict = {}
+
+    people = _extract_people(text, spans)
+    if people is not None:
+        info["num_people"] = people
+
+    budget = _extract_budget(text, spans, people or current.num_people)
+    if budget is not None:
+        info["budget"] = budget
+
+    info.update(_extract_dates(text, spans, current, today))
+
+    destination = _extract_destination(text, spans)
+    if destination is not None:
+        info["destination"] = destination
+
+    preferences = _extract_preferences(text, spans)
+    if preferences is not None:
+        info["preferences"] = preferences
+
+    # 去掉已识别片段，检查剩余内容
+    chars = list(text)
+    for start, end in spans:
+        for i in range(start, end):
+            chars[i] = " "
+    leftover = _FILLER.sub("", "".join(chars))
+
+    # 只回答了一个地名（如“上海”“厦门吧”），且本地索引能精确匹配
+    if leftover and "destination" not in info:
+        from ..gazetteer import get_gazetteer
+
+        gazetteer = get_gazetteer()
+        if gazetteer is not None and gazetteer.find(leftover) is not None:
+            info["destination"] = leftover
+            leftover = ""
+
+    return RuleExtraction(info=info, confident=bool(info) and not leftover, leftover=leftover)
+
+
+# ---- 模板回复 ----
+
+_QUESTIONS = {
+    "目的地": "您想去哪里旅行",
+    "开始日期": "计划哪天出发",
+    "结束日期": "哪天返回",
+    "人数": "一共几位出行",
+    "预算": "大概的预算是多少",
+}
+
+
+def _format_amount(value: float) -> str:
+    return str(int(value)) if value == int(value) else f"{value:.2f}".rstrip("0")
+
+
+def render_reply(extracted: Dict, merged: TravelInfo) -> str:
+    """
+    根据规则抽取结果与合并后的信息生成回复（不调用 LLM）
+
+    Args:
+        extracted: 本轮抽取到的字段
+        merged: 合并后的旅行信息
+
+    Returns:
+        回复文本
+    """
+    if merged.is_complete():
+        return (
+            f"好的，信息已收集完整：目的地{merged.destination}，"
+            f"{merged.start_date}至{merged.end_date}，{merged.num_people}人出行，"
+            f"预算{_format_amount(merged.budget)}元"
+            + (f"，偏好{merged.preferences}" if merged.preferences else "")
+            + "。请确认以上信息是否无误？"
+        )
+
+    acks: List[str] = []
+    if "destination" in extracted:
+        acks.append(f"目的地{merged.destination}")
+    if "start_date" in extracted and "end_date" in extracted:
+        acks.append(f"{merged.start_date}至{merged.end_date}")
+    elif "start_date" in extracted:
+        acks.append(f"{merged.start_date}出发")
+    elif "end_date" in extracted:
+        acks.append(f"{merged.end_date}返回")
+    if "num_people" in extracted:
+        acks.append(f"{merged.num_people}人出行")
+    if "budget" in extracted:
+        acks.append(f"预算{_format_amount(merged.budget)}元")
+    if "preferences" in extracted:
+        acks.append(f"偏好{merged.preferences}")
+
+    missing = merged.get_missing_fields()
+    questions = "，".join(_QUESTIONS[field] for field in missing[:2])
+    prefix = f"好的，已记录：{'，'.join(acks)}。" if acks else "好的。"
+    return f"{prefix}请问{questions}？"
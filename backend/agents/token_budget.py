@@ -0,0 +1,146 @@
+import threading
+from typing import Any, Dict, Optional
+
+# 粗略估算：中日韩字符约 1 token/字，其余字符约 4 字符/token（仅用于裁剪，不用于计费）
+_CJK_RANGES = ((0x3000, 0x9FFF), (0xF900, 0xFAFF), (0xFF00, 0xFFEF))
+
+# 截断时插入的省略标记
+TRIM_MARKER = "……（中间内容已省略）……"
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    估算文本的 token 数
+
+    Args:
+        text: 文本
+
+    Returns:
+        估算的 token 数（向上取整）
+    """
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if any(lo <= ord(ch) <= hi for lo, hi in _CJK_RANGES))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    将文本裁剪到不超过 max_tokens（保留开头和结尾，中间替换为省略标记）
+
+    Args:
+        text: 原始文本
+        max_tokens: token 上限
+
+    Returns:
+        裁剪后的文本；未超出时原样返回
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    keep = max(0, max_tokens - estimate_tokens(TRIM_MARKER))
+    head_len, tail_len = (keep + 1) // 2, keep // 2
+    # 按估算逐字累加，避免切在英文长串中间时超出预算
+    head, used = [], 0
+    for ch in text:
+        used += estimate_tokens(ch)
+        if used > head_len:
+            break
+        head.append(ch)
+    tail, used = [], 0
+    for ch in reversed(text):
+        used += estimate_tokens(ch)
+        if used > tail_len:
+            break
+        tail.append(ch)
+    return "".join(head) + TRIM_MARKER + "".join(reversed(tail))
+
+
+def usage_from_message(message: Any) -> Dict[str, int]:
+    """
+    从模型返回的消息中读取 token 用量
+
+    优先使用 LangChain 的 usage_metadata，其次读取 response_metadata 中的 token_usage
+    （兼容 OpenAI 的 prompt_tokens_details.cached_tokens 与 Moonshot 的 cached_tokens）。
+
+    Args:
+        message: AIMessage / AIMessageChunk
+
+    Returns:
+        {"prompt_tokens", "completion_tokens", "cached_tokens"}；没有用量信息时为空字典
+    """
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        details = usage.get("input_token_details") or {}
+        return {
+            "prompt_tokens": int(usage.get("input_tokens") or 0),
+            "completion_tokens": int(usage.get("output_tokens") or 0),
+            "cached_tokens": int(details.get("cache_read") or 0)
+        }
+    metadata = getattr(message, "response_metadata", None) or {}
+    usage = metadata.get("token_usage") or metadata.get("usage")
+    if not usage:
+        return {}
+    details = usage.get("prompt_tokens_details") or {}
+    return {
+        "prompt_tokens": int(usage.get("prompt_tokens") or 0),
+        "completion_tokens": int(usage.get("completion_tokens") or 0),
+        "cached_tokens": int(details.get("cached_tokens") or usage.get("cached_tokens") or 0)
+    }
+
+
+def add_usage(total: Dict[str, int], usage: Dict[str, int]) -> Dict[str, int]:
+    """将一次用量累加到 total（原地修改并返回）"""
+    for key, value in usage.items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+
+class TokenMeter:
+    """全局 token 用量与模型耗时统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.latency_total = 0.0
+        self.trimmed_turns = 0
+
+    def record(self, usage: Dict[str, int], latency: float):
+        """
+        记录一次模型调用
+
+        Args:
+            usage: usage_from_message 的返回值
+            latency: 本次调用耗时（秒）
+        """
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += usage.get("prompt_tokens", 0)
+            self.completion_tokens += usage.get("completion_tokens", 0)
+            self.cached_tokens += usage.get("cached_tokens", 0)
+            self.latency_total += latency
+
+    def record_trim(self):
+        """记录一次因超出预算而裁剪的轮次"""
+        with self._lock:
+            self.trimmed_turns += 1
+
+    def stats(self) -> Dict:
+        """用量统计（cache_ratio 为命中服务端上下文缓存的输入 token 占比）"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cached_tokens": self.cached_tokens,
+                "cache_ratio": round(self.cached_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0,
+                "avg_prompt_tokens": round(self.prompt_tokens / self.calls, 1) if self.calls else 0.0,
+                "avg_latency_ms": round(self.latency_total / self.calls * 1000, 1) if self.calls else 0.0,
+                "trimmed_turns": self.trimmed_turns
+            }
+
+
+# 全局 token 统计
+token_meter = TokenMeter()
@@ -1,14 +1,45 @@
 import os
 import json
-from typing import Dict, Optional
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional
+
+import httpx
 from pydantic import BaseModel, Field
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.utils.json import parse_partial_json
+
+from ..base import SLOT_CONFIRMED, TravelInfo
+from ..metrics import mark_first, set_path, stage
+from ..resilience import ResilientCaller, UpstreamUnavailable
+from ..single_flight import llm_flight, prompt_key
+from .json_utils import extract_json
+from .token_budget import add_usage, estimate_tokens, token_meter, trim_to_tokens, usage_from_message
+from .rule_extractor import extract_rules, render_reply
 
-from ..base import TravelInfo
+if TYPE_CHECKING:
+    from ..turn_cache import TurnCache
+
+logger = logging.getLogger(__name__)
 
 # 不在此处硬编码/覆盖 API Key，改为由调用方传入或环境变量提供
 
+# 上下文中各槽位的展示格式
+_CONTEXT_LINES = {
+    "destination": "- 目的地：{}",
+    "start_date": "- 开始日期：{}",
+    "end_date": "- 结束日期：{}",
+    "num_people": "- 人数：{}人",
+    "budget": "- 预算：{}元",
+    "preferences": "- 偏好：{}"
+}
+# 槽位已确认时追加的提示（目前只有目的地有确认状态）；未列出的槽位不追加
+_CONFIRMED_LINES = {
+    "destination": "✓ 目的地已确认，请不要再次询问或要求用户确认目的地"
+}
+
 
 class ExtractedInfo(BaseModel):
     """提取的旅行信息模型"""
@@ -27,6 +58,74 @@ class AgentResponse(BaseModel):
     is_complete: bool = Field(description="所有必要信息是否已收集完成")
 
 
+def _load_lenient(text: Optional[str]) -> Optional[Any]:
+    """容错解析模型输出的 JSON：先完整提取，失败时按截断的 JSON 补全解析"""
+    if not text or not text.strip():
+        return None
+    data = extract_json(text)
+    if data is not None:
+        return data
+    start = text.find("{")
+    if start < 0:
+        return None
+    try:
+        return parse_partial_json(text[start:])
+    except Exception:
+        return None
+
+
+def _looks_like_json(text: str) -> bool:
+    stripped = text.lstrip()
+    return stripped.startswith("{") or stripped.startswith("```")
+
+
+def _repair_agent_response(data: Any) -> Optional[AgentResponse]:
+    """
+    将解析出的字典修复为 AgentResponse
+
+    - 兼容外层再包一层 {"AgentResponse": {...}} 的输出
+    - extracted_info 中类型不合法的字段直接丢弃，不影响其它字段
+    - is_complete 缺失或不是布尔值时按字符串判断，默认 False
+
+    Args:
+        data: 解析得到的对象
+
+    Returns:
+        修复后的 AgentResponse；缺少可用的 response 文本时返回 None
+    """
+    if isinstance(data, dict) and len(data) == 1:
+        inner = next(iter(data.values()))
+        if isinstance(inner, dict) and "response" in inner:
+            data = inner
+    if not isinstance(data, dict):
+        return None
+    response = data.get("response")
+    if not isinstance(response, str) or not response.strip():
+        return None
+
+    extracted: Dict[str, Any] = {}
+    raw_info = data.get("extracted_info")
+    if isinstance(raw_info, dict):
+        for name in ExtractedInfo.model_fields:
+            value = raw_info.get(name)
+            if value is None or value == "":
+                continue
+            try:
+                extracted[name] = getattr(ExtractedInfo.model_validate({name: value}), name)
+            except Exception:
+                continue
+
+    is_complete = data.get("is_complete", False)
+    if not isinstance(is_complete, bool):
+        is_complete = str(is_complete).strip().lower() in ("true", "1", "yes", "是")
+
+    return AgentResponse(
+        extracted_info=ExtractedInfo(**extracted),
+        response=response.strip(),
+        is_complete=is_complete
+    )
+
+
 class TravelInfoAgent:
     """旅行信息采集Agent，用于多轮对话收集用户旅行需求 - 使用LangChain框架"""
 
@@ -35,7 +134,17 @@ class TravelInfoAgent:
             api_key: str,
             api_base: str,
             model_name: str = "kimi-k2-0905",
-            temperature: float = 0
+            temperature: float = 0,
+            http_client: Optional[httpx.Client] = None,
+            http_async_client: Optional[httpx.AsyncClient] = None,
+            rule_fast_path: bool = True,
+            retry_budget: int = 1,
+            retry_backoff: float = 0.5,
+            max_tokens: Optional[int] = None,
+            prompt_token_budget: Optional[int] = None,
+            stream_usage: bool = True,
+            resilience: Optional[ResilientCaller] = None,
+            turn_cache: Optional["TurnCache"] = None
         ):
         """
         初始化TravelInfoAgent
@@ -45,20 +154,52 @@ class TravelInfoAgent:
             api_key: Moonshot API密钥
             model_name: 模型名称
             temperature: 温度参数
+            http_client: 共享的同步HTTP客户端（复用连接池，供 invoke 使用）
+            http_async_client: 共享的异步HTTP客户端（复用连接池，供 ainvoke 使用）
+            rule_fast_path: 规则能完整解释用户消息时跳过 LLM，直接用模板回复
+            retry_budget: 模型输出无法解析时最多重新生成的次数（0 表示不重试）；
+                上游错误不在这里重试，由弹性层（或未设置弹性层时 SDK 自带的重试）统一处理
+            retry_backoff: 重试前的等待秒数（指数退避的基数）
+            max_tokens: 单次回复的最大生成 token 数（None 表示不限制）
+            prompt_token_budget: 单轮提示的 token 上限（估算），超出时裁剪偏好与用户消息
+            stream_usage: 流式调用时请求服务端返回 token 用量
+            resilience: 异步调用的限速/重试/熔断层；设置后关闭 SDK 自带的重试，由该层统一处理
+            turn_cache: 轮次回复缓存；常见的开场轮次命中时不调用模型（仅异步/流式接口使用）
         """
         # 初始化LangChain ChatOpenAI模型（兼容Moonshot API）
         self.llm = ChatOpenAI(
             model=model_name,
             temperature=temperature,
             api_key=api_key,
-            base_url=api_base
+            base_url=api_base,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            max_tokens=max_tokens,
+            stream_usage=stream_usage,
+            **({"max_retries": 0} if resilience is not None else {})
         )
+        self.resilience = resilience
 
-        # 创建结构化输出模型
-        self.structured_llm = self.llm.with_structured_output(AgentResponse)
+        # 强制以 AgentResponse 工具调用返回 JSON；只调用一次，解析/修复在本地完成，
+        # 流式输出时也可以边生成边解析 response 字段
+        self.tool_llm = self.llm.bind_tools([AgentResponse], tool_choice=AgentResponse.__name__)
 
-        # 获取系统指令
+        # 获取系统指令；系统消息只构建一次，保证每次请求的提示前缀逐字节一致，
+        # 便于服务端的上下文缓存命中（动态内容全部放在后面的用户消息中）
         self.system_message = self._get_instructions()
+        self._system_prompt = SystemMessage(content=self.system_message)
+        self.prompt_token_budget = prompt_token_budget
+
+        self.rule_fast_path = rule_fast_path
+        self.turn_cache = turn_cache
+        self.retry_budget = max(0, retry_budget)
+        self.retry_backoff = retry_backoff
+
+        # 统计计数
+        self.llm_calls = 0
+        self.parse_failures = 0
+        self.repaired = 0
+        self.retries = 0
 
     def _get_instructions(self) -> str:
         """获取Agent的系统指令"""
@@ -90,7 +231,206 @@ class TravelInfoAgent:
 - 日期格式要转换为YYYY-MM-DD格式
 - 人数要转换为数字
 - 预算要转换为数字（去掉"元"、"块"等单位）
-- 如果用户说"下周"、"下个月"等相对时间，要询问具体日期"""
+- 如果用户说"下周"、"下个月"等相对时间，要询问具体日期
+
+输入格式：每轮用户消息先给出“当前已收集的信息”和缺失信息，再给出“用户新消息”。
+请分析用户新消息，提取新信息，并根据当前已有信息和缺失信息生成合适的回复。"""
+
+    def _build_messages(self, user_message: str, current_info: TravelInfo) -> List[BaseMessage]:
+        """
+        构建发送给模型的消息列表
+
+        系统消息固定不变；已收集信息与用户新消息放在用户消息中。
+        设置了 prompt_token_budget 时，超出预算先裁剪偏好，再裁剪用户消息（保留首尾）。
+
+        Args:
+            user_message: 用户输入的消息
+            current_info: 当前已收集的旅行信息
+
+        Returns:
+            系统消息 + 用户消息
+        """
+        with stage("build_context"):
+            prompt = self._user_prompt(user_message, current_info)
+
+            if self.prompt_token_budget:
+                over = estimate_tokens(self.system_message) + estimate_tokens(prompt) - self.prompt_token_budget
+                if over > 0:
+                    token_meter.record_trim()
+                    if current_info.preferences:
+                        keep = max(20, estimate_tokens(current_info.preferences) - over)
+                        current_info = current_info.model_copy(
+                            update={"preferences": trim_to_tokens(current_info.preferences, keep)}
+                        )
+                        prompt = self._user_prompt(user_message, current_info)
+                        over = estimate_tokens(self.system_message) + estimate_tokens(prompt) - self.prompt_token_budget
+                    if over > 0:
+                        keep = max(20, estimate_tokens(user_message) - over)
+                        prompt = self._user_prompt(trim_to_tokens(user_message, keep), current_info)
+
+            return [self._system_prompt, HumanMessage(content=prompt)]
+
+    def _user_prompt(self, user_message: str, current_info: TravelInfo) -> str:
+        """用户消息：已收集信息上下文 + 用户新消息"""
+        return f"{self._build_context(current_info)}\n\n用户新消息：{user_message}"
+
+    @staticmethod
+    def _to_result(result: AgentResponse) -> Dict:
+        """将结构化输出转换为字典格式"""
+        return {
+            "extracted_info": result.extracted_info.model_dump(),
+            "response": result.response,
+            "is_complete": result.is_complete
+        }
+
+    @staticmethod
+    def _fallback_result(content: Optional[str] = None) -> Dict:
+        """结构化输出失败时的兜底结果"""
+        with stage("fallback"):
+            return {
+                "extracted_info": {},
+                "response": content if content is not None else "抱歉，处理您的消息时出现了错误。请重试。",
+                "is_complete": False
+            }
+
+    def _retry_delay(self, attempt: int) -> float:
+        """第 attempt 次重试前的等待秒数（指数退避）"""
+        return self.retry_backoff * (2 ** (attempt - 1))
+
+    def _result_from_output(self, payloads: List[Any], content: str) -> Optional[Dict]:
+        """
+        从一次模型输出中解析结果（本地修复，不再为同一条消息二次调用模型）
+
+        Args:
+            payloads: 工具调用参数（已解析的字典或原始字符串）
+            content: 模型返回的文本内容
+
+        Returns:
+            与 process_message 相同结构的字典；输出为空或无法使用时返回 None
+        """
+        for payload in [*payloads, content]:
+            data = _load_lenient(payload) if isinstance(payload, str) else payload
+            if data is None:
+                continue
+            try:
+                return self._to_result(AgentResponse.model_validate(data))
+            except Exception:
+                pass
+            result = _repair_agent_response(data)
+            if result is not None:
+                self.repaired += 1
+                return self._to_result(result)
+
+        self.parse_failures += 1
+        # 模型没有按格式返回但给出了普通文本：直接作为回复，不再重新请求
+        if content and content.strip() and not _looks_like_json(content):
+            return self._fallback_result(content.strip())
+        return None
+
+    def _result_from_message(self, message: Any) -> Optional[Dict]:
+        payloads: List[Any] = [call.get("args") for call in getattr(message, "tool_calls", None) or []]
+        payloads += [call.get("args") for call in getattr(message, "invalid_tool_calls", None) or []]
+        content = message.content if isinstance(message.content, str) else ""
+        return self._result_from_output(payloads, content)
+
+    @staticmethod
+    def _partial_response_text(args_buffer: str, content: str) -> Optional[str]:
+        """流式过程中从已收到的片段里取出当前的 response 文本"""
+        if args_buffer:
+            partial = parse_partial_json(args_buffer)
+        elif content and _looks_like_json(content):
+            partial = _load_lenient(content)
+        else:
+            # 模型直接输出普通文本
+            return content or None
+        return partial.get("response") if isinstance(partial, dict) else None
+
+    async def _ainvoke(self, messages: List[BaseMessage]) -> Any:
+        """异步调用模型（经过弹性层时带限速、重试与熔断）"""
+        if self.resilience is None:
+            return await self.tool_llm.ainvoke(messages)
+        return await self.resilience.call(lambda: self.tool_llm.ainvoke(messages))
+
+    def _astream(self, messages: List[BaseMessage]) -> AsyncIterator[Any]:
+        """流式调用模型（经过弹性层时在首个分块之前可重试）"""
+        if self.resilience is None:
+            return self.tool_llm.astream(messages)
+        return self.resilience.stream(lambda: self.tool_llm.astream(messages))
+
+    @staticmethod
+    def _record_usage(turn_usage: Dict[str, int], usage: Dict[str, int], started: float):
+        """记录一次模型调用的用量与耗时（累加到本轮用量和全局统计）"""
+        token_meter.record(usage, time.perf_counter() - started)
+        add_usage(turn_usage, {**usage, "calls": 1})
+
+    def stats(self) -> Dict:
+        """模型调用统计：调用次数、解析失败、本地修复与重试次数"""
+        return {
+            "llm_calls": self.llm_calls,
+            "parse_failures": self.parse_failures,
+            "repaired": self.repaired,
+            "retries": self.retries,
+            "retry_budget": self.retry_budget
+        }
+
+    def fast_path(self, user_message: str, current_info: TravelInfo) -> Optional[Dict]:
+        """
+        规则快速路径：消息只包含人数、预算、日期等可被规则完整解释的内容时，不调用 LLM
+
+        Args:
+            user_message: 用户输入的消息
+            current_info: 当前已收集的旅行信息
+
+        Returns:
+            与 process_message 相同结构的字典；规则无法完整解释时返回 None
+        """
+        if not self.rule_fast_path:
+            return None
+        extraction = extract_rules(user_message, current_info)
+        if not extraction.confident:
+            return None
+        merged = self.update_travel_info(current_info, extraction.info)
+        return {
+            "extracted_info": ExtractedInfo(**extraction.info).model_dump(),
+            "response": render_reply(extraction.info, merged),
+            "is_complete": merged.is_complete()
+        }
+
+    def local_answer(self, user_message: str, current_info: TravelInfo) -> Optional[Dict]:
+        """
+        不调用模型即可回答的轮次：先走规则快速路径，再查轮次回复缓存
+
+        接口在准入控制之前调用，这类轮次不占用模型调用名额；随后调用
+        aprocess_message / astream_message 时传 try_local=False，避免重复查询。
+
+        Args:
+            user_message: 用户输入的消息
+            current_info: 当前已收集的旅行信息
+
+        Returns:
+            与 process_message 相同结构的字典；需要调用模型时返回 None
+        """
+        with stage("rules"):
+            fast = self.fast_path(user_message, current_info)
+        if fast is not None:
+            return fast
+        return self._cached_turn(user_message, current_info)
+
+    def _cached_turn(self, user_message: str, current_info: TravelInfo) -> Optional[Dict]:
+        """查询轮次回复缓存，命中时返回结果（不产生模型调用与用量）"""
+        if self.turn_cache is None:
+            return None
+        with stage("turn_cache"):
+            cached = self.turn_cache.get(user_message, current_info)
+        if cached is None:
+            return None
+        set_path("cache")
+        return {**cached, "usage": {}}
+
+    def _store_turn(self, user_message: str, current_info: TravelInfo, result: Dict, parse_failures: int):
+        """模型正常返回结构化结果（本轮没有解析失败）时尝试写入轮次回复缓存"""
+        if self.turn_cache is not None and self.parse_failures == parse_failures:
+            self.turn_cache.put(user_message, current_info, result)
 
     def process_message(
         self,
@@ -98,7 +438,7 @@ class TravelInfoAgent:
         current_info: TravelInfo
     ) -> Dict:
         """
-        处理用户消息，提取信息并生成回复
+        处理用户消息，提取信息并生成回复（同步版本，会阻塞调用线程）
 
         Args:
             user_message: 用户输入的消息
@@ -107,52 +447,175 @@ class TravelInfoAgent:
         Returns:
             包含提取信息、回复内容和完成状态的字典
         """
-        # 构建上下文提示
-        context = self._build_context(current_info)
-
-        # 构建完整提示
-        user_prompt = f"""{context}
-
-用户新消息：{user_message}
-
-请分析用户消息，提取新信息，并根据当前已有信息和缺失信息生成合适的回复。"""
+        fast = self.fast_path(user_message, current_info)
+        if fast is not None:
+            return fast
+
+        messages = self._build_messages(user_message, current_info)
+        usage: Dict[str, int] = {}
+
+        for attempt in range(self.retry_budget + 1):
+            if attempt:
+                self.retries += 1
+                time.sleep(self._retry_delay(attempt))
+            started = time.perf_counter()
+            try:
+                self.llm_calls += 1
+                message = self.tool_llm.invoke(messages)
+            except Exception as e:
+                # SDK 已按自己的策略重试过，这里不再重试
+                logger.warning(f"TravelInfoAgent LLM call failed: {e}")
+                break
+            self._record_usage(usage, usage_from_message(message), started)
+            result = self._result_from_message(message)
+            if result is not None:
+                return {**result, "usage": usage}
+
+        return {**self._fallback_result(), "usage": usage}
+
+    async def aprocess_message(
+        self,
+        user_message: str,
+        current_info: TravelInfo,
+        try_local: bool = True
+    ) -> Dict:
+        """
+        处理用户消息的异步版本：使用 ainvoke，等待模型期间不阻塞事件循环
 
-        # 使用LangChain调用模型
-        messages = [
-            SystemMessage(content=self.system_message),
-            HumanMessage(content=user_prompt)
-        ]
+        Args:
+            user_message: 用户输入的消息
+            current_info: 当前已收集的旅行信息
+            try_local: 是否先尝试 local_answer（调用方已经查询过时传 False）
 
-        try:
-            # 调用结构化输出模型
-            result: AgentResponse = self.structured_llm.invoke(messages)
+        Returns:
+            包含提取信息、回复内容和完成状态的字典
+        """
+        if try_local:
+            local = self.local_answer(user_message, current_info)
+            if local is not None:
+                return local
+
+        messages = self._build_messages(user_message, current_info)
+        usage: Dict[str, int] = {}
+        # 相同提示（如前端重试重复提交）在途时合并为一次上游调用
+        flight_key = prompt_key(f"{self.llm.model_name}:travel_info", messages)
+
+        for attempt in range(self.retry_budget + 1):
+            if attempt:
+                self.retries += 1
+                await asyncio.sleep(self._retry_delay(attempt))
+            started = time.perf_counter()
+            try:
+                self.llm_calls += 1
+                with stage("llm"):
+                    message, coalesced = await llm_flight.run(flight_key, lambda: self._ainvoke(messages))
+            except UpstreamUnavailable:
+                # 上游限流/故障：交给接口返回 503 + Retry-After，不再用兜底回复掩盖
+                raise
+            except Exception as e:
+                # 弹性层已重试过可重试的错误，其余（如 400/401）重试也不会成功，直接使用兜底回复
+                logger.warning(f"TravelInfoAgent LLM call failed: {e}")
+                break
+            # 合并得到的结果不重复计入 token 用量
+            self._record_usage(usage, {} if coalesced else usage_from_message(message), started)
+            parse_failures = self.parse_failures
+            with stage("parse"):
+                result = self._result_from_message(message)
+            if result is not None:
+                self._store_turn(user_message, current_info, result, parse_failures)
+                return {**result, "usage": usage}
+
+        return {**self._fallback_result(), "usage": usage}
+
+    async def astream_message(
+        self,
+        user_message: str,
+        current_info: TravelInfo,
+        try_local: bool = True
+    ) -> AsyncIterator[Dict]:
+        """
+        流式处理用户消息：边生成边输出 response 文本，最后输出完整结果
 
-            # 转换为字典格式
-            return {
-                "extracted_info": result.extracted_info.model_dump(),
-                "response": result.response,
-                "is_complete": result.is_complete
-            }
+        Args:
+            user_message: 用户输入的消息
+            current_info: 当前已收集的旅行信息
+            try_local: 是否先尝试 local_answer（调用方已经查询过时传 False）
 
-        except Exception as e:
-            # 如果结构化输出失败，尝试使用普通模型并返回默认响应
+        Yields:
+            {"type": "delta", "text": 新增的回复文本}，以及最后一个
+            {"type": "result", ...} 事件（字段与 process_message 的返回值一致）
+        """
+        if try_local:
+            local = self.local_answer(user_message, current_info)
+            if local is not None:
+                yield {"type": "delta", "text": local["response"]}
+                yield {"type": "result", **local}
+                return
+
+        messages = self._build_messages(user_message, current_info)
+        usage: Dict[str, int] = {}
+
+        for attempt in range(self.retry_budget + 1):
+            if attempt:
+                self.retries += 1
+                await asyncio.sleep(self._retry_delay(attempt))
+            args_buffer = ""
+            content = ""
+            sent = ""
+            chunk_usage: Dict[str, int] = {}
+            started = time.perf_counter()
             try:
-                response = self.llm.invoke(messages)
-                return {
-                    "extracted_info": {},
-                    "response": response.content,
-                    "is_complete": False
-                }
-            except Exception as inner_e:
-                return {
-                    "extracted_info": {},
-                    "response": f"抱歉，处理您的消息时出现了错误。请重试。",
-                    "is_complete": False
-                }
+                self.llm_calls += 1
+                with stage("llm"):
+                    async for chunk in self._astream(messages):
+                        mark_first("llm_first_chunk", "llm")
+                        # 开启 stream_usage 时用量随最后一个分块返回
+                        add_usage(chunk_usage, usage_from_message(chunk))
+                        for tool_chunk in getattr(chunk, "tool_call_chunks", None) or []:
+                            args_buffer += tool_chunk.get("args") or ""
+                        if isinstance(chunk.content, str):
+                            content += chunk.content
+                        text = self._partial_response_text(args_buffer, content)
+                        # 仅在文本单调增长时输出增量，避免未完成的转义字符造成回退
+                        if isinstance(text, str) and len(text) > len(sent) and text.startswith(sent):
+                            yield {"type": "delta", "text": text[len(sent):]}
+                            sent = text
+            except Exception as e:
+                logger.warning(f"TravelInfoAgent LLM stream failed: {e}")
+                if isinstance(e, UpstreamUnavailable) and not sent:
+                    raise
+                if not sent:
+                    # 弹性层已在首个分块之前重试过，这里不再重试，直接使用兜底回复
+                    break
+                # 已经输出了部分回复，不再重新生成，避免前端出现重复文本
+                self._record_usage(usage, chunk_usage, started)
+                yield {"type": "result", **self._fallback_result(sent), "usage": usage}
+                return
+
+            self._record_usage(usage, chunk_usage, started)
+
+            parse_failures = self.parse_failures
+            with stage("parse"):
+                result = self._result_from_output([args_buffer] if args_buffer else [], content)
+            if result is None:
+                if not sent:
+                    continue
+                result = self._fallback_result(sent)
+            else:
+                self._store_turn(user_message, current_info, result, parse_failures)
+            final = result["response"]
+            if len(final) > len(sent) and final.startswith(sent):
+                yield {"type": "delta", "text": final[len(sent):]}
+            yield {"type": "result", **result, "usage": usage}
+            return
+
+        result = self._fallback_result()
+        yield {"type": "delta", "text": result["response"]}
+        yield {"type": "result", **result, "usage": usage}
 
     def _build_context(self, current_info: TravelInfo) -> str:
         """
-        构建当前信息上下文
+        构建当前信息上下文（按槽位状态渲染，缺失字段列表使用 TravelInfo 的缓存）
 
         Args:
             current_info: 当前已收集的旅行信息
@@ -162,24 +625,11 @@ class TravelInfoAgent:
         """
         context_parts = ["当前已收集的信息："]
 
-        if current_info.destination:
-            context_parts.append(f"- 目的地：{current_info.destination}")
-            # 若目的地已确认，提示模型不要重复确认
-            try:
-                if getattr(current_info, 'destination_confirmed', False):
-                    context_parts.append("✓ 目的地已确认，请不要再次询问或要求用户确认目的地")
-            except Exception:
-                pass
-        if current_info.start_date:
-            context_parts.append(f"- 开始日期：{current_info.start_date}")
-        if current_info.end_date:
-            context_parts.append(f"- 结束日期：{current_info.end_date}")
-        if current_info.num_people:
-            context_parts.append(f"- 人数：{current_info.num_people}人")
-        if current_info.budget:
-            context_parts.append(f"- 预算：{current_info.budget}元")
-        if current_info.preferences:
-            context_parts.append(f"- 偏好：{current_info.preferences}")
+        for name, value, status in current_info.filled_slots():
+            context_parts.append(_CONTEXT_LINES[name].format(value))
+            if status == SLOT_CONFIRMED and name in _CONFIRMED_LINES:
+                # 槽位已确认时，提示模型不要重复确认该槽位
+                context_parts.append(_CONFIRMED_LINES[name])
 
         if len(context_parts) == 1:
             context_parts.append("（暂无）")
@@ -196,37 +646,24 @@ class TravelInfoAgent:
     def update_travel_info(
         self,
         current_info: TravelInfo,
-        extracted_info: Dict
+        extracted_info: Dict,
+        in_place: bool = False
     ) -> TravelInfo:
         """
-        更新旅行信息
+        更新旅行信息（只更新非空值，不覆盖已确认的字段）
 
         Args:
             current_info: 当前旅行信息
             extracted_info: 从用户消息中提取的新信息
+            in_place: 是否直接修改 current_info（调用方持有会话的修改权时使用）；
+                否则在浅拷贝上修改，不影响 current_info
 
         Returns:
             更新后的旅行信息
         """
-        # 创建新的信息对象，保留旧信息
-        updated_data = current_info.model_dump()
-
-        # 更新提取到的新信息（只更新非空值）——但不覆盖已确认的字段
-        dest_confirmed = False
-        try:
-            dest_confirmed = bool(getattr(current_info, 'destination_confirmed', False))
-        except Exception:
-            dest_confirmed = False
-
-        for key, value in extracted_info.items():
-            if value is None or value == "":
-                continue
-            if key == 'destination' and dest_confirmed:
-                # 已确认目的地不允许被覆盖
-                continue
-            updated_data[key] = value
-
-        return TravelInfo(**updated_data)
+        info = current_info if in_place else current_info.model_copy()
+        info.patch(extracted_info)
+        return info
 
 # 便捷函数
 def create_travel_info_agent(api_key: Optional[str] = None) -> TravelInfoAgent:
@@ -1,16 +1,69 @@
-from pydantic import BaseModel
-from typing import List, Optional
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, PrivateAttr, ValidationError
 
 
 class POI(BaseModel):
     name: str
     type: str
-    location: List[float]
-    distance: int
+    location: List[float]  # [经度, 纬度]
+    distance: int  # 到查询中心点的距离（米）
+    address: Optional[str] = None
+
+
+class Weather(BaseModel):
+    """实况天气"""
+    city: str
+    condition: str  # 天气现象，如 晴、多云、小雨
+    temperature: Optional[str] = None  # 摄氏度
+    humidity: Optional[str] = None
+    wind: Optional[str] = None
+    report_time: Optional[str] = None
+
+
+class DestinationContext(BaseModel):
+    """目的地确认后并发预取的地图数据：坐标、天气与周边 POI"""
+    destination: str
+    location: Optional[List[float]] = None  # [经度, 纬度]
+    city: Optional[str] = None
+    adcode: Optional[str] = None
+    weather: Optional[Weather] = None
+    pois: Dict[str, List[POI]] = {}  # 类别 -> POI 列表
+    errors: Dict[str, str] = {}  # 失败或超时的子任务 -> 原因
+    timings_ms: Dict[str, int] = {}  # 各子任务耗时
+    elapsed_ms: int = 0  # 从开始到全部子任务结束的耗时
+
+
+# 槽位状态：每个槽位占 2 位，全部保存在一个整数中
+SLOT_EMPTY = 0
+SLOT_FILLED = 1
+SLOT_CONFIRMED = 2
+
+# 可由对话填写的槽位（按提示词中的展示顺序）
+SLOT_NAMES = ("destination", "start_date", "end_date", "num_people", "budget", "preferences")
+# 必要槽位 -> 缺失时展示的中文名
+REQUIRED_SLOTS = {
+    "destination": "目的地",
+    "start_date": "开始日期",
+    "end_date": "结束日期",
+    "num_people": "人数",
+    "budget": "预算"
+}
+_SLOT_INDEX = {name: i for i, name in enumerate(SLOT_NAMES)}
+_SLOT_SHIFTS = tuple((name, 2 * i) for i, name in enumerate(SLOT_NAMES))
+
+logger = logging.getLogger(__name__)
 
 
 class TravelInfo(BaseModel):
-    """旅行信息模型"""
+    """
+    旅行信息模型
+
+    除字段值外还维护槽位状态（空 / 已填写 / 已确认）与版本号：
+    字段赋值或 patch 时只更新对应槽位，缺失字段列表按需计算并缓存，
+    每轮无需 model_dump 再重建对象，也不必反复遍历所有字段。
+    """
     destination: Optional[str] = None  # 目的地
     destination_confirmed: Optional[bool] = False  # 目的地是否已确认
     start_date: Optional[str] = None  # 开始日期
@@ -19,39 +72,115 @@ class TravelInfo(BaseModel):
     budget: Optional[float] = None  # 预算
     preferences: Optional[str] = None  # 偏好（如：美食、文化、自然风光等）
 
+    # 槽位状态位图、版本号与缺失字段缓存；均为不可变值，model_copy 浅拷贝后互不影响。
+    # 热路径直接读写 __pydantic_private__，避免 pydantic 私有属性 __getattr__ / __setattr__ 的开销
+    _slots: int = PrivateAttr(0)
+    _version: int = PrivateAttr(0)
+    _missing: Optional[Tuple[str, ...]] = PrivateAttr(None)
+
+    def model_post_init(self, __context: Any):
+        slots = 0
+        for name in SLOT_NAMES:
+            slots |= self._slot_status(name) << (2 * _SLOT_INDEX[name])
+        self.__pydantic_private__["_slots"] = slots
+
+    def __setattr__(self, name: str, value: Any):
+        super().__setattr__(name, value)
+        if name in _SLOT_INDEX:
+            self._sync_slot(name)
+        elif name == "destination_confirmed":
+            self._sync_slot("destination")
+
+    def _slot_status(self, name: str) -> int:
+        if not getattr(self, name):
+            return SLOT_EMPTY
+        if name == "destination" and self.destination_confirmed:
+            return SLOT_CONFIRMED
+        return SLOT_FILLED
+
+    def _sync_slot(self, name: str):
+        private = self.__pydantic_private__
+        shift = 2 * _SLOT_INDEX[name]
+        private["_slots"] = (private["_slots"] & ~(3 << shift)) | (self._slot_status(name) << shift)
+        private["_version"] += 1
+        private["_missing"] = None
+
+    @property
+    def version(self) -> int:
+        """每次字段变更递增（仅在进程内有效，不持久化）"""
+        return self.__pydantic_private__["_version"]
+
+    @property
+    def slot_state(self) -> int:
+        """所有槽位状态打包成的整数（每个槽位 2 位），只反映空/已填写/已确认，与具体取值无关"""
+        return self.__pydantic_private__["_slots"]
+
+    def slot_status(self, name: str) -> int:
+        """槽位状态：SLOT_EMPTY / SLOT_FILLED / SLOT_CONFIRMED"""
+        return (self.__pydantic_private__["_slots"] >> (2 * _SLOT_INDEX[name])) & 3
+
+    def filled_slots(self) -> List[Tuple[str, Any, int]]:
+        """
+        按展示顺序列出已填写的槽位
+
+        Returns:
+            [(字段名, 值, 槽位状态)]
+        """
+        slots = self.__pydantic_private__["_slots"]
+        values = self.__dict__
+        return [
+            (name, values[name], (slots >> shift) & 3)
+            for name, shift in _SLOT_SHIFTS if (slots >> shift) & 3
+        ]
+
+    def patch(self, updates: Dict[str, Any]) -> List[str]:
+        """
+        就地合并新提取的信息：跳过空值、未知字段与已确认的槽位，每个值按字段类型校验
+
+        Args:
+            updates: 字段名 -> 新值
+
+        Returns:
+            实际发生变化的字段名
+        """
+        changed = []
+        for name, value in updates.items():
+            if value is None or value == "" or name not in _SLOT_INDEX:
+                continue
+            old = self.__dict__[name]
+            if value == old and type(value) is type(old):
+                continue
+            if self.slot_status(name) == SLOT_CONFIRMED:
+                # 已确认的槽位不允许被覆盖
+                continue
+            try:
+                # 校验并写入单个字段，不重建整个模型（校验后 __dict__ 会被替换，需重新读取）
+                self.__pydantic_validator__.validate_assignment(self, name, value)
+            except ValidationError as e:
+                logger.warning(f"Ignoring invalid value for {name}: {value!r} ({e.errors()[0]['msg']})")
+                continue
+            if self.__dict__[name] != old:
+                self._sync_slot(name)
+                changed.append(name)
+        return changed
+
+    def _missing_fields(self) -> Tuple[str, ...]:
+        private = self.__pydantic_private__
+        missing = private["_missing"]
+        if missing is None:
+            slots = private["_slots"]
+            missing = private["_missing"] = tuple(
+                label for name, label in REQUIRED_SLOTS.items() if not (slots >> (2 * _SLOT_INDEX[name])) & 3
+            )
+        return missing
+
     def is_complete(self) -> bool:
         """检查必要信息是否完整"""
-        return all([
-            self.destination,
-            self.start_date,
-            self.end_date,
-            self.num_people,
-            self.budget
-        ])
+        return not self._missing_fields()
 
     def get_missing_fields(self) -> List[str]:
         """获取缺失的字段"""
-        missing = []
-        field_names = {
-            'destination': '目的地',
-            'start_date': '开始日期',
-            'end_date': '结束日期',
-            'num_people': '人数',
-            'budget': '预算'
-        }
-
-        if not self.destination:
-            missing.append(field_names['destination'])
-        if not self.start_date:
-            missing.append(field_names['start_date'])
-        if not self.end_date:
-            missing.append(field_names['end_date'])
-        if not self.num_people:
-            missing.append(field_names['num_people'])
-        if not self.budget:
-            missing.append(field_names['budget'])
-
-        return missing
+        return list(self._missing_fields())
 
 
 class ChatSession(BaseModel):
@@ -59,3 +188,6 @@ class ChatSession(BaseModel):
     session_id: str
     travel_info: TravelInfo
     conversation_history: List[dict] = []
+    token_usage: Dict[str, int] = {}  # 本会话累计的模型调用次数与 token 用量
+    destination_context: Optional[DestinationContext] = None  # 确认目的地后预取的地图数据
+    history_bytes_saved: int = 0  # 历史压缩为本会话累计节省的字节数
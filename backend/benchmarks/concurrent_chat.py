@@ -0,0 +1,78 @@
+"""
+并发聊天压测：验证 /api/chat 不再阻塞事件循环。
+
+启动本地假上游（每次调用固定耗时 latency 秒），并发发送 N 个 /api/chat 请求。
+若 LLM 调用是非阻塞的，总耗时应接近一次调用的耗时，而不是 N 倍。
+
+每条消息内容不同，且关闭规则快速路径、轮次缓存与客户端限速，保证每个请求都真正调用一次上游
+（不会被规则直接回答，也不会被 single-flight 合并）；上游调用次数不足 N 时视为失败。
+
+用法：
+    python -m backend.benchmarks.concurrent_chat -n 20 --latency 1.0
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+from .fake_openai import FakeOpenAIServer
+
+
+async def run(n: int) -> float:
+    from backend.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=120) as client:
+        async def one(i: int):
+            resp = await client.post("/api/chat", json={"message": f"第{i}个问题：想找个安静点、不太商业化的地方走走"})
+            resp.raise_for_status()
+            return resp.json()
+
+        # 预热：首个请求包含 Agent 懒加载与连接建立，不计入统计
+        await one(0)
+
+        try:
+            t0 = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(n)))
+            return time.perf_counter() - t0
+        finally:
+            # 与服务关闭时相同：取消并等待后台预取任务，关闭共享的HTTP客户端
+            await app.router.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/api/chat 并发压测")
+    parser.add_argument("-n", "--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=1.0, help="假上游每次调用耗时（秒）")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--max-ratio", type=float, default=2.0,
+                        help="总耗时 / 单次调用耗时 的上限，超过则以非零状态退出")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(port=args.port, latency=args.latency) as server:
+        os.environ["KIMI_API_KEY"] = "sk-fake"
+        os.environ["KIMI_BASE_URL"] = server.base_url
+        # 需在导入 backend.main 之前设置：每个请求都走模型调用
+        os.environ["RULE_FAST_PATH"] = "0"
+        os.environ["TURN_CACHE_ENABLED"] = "0"
+        os.environ["KIMI_RPM"] = "0"
+        elapsed = asyncio.run(run(args.concurrency))
+        upstream_calls = server.app.state.requests - 1
+
+    ratio = elapsed / args.latency
+    print(f"concurrency={args.concurrency} latency={args.latency:.2f}s "
+          f"elapsed={elapsed:.2f}s ratio={ratio:.2f} upstream_calls={upstream_calls}")
+    if upstream_calls < args.concurrency:
+        print(f"FAIL: 只有 {upstream_calls} 次上游调用，少于并发请求数 {args.concurrency}，压测没有覆盖模型调用")
+        sys.exit(1)
+    if ratio > args.max_ratio:
+        print(f"FAIL: {args.concurrency} 个并发请求耗时为单次调用的 {ratio:.1f} 倍")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
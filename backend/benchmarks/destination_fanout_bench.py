@@ -0,0 +1,81 @@
+"""
+目的地确认后“地图就绪”耗时：对比前端原来的依次请求（地理编码 -> 美食 -> 酒店 -> 天气）
+与服务端并发预取（地理编码后天气与各类 POI 并发）。
+
+使用本地固定数据，并为每次数据源调用加上模拟耗时；每轮清空缓存，只比较冷启动。
+
+用法：
+    python -m backend.benchmarks.destination_fanout_bench --latency 0.2 --rounds 5
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from backend.base import POI
+from backend.cache import TTLCache
+from backend.destination_context import DestinationContextService, FixtureDestinationProvider
+from backend.poi_service import FixturePOIProvider, POIService
+
+CATEGORIES = ["food", "hotel"]
+
+
+class SlowPOIProvider(FixturePOIProvider):
+    """为每次查询加上模拟耗时的固定数据源"""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+
+    async def search_nearby(self, lng: float, lat: float, category: str, radius: int) -> List[POI]:
+        await asyncio.sleep(self.latency)
+        return await super().search_nearby(lng, lat, category, radius)
+
+
+def make_service(latency: float) -> DestinationContextService:
+    fixture = FixtureDestinationProvider(latency=latency)
+    return DestinationContextService(
+        geocoder=fixture,
+        weather=fixture,
+        poi_service=POIService(SlowPOIProvider(latency), TTLCache(1000)),
+        geocode_cache=TTLCache(1000),
+        weather_cache=TTLCache(1000)
+    )
+
+
+async def sequential(service: DestinationContextService, destination: str):
+    point = await service.geocoder.geocode(destination)
+    for category in CATEGORIES:
+        await service.poi_service.search(point.lng, point.lat, category)
+    await service.weather.live(point.adcode)
+
+
+async def run(latency: float, rounds: int, destination: str):
+    seq_ms, fan_ms = [], []
+    for _ in range(rounds):
+        service = make_service(latency)
+        t0 = time.perf_counter()
+        await sequential(service, destination)
+        seq_ms.append((time.perf_counter() - t0) * 1000)
+
+        service = make_service(latency)
+        t0 = time.perf_counter()
+        ctx = await service.build(destination, CATEGORIES)
+        fan_ms.append((time.perf_counter() - t0) * 1000)
+        assert not ctx.errors, ctx.errors
+    print(f"per-call latency {latency * 1000:.0f} ms, destination {destination}, {rounds} rounds")
+    print(f"sequential  avg {sum(seq_ms) / rounds:7.1f} ms")
+    print(f"fan-out     avg {sum(fan_ms) / rounds:7.1f} ms   timings {ctx.timings_ms}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="目的地预取耗时对比")
+    parser.add_argument("--latency", type=float, default=0.2, help="模拟的单次数据源调用耗时（秒）")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--destination", default="西湖")
+    args = parser.parse_args()
+    asyncio.run(run(args.latency, args.rounds, args.destination))
+
+
+if __name__ == "__main__":
+    main()
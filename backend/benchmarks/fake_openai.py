@@ -0,0 +1,273 @@
+"""
+本地 OpenAI 兼容假服务，用于离线压测（不调用付费的 Kimi 接口）。
+
+- GET /v1/models：返回固定的模型列表（健康探测用）。
+- POST /v1/chat/completions：若请求携带 tools，则以 tool_call 形式返回一个固定的 AgentResponse；
+  否则返回普通文本回复。
+- 请求携带 stream=true 时以 SSE 分块返回（工具调用参数/文本按小片段逐块输出）。
+- 每次请求按 --latency 模拟上游耗时（asyncio.sleep，不占用CPU）；流式时为首包耗时。
+  --jitter 在 latency 上下均匀抖动；--error-rate 按比例随机返回 503，模拟不稳定的上游。
+- 地名补全请求（系统提示为地点标准化）返回 {"suggestion": 原始名称, "alternatives": []} 形式的 JSON；
+  批量补全（编号列表）返回 {"results": [{"id": 编号, "suggestion": ..., "alternatives": []}]}。
+- app.state.failures 中排队的状态码（如 429/503）会依次返回给后续请求，可用 app.state.retry_after
+  附带 Retry-After 头，用于模拟上游限流/故障。
+- usage 按消息长度估算；系统消息与之前请求完全相同时计入 cached_tokens，模拟服务端前缀缓存。
+
+用法：
+    python -m backend.benchmarks.fake_openai --port 9100 --latency 1.0
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+CANNED_AGENT_RESPONSE = {
+    "extracted_info": {
+        "destination": "杭州",
+        "start_date": None,
+        "end_date": None,
+        "num_people": 2,
+        "budget": None,
+        "preferences": None
+    },
+    "response": "好的，两位去杭州！请问您计划哪天出发、哪天返回？预算大概多少？",
+    "is_complete": False
+}
+
+
+# 地名补全提示中的原始名称（见 destination_normalizer.build_normalize_messages）
+_NORMALIZE_NAME = re.compile(r"原始名称: (.+)")
+# 批量补全提示中的编号与名称（见 destination_normalizer.build_batch_normalize_messages）
+_BATCH_ITEM = re.compile(r"^(\d+)\. 原始名称: (.+?) \| 城市提示:", re.MULTILINE)
+
+STREAM_PIECE_CHARS = 8
+STREAM_PIECE_DELAY = 0.01
+
+
+def _usage(app: FastAPI, body: dict, completion: str) -> dict:
+    """估算本次请求的 token 用量；系统消息逐字节相同时视为命中前缀缓存"""
+    from backend.agents.token_budget import estimate_tokens
+
+    messages = body.get("messages") or []
+    prompt_tokens = sum(estimate_tokens(str(m.get("content") or "")) for m in messages)
+    cached_tokens = 0
+    if messages and messages[0].get("role") == "system":
+        system = str(messages[0].get("content") or "")
+        if system in app.state.seen_prefixes:
+            cached_tokens = estimate_tokens(system)
+        app.state.seen_prefixes.add(system)
+    completion_tokens = estimate_tokens(completion)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached_tokens}
+    }
+
+
+def _text_reply(body: dict) -> str:
+    """普通文本回复：地名补全请求返回补全 JSON，其余（如健康探测）返回 pong"""
+    messages = body.get("messages") or []
+    system = str(messages[0].get("content") or "") if messages else ""
+    if "地点标准化" in system:
+        prompt = str(messages[-1].get("content") or "")
+        batch = _BATCH_ITEM.findall(prompt)
+        if batch:
+            results = [{"id": int(i), "suggestion": name.strip(), "alternatives": []} for i, name in batch]
+            return json.dumps({"results": results}, ensure_ascii=False)
+        match = _NORMALIZE_NAME.search(str(messages[-1].get("content") or ""))
+        name = match.group(1).strip() if match else ""
+        return json.dumps({"suggestion": name, "alternatives": []}, ensure_ascii=False)
+    return "pong"
+
+
+def _stream_chunks(body: dict, tool_name: str, payload: str, usage: dict = None):
+    """按 OpenAI 流式格式逐块输出 payload（工具调用参数或文本）"""
+    chunk_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+    def chunk(delta: dict, finish_reason=None) -> str:
+        data = {
+            "id": chunk_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    async def gen():
+        if tool_name:
+            yield chunk({"role": "assistant", "content": None, "tool_calls": [{
+                "index": 0,
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": tool_name, "arguments": ""}
+            }]})
+        else:
+            yield chunk({"role": "assistant", "content": ""})
+        for i in range(0, len(payload), STREAM_PIECE_CHARS):
+            piece = payload[i:i + STREAM_PIECE_CHARS]
+            if tool_name:
+                yield chunk({"tool_calls": [{"index": 0, "function": {"arguments": piece}}]})
+            else:
+                yield chunk({"content": piece})
+            await asyncio.sleep(STREAM_PIECE_DELAY)
+        yield chunk({}, finish_reason="tool_calls" if tool_name else "stop")
+        if usage is not None:
+            data = {
+                "id": chunk_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [],
+                "usage": usage
+            }
+            yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return gen()
+
+
+def create_app(
+    latency: float = 0.5,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    seed: int = None
+) -> FastAPI:
+    """
+    创建假服务应用
+
+    Args:
+        latency: 每次补全请求的模拟耗时（秒）
+        jitter: 耗时在 latency 上下的均匀抖动幅度（秒）
+        error_rate: 随机返回 503 的比例（0~1）
+        seed: 随机种子，相同种子下抖动与故障序列可复现
+
+    Returns:
+        FastAPI 应用
+    """
+    app = FastAPI()
+    app.state.latency = latency
+    app.state.jitter = jitter
+    app.state.error_rate = error_rate
+    app.state.rng = random.Random(seed)
+    app.state.injected_errors = 0
+    app.state.requests = 0
+    app.state.seen_prefixes = set()
+    app.state.failures = []
+    app.state.retry_after = None
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": "kimi-k2-0905", "object": "model", "owned_by": "fake"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        rng = app.state.rng
+        await asyncio.sleep(max(0.0, app.state.latency + rng.uniform(-app.state.jitter, app.state.jitter)))
+
+        if not app.state.failures and app.state.error_rate and rng.random() < app.state.error_rate:
+            app.state.injected_errors += 1
+            app.state.failures.append(503)
+        if app.state.failures:
+            status = app.state.failures.pop(0)
+            headers = {"retry-after": str(app.state.retry_after)} if app.state.retry_after is not None else {}
+            return JSONResponse(
+                {"error": {"message": f"fake upstream error {status}", "type": "fake_error", "code": status}},
+                status_code=status,
+                headers=headers
+            )
+
+        tools = body.get("tools") or []
+        if body.get("stream"):
+            tool_name = tools[0].get("function", {}).get("name", "AgentResponse") if tools else ""
+            payload = json.dumps(CANNED_AGENT_RESPONSE, ensure_ascii=False) if tools else _text_reply(body)
+            include_usage = (body.get("stream_options") or {}).get("include_usage")
+            usage = _usage(app, body, payload) if include_usage else None
+            return StreamingResponse(_stream_chunks(body, tool_name, payload, usage), media_type="text/event-stream")
+
+        if tools:
+            name = tools[0].get("function", {}).get("name", "AgentResponse")
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {
+                        "name": name,
+                        "arguments": json.dumps(CANNED_AGENT_RESPONSE, ensure_ascii=False)
+                    }
+                }]
+            }
+            finish_reason = "tool_calls"
+        else:
+            message = {"role": "assistant", "content": _text_reply(body)}
+            finish_reason = "stop"
+
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": _usage(app, body, json.dumps(message, ensure_ascii=False))
+        }
+
+    return app
+
+
+class FakeOpenAIServer:
+    """在后台线程中运行假服务，便于在压测脚本中启停"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 9100,
+        latency: float = 0.5,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = None
+    ):
+        import uvicorn
+
+        self.app = create_app(latency=latency, jitter=jitter, error_rate=error_rate, seed=seed)
+        self.base_url = f"http://{host}:{port}/v1"
+        config = uvicorn.Config(self.app, host=host, port=port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容假服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    app = create_app(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=args.seed)
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,78 @@
+"""
+指标模块场景验证：直方图分位数、Prometheus 导出与 /api/stats 序列化，不调用任何上游。
+
+每个场景打印 PASS/FAIL，任一失败时退出码为 1。
+
+用法：
+    python -m backend.benchmarks.metrics_scenarios
+"""
+import asyncio
+import json
+import math
+import sys
+
+import httpx
+
+from backend.metrics import Histogram
+
+
+def quantiles_use_bucket_upper_bound():
+    histogram = Histogram("t_seconds", "test", ("path",), buckets=(0.1, 1.0, 10.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, "llm")
+    assert histogram.quantile(0.5, "llm") == 1.0
+    assert histogram.quantile(0.99, "llm") == 10.0
+    assert histogram.quantile(0.5, "fast") is None
+
+
+def overflow_quantile_is_clamped_to_top_bucket():
+    histogram = Histogram("t_seconds", "test", ("path",), buckets=(0.1, 1.0, 10.0))
+    histogram.observe(75.0, "llm")
+    assert histogram.quantile(0.5, "llm") == 10.0
+    assert histogram.quantile(0.99, "llm") == 10.0
+    stats = histogram.stats()["llm"]
+    assert all(math.isfinite(v) for v in stats.values()), stats
+    json.dumps(stats, allow_nan=False)
+    # Prometheus 导出中溢出观测仍计入 +Inf 桶
+    assert 't_seconds_bucket{path="llm",le="10"} 0' in histogram.render()
+    assert 't_seconds_bucket{path="llm",le="+Inf"} 1' in histogram.render()
+
+
+async def stats_endpoint_survives_overflow_observation():
+    import backend.main as main
+
+    main.metrics.chat_request_seconds.observe(75.0, "chat", "llm")
+    main.metrics.chat_stage_seconds.observe(75.0, "chat", "llm")
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/stats")
+        assert response.status_code == 200, response.text
+        latency = response.json()["chat"]["latency"]["chat/llm"]
+        assert latency["p99_ms"] == 60000.0, latency
+        assert (await client.get("/metrics")).status_code == 200
+
+
+SCENARIOS = [
+    quantiles_use_bucket_upper_bound,
+    overflow_quantile_is_clamped_to_top_bucket,
+    stats_endpoint_survives_overflow_observation,
+]
+
+
+def main() -> int:
+    failed = 0
+    for scenario in SCENARIOS:
+        try:
+            if asyncio.iscoroutinefunction(scenario):
+                asyncio.run(scenario())
+            else:
+                scenario()
+            print(f"PASS  {scenario.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"FAIL  {scenario.__name__}: {type(e).__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+目的地补全基准：p50 / p99 延迟，以及由本地地名索引直接返回（不调用 LLM）的请求比例。
+
+通过本地假上游模拟 LLM 耗时，按输入文件中的名称发送 /api/normalize_destination 请求。
+默认每次请求前清空补全缓存，以单独衡量本地索引的效果（--with-cache 保留缓存）。
+
+--batch N 改为每 N 个名称发送一次 /api/normalize_destination/batch，对比批量补全的总耗时与上游调用次数。
+
+用法：
+    python -m backend.benchmarks.normalize_bench --latency 0.8 --rounds 3
+    python -m backend.benchmarks.normalize_bench --latency 0.8 --rounds 3 --batch 100
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import List, Optional, Tuple
+
+import httpx
+
+from .fake_openai import FakeOpenAIServer
+
+DEFAULT_INPUTS = os.path.join(os.path.dirname(__file__), "data", "normalize_inputs.txt")
+
+
+def load_inputs(path: str) -> List[Tuple[str, Optional[str]]]:
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            name, _, hint = line.partition("\t")
+            items.append((name, hint or None))
+    return items
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(p / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+async def run(items, rounds: int, with_cache: bool):
+    from backend.main import app
+    from backend.normalize_cache import normalize_cache
+
+    latencies: List[float] = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=60) as client:
+        for _ in range(rounds):
+            for name, hint in items:
+                if not with_cache:
+                    normalize_cache.memory.clear()
+                t0 = time.perf_counter()
+                resp = await client.post("/api/normalize_destination", json={"name": name, "city_hint": hint})
+                latencies.append((time.perf_counter() - t0) * 1000)
+                resp.raise_for_status()
+    return latencies
+
+
+async def run_batch(items, rounds: int, with_cache: bool, batch: int):
+    from backend.main import app
+    from backend.normalize_cache import normalize_cache
+
+    latencies: List[float] = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=120) as client:
+        for _ in range(rounds):
+            if not with_cache:
+                normalize_cache.memory.clear()
+            for start in range(0, len(items), batch):
+                payload = [{"name": name, "city_hint": hint} for name, hint in items[start:start + batch]]
+                t0 = time.perf_counter()
+                resp = await client.post("/api/normalize_destination/batch", json={"items": payload})
+                latencies.append((time.perf_counter() - t0) * 1000)
+                resp.raise_for_status()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="目的地补全基准")
+    parser.add_argument("--inputs", default=DEFAULT_INPUTS)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.8, help="假上游每次调用耗时（秒）")
+    parser.add_argument("--port", type=int, default=9104)
+    parser.add_argument("--with-cache", action="store_true", help="保留补全缓存（默认每次清空）")
+    parser.add_argument("--batch", type=int, default=0, help="每个批量请求包含的名称数（0 表示逐条请求）")
+    args = parser.parse_args()
+
+    items = load_inputs(args.inputs)
+    with FakeOpenAIServer(port=args.port, latency=args.latency) as server:
+        os.environ["KIMI_API_KEY"] = "sk-fake"
+        os.environ["KIMI_BASE_URL"] = server.base_url
+        t0 = time.perf_counter()
+        if args.batch:
+            latencies = asyncio.run(run_batch(items, args.rounds, args.with_cache, args.batch))
+        else:
+            latencies = asyncio.run(run(items, args.rounds, args.with_cache))
+        elapsed = time.perf_counter() - t0
+        upstream_calls = server.app.state.requests
+
+    if args.batch:
+        names = len(items) * args.rounds
+        print(f"names={names} batch_requests={len(latencies)} upstream_calls={upstream_calls} "
+              f"elapsed={elapsed:.2f}s per_name={elapsed / names * 1000:.2f}ms")
+        return
+    total = len(latencies)
+    local = total - upstream_calls
+    print(f"requests={total} upstream_calls={upstream_calls} served_locally={local / total:.1%} "
+          f"elapsed={elapsed:.2f}s")
+    print(f"p50={percentile(latencies, 50):.2f}ms p99={percentile(latencies, 99):.2f}ms "
+          f"mean={statistics.mean(latencies):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
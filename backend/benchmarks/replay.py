@@ -0,0 +1,321 @@
+"""
+离线回放压测：在子进程中启动本地 OpenAI 兼容假服务（见 fake_openai.py）作为 KIMI_BASE_URL，
+按给定并发回放录制的多轮对话（data/conversations.jsonl），不调用付费的 Kimi 接口。
+
+每段对话使用一个新会话，依次发送各轮消息到 /api/chat；某轮提取到尚未确认的目的地时，
+像前端一样调用 /api/normalize_destination 补全，再调用 confirm_destination 确认。
+
+输出吞吐（req/s）、各接口 p50/p95/p99 延迟、错误数与本进程峰值 RSS（假服务在独立进程中，不计入）。
+结果可保存为基线（baselines/replay.json，按场景参数区分），之后的运行与基线逐项比较，
+TravelInfoAgent、SessionManager 等热路径上的性能变化会以差异的形式显示出来。
+基线与机器相关，换机器后先用 --save-baseline 重新生成再比较。
+
+用法：
+    python -m backend.benchmarks.replay --concurrency 8 --repeat 20 --latency 0.05 --jitter 0.02
+    python -m backend.benchmarks.replay --save-baseline      # 更新当前场景的基线
+    python -m backend.benchmarks.replay --check              # 相对基线退化超过 --tolerance 时退出码为 1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import httpx
+
+HERE = os.path.dirname(__file__)
+REPO_ROOT = os.path.dirname(os.path.dirname(HERE))
+DEFAULT_CORPUS = os.path.join(HERE, "data", "conversations.jsonl")
+DEFAULT_BASELINE = os.path.join(HERE, "baselines", "replay.json")
+
+ENDPOINTS = ("chat", "normalize", "confirm")
+
+# 与基线比较的指标：(路径, 越大越好)
+COMPARED = [("req_per_s", True), ("peak_rss_mib", False)] + [
+    (f"endpoints.{name}.{q}", False) for name in ENDPOINTS for q in ("p50_ms", "p95_ms", "p99_ms")
+]
+
+
+def load_conversations(path: str) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """最近秩分位数"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    """按接口记录每次请求的耗时与非 2xx 状态码"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {name: [] for name in ENDPOINTS}
+        self.errors: Dict[str, Counter] = {name: Counter() for name in ENDPOINTS}
+
+    async def call(self, endpoint: str, request) -> Optional[Dict]:
+        """
+        发送请求并记录耗时
+
+        Args:
+            endpoint: 接口名（chat / normalize / confirm）
+            request: 尚未 await 的请求协程
+
+        Returns:
+            成功时的响应 JSON，失败时为 None
+        """
+        t0 = time.perf_counter()
+        try:
+            resp = await request
+        except httpx.HTTPError as e:
+            self.errors[endpoint][type(e).__name__] += 1
+            return None
+        finally:
+            self.latencies[endpoint].append(time.perf_counter() - t0)
+        if resp.status_code >= 400:
+            self.errors[endpoint][str(resp.status_code)] += 1
+            return None
+        return resp.json()
+
+    def summary(self) -> Dict[str, Dict]:
+        result = {}
+        for name in ENDPOINTS:
+            values = sorted(self.latencies[name])
+            result[name] = {
+                "count": len(values),
+                "errors": dict(self.errors[name]),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 2)
+            }
+        return result
+
+
+async def replay_conversation(client: httpx.AsyncClient, conversation: Dict, recorder: Recorder, confirm: bool):
+    """回放一段对话（新会话），提取到目的地后补全并确认"""
+    session_id = None
+    for turn in conversation["turns"]:
+        body = await recorder.call(
+            "chat", client.post("/api/chat", json={"session_id": session_id, "message": turn["message"]})
+        )
+        if body is None:
+            continue
+        session_id = body["session_id"]
+        info = body["travel_info"]
+        if not confirm or not info.get("destination") or info.get("destination_confirmed"):
+            continue
+        normalized = await recorder.call(
+            "normalize", client.post("/api/normalize_destination", json={"name": info["destination"]})
+        )
+        destination = normalized["suggestion"] if normalized else info["destination"]
+        await recorder.call(
+            "confirm",
+            client.post(f"/api/session/{session_id}/confirm_destination", json={"destination": destination})
+        )
+
+
+async def run_replay(conversations: List[Dict], concurrency: int, repeat: int, confirm: bool) -> Dict:
+    """
+    以 concurrency 段对话同时进行的方式回放语料 repeat 遍
+
+    Returns:
+        吞吐、各接口延迟与峰值 RSS
+    """
+    from backend.main import app
+
+    # 每轮的 INFO 日志会占据不少时间，压测时只保留警告与错误
+    logging.disable(logging.INFO)
+    recorder = Recorder()
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(repeat):
+        for conversation in conversations:
+            queue.put_nowait(conversation)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=120) as client:
+        # 预热：首个请求包含 Agent 懒加载与连接建立，不计入统计
+        await client.post("/api/chat", json={"message": "你好"})
+
+        async def worker():
+            while not queue.empty():
+                await replay_conversation(client, queue.get_nowait(), recorder, confirm)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    endpoints = recorder.summary()
+    total = sum(e["count"] for e in endpoints.values())
+    return {
+        "requests": total,
+        "errors": sum(sum(e["errors"].values()) for e in endpoints.values()),
+        "elapsed_s": round(elapsed, 3),
+        "req_per_s": round(total / elapsed, 1),
+        # Linux 上 ru_maxrss 单位为 KiB
+        "peak_rss_mib": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "endpoints": endpoints
+    }
+
+
+class FakeUpstream:
+    """在独立进程中运行假服务，避免其内存与 CPU 计入被测进程"""
+
+    def __init__(self, port: int, latency: float, jitter: float, error_rate: float, seed: int):
+        self.port = port
+        self.base_url = f"http://127.0.0.1:{port}/v1"
+        self._args = [
+            sys.executable, "-m", "backend.benchmarks.fake_openai", "--port", str(port),
+            "--latency", str(latency), "--jitter", str(jitter), "--error-rate", str(error_rate), "--seed", str(seed)
+        ]
+        self._proc: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> "FakeUpstream":
+        self._proc = subprocess.Popen(self._args, cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 15
+        while time.monotonic() < deadline:
+            try:
+                httpx.get(f"{self.base_url}/models", timeout=0.5).raise_for_status()
+                return self
+            except httpx.HTTPError:
+                if self._proc.poll() is not None:
+                    break
+                time.sleep(0.1)
+        self.__exit__()
+        raise RuntimeError(f"fake upstream did not start on port {self.port}")
+
+    def __exit__(self, *exc):
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.terminate()
+            self._proc.wait(timeout=5)
+
+
+def scenario_name(args: argparse.Namespace) -> str:
+    """基线按场景参数区分，参数不同的结果不会互相比较"""
+    name = (f"c{args.concurrency}-r{args.repeat}-lat{args.latency * 1000:g}ms"
+            f"-jit{args.jitter * 1000:g}ms-err{args.error_rate:g}")
+    if args.no_fast_path:
+        name += "-llm-only"
+    if args.no_confirm:
+        name += "-chat-only"
+    if args.rpm < 1e6:
+        name += f"-rpm{args.rpm:g}"
+    return name
+
+
+def _lookup(report: Dict, path: str) -> Optional[float]:
+    value = report
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float, min_delta_ms: float) -> List[str]:
+    """
+    打印与基线的逐项差异
+
+    Args:
+        baseline: 基线结果
+        current: 本次结果
+        tolerance: 允许的相对退化比例
+        min_delta_ms: 延迟指标的绝对变化小于该值时不算退化（亚毫秒级的延迟相对波动很大）
+
+    Returns:
+        退化超过 tolerance（相对变化）的指标列表
+    """
+    regressions = []
+    print(f"{'metric':<28}{'baseline':>12}{'current':>12}{'change':>10}")
+    for path, higher_is_better in COMPARED:
+        old, new = _lookup(baseline, path), _lookup(current, path)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        noise = path.endswith("_ms") and abs(new - old) < min_delta_ms
+        flag = "  REGRESSED" if worse > tolerance and not noise else ""
+        print(f"{path:<28}{old:>12.1f}{new:>12.1f}{change * 100:>+9.1f}%{flag}")
+        if flag:
+            regressions.append(path)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="录制对话离线回放压测")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="同时进行的对话数")
+    parser.add_argument("-r", "--repeat", type=int, default=20, help="语料回放遍数")
+    parser.add_argument("--latency", type=float, default=0.05, help="假上游每次调用耗时（秒）")
+    parser.add_argument("--jitter", type=float, default=0.02, help="假上游耗时抖动（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="假上游随机返回 503 的比例")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--port", type=int, default=9140)
+    parser.add_argument("--rpm", type=float, default=1e6,
+                        help="Kimi 客户端限速（次/分钟）；假上游没有配额，默认不限速，只测服务端本身")
+    parser.add_argument("--no-fast-path", action="store_true", help="关闭规则快速路径，每轮都调用模型")
+    parser.add_argument("--no-confirm", action="store_true", help="只回放 /api/chat，不补全/确认目的地")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="将本次结果保存为当前场景的基线")
+    parser.add_argument("--check", action="store_true", help="相对基线退化超过 tolerance 时以非零状态退出")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许的相对退化比例")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="延迟指标按绝对变化计的噪声下限（毫秒）")
+    args = parser.parse_args()
+
+    conversations = load_conversations(args.corpus)
+    name = scenario_name(args)
+
+    with FakeUpstream(args.port, args.latency, args.jitter, args.error_rate, args.seed) as upstream:
+        # 需在导入 backend.main 之前设置
+        os.environ["KIMI_API_KEY"] = "sk-fake"
+        os.environ["KIMI_BASE_URL"] = upstream.base_url
+        os.environ["KIMI_RPM"] = str(args.rpm)
+        # 确认目的地时的地理编码与 POI 预取使用本地固定数据，不调用高德
+        os.environ.setdefault("POI_PROVIDER", "fixture")
+        os.environ.setdefault("DEST_PROVIDER", "fixture")
+        if args.no_fast_path:
+            os.environ["RULE_FAST_PATH"] = "0"
+        report = asyncio.run(run_replay(conversations, args.concurrency, args.repeat, not args.no_confirm))
+
+    print(f"scenario {name}: {len(conversations)} conversations x {args.repeat}")
+    print(f"{report['requests']} requests in {report['elapsed_s']:.2f}s = {report['req_per_s']:.1f} req/s, "
+          f"errors {report['errors']}, peak RSS {report['peak_rss_mib']:.1f} MiB")
+    for endpoint, summary in report["endpoints"].items():
+        print(f"  {endpoint:<10} n={summary['count']:<5} p50 {summary['p50_ms']:8.1f} ms  "
+              f"p95 {summary['p95_ms']:8.1f} ms  p99 {summary['p99_ms']:8.1f} ms  errors {summary['errors']}")
+
+    baselines: Dict = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baselines = json.load(f)
+
+    regressions = []
+    if name in baselines:
+        print(f"\ncompared with baseline ({args.baseline}):")
+        regressions = compare(baselines[name], report, args.tolerance, args.min_delta_ms)
+    else:
+        print(f"\nno baseline for scenario {name}")
+
+    if args.save_baseline:
+        baselines[name] = report
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline saved for scenario {name}")
+
+    if args.check and regressions:
+        print(f"FAIL: {len(regressions)} metric(s) regressed more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+弹性层（限速 / 重试 / 熔断）场景验证：使用本地假服务模拟上游 429/5xx，不调用付费接口。
+
+每个场景打印 PASS/FAIL，任一失败时退出码为 1。
+
+用法：
+    python -m backend.benchmarks.resilience_scenarios
+"""
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+from langchain_core.messages import HumanMessage
+from langchain_openai import ChatOpenAI
+
+from backend.benchmarks.fake_openai import FakeOpenAIServer
+from backend.resilience import CircuitBreaker, ResilientCaller, TokenBucket, UpstreamUnavailable
+
+PORT = 9131
+
+
+def make_caller(rpm: float = 0, burst: int = 10, threshold: int = 3, reset: float = 0.3,
+                attempts: int = 3) -> ResilientCaller:
+    return ResilientCaller(
+        bucket=TokenBucket(rate_per_minute=rpm, burst=burst),
+        breaker=CircuitBreaker(failure_threshold=threshold, reset_timeout=reset),
+        max_attempts=attempts,
+        base_delay=0.05,
+        max_delay=1.0
+    )
+
+
+def make_llm(base_url: str, client: httpx.AsyncClient) -> ChatOpenAI:
+    # SDK 自带重试关闭，只由弹性层重试；每个场景使用自己的连接池（场景之间事件循环不同）
+    return ChatOpenAI(model="kimi-k2-0905", api_key="sk-fake", base_url=base_url, max_retries=0,
+                      http_async_client=client)
+
+
+async def run_scenario(scenario, server: FakeOpenAIServer):
+    async with httpx.AsyncClient() as client:
+        await scenario(server, make_llm(server.base_url, client))
+
+
+async def retry_after_is_honored(server: FakeOpenAIServer, llm: ChatOpenAI):
+    caller = make_caller()
+    server.app.state.failures = [429]
+    server.app.state.retry_after = 0.3
+    t0 = time.perf_counter()
+    await caller.call(lambda: llm.ainvoke([HumanMessage(content="ping")]))
+    elapsed = time.perf_counter() - t0
+    assert caller.retries == 1, caller.stats()
+    assert elapsed >= 0.3, f"retried after {elapsed:.2f}s, Retry-After was 0.3s"
+
+
+async def transient_5xx_recovers(server: FakeOpenAIServer, llm: ChatOpenAI):
+    caller = make_caller()
+    server.app.state.failures = [500, 502]
+    server.app.state.retry_after = None
+    await caller.call(lambda: llm.ainvoke([HumanMessage(content="ping")]))
+    assert caller.retries == 2 and caller.breaker.state == CircuitBreaker.CLOSED, caller.stats()
+
+
+async def outage_opens_breaker_and_fails_fast(server: FakeOpenAIServer, llm: ChatOpenAI):
+    caller = make_caller(threshold=3, reset=0.5)
+    server.app.state.failures = [503] * 10
+    server.app.state.retry_after = None
+    try:
+        await caller.call(lambda: llm.ainvoke([HumanMessage(content="ping")]))
+        raise AssertionError("expected UpstreamUnavailable")
+    except UpstreamUnavailable as e:
+        assert e.status_code == 503 and e.retry_after >= 1
+    assert caller.breaker.state == CircuitBreaker.OPEN, caller.stats()
+
+    before = server.app.state.requests
+    t0 = time.perf_counter()
+    for _ in range(20):
+        try:
+            await caller.call(lambda: llm.ainvoke([HumanMessage(content="ping")]))
+        except UpstreamUnavailable:
+            pass
+    assert server.app.state.requests == before, "open breaker must not reach the upstream"
+    assert time.perf_counter() - t0 < 0.05, "open breaker must fail fast"
+
+
+async def half_open_trial_closes_breaker(server: FakeOpenAIServer, llm: ChatOpenAI):
+    caller = make_caller(threshold=1, reset=0.2, attempts=1)
+    server.app.state.failures = [503]
+    try:
+        await caller.call(lambda: llm.ainvoke([HumanMessage(content="ping")]))
+    except UpstreamUnavailable:
+        pass
+    assert caller.breaker.state == CircuitBreaker.OPEN
+    await asyncio.sleep(0.25)
+    await caller.call(lambda: llm.ainvoke([HumanMessage(content="ping")]))
+    assert caller.breaker.state == CircuitBreaker.CLOSED, caller.stats()
+
+
+async def client_errors_are_not_retried(server: FakeOpenAIServer, llm: ChatOpenAI):
+    caller = make_caller()
+    server.app.state.failures = [400]
+    try:
+        await caller.call(lambda: llm.ainvoke([HumanMessage(content="ping")]))
+        raise AssertionError("expected BadRequestError")
+    except UpstreamUnavailable:
+        raise AssertionError("400 must not be reported as upstream outage")
+    except Exception as e:
+        assert type(e).__name__ == "BadRequestError", e
+    assert caller.retries == 0 and caller.breaker.failures == 0, caller.stats()
+
+
+async def token_bucket_paces_calls(server: FakeOpenAIServer, llm: ChatOpenAI):
+    caller = make_caller(rpm=600, burst=2)  # 10 次/秒
+    t0 = time.perf_counter()
+    await asyncio.gather(*[caller.call(lambda: llm.ainvoke([HumanMessage(content="ping")])) for _ in range(6)])
+    elapsed = time.perf_counter() - t0
+    assert elapsed >= 0.35, f"6 calls at 10/s with burst 2 finished in {elapsed:.2f}s"
+    assert caller.bucket.throttled == 4, caller.stats()
+
+
+async def cancelled_wait_returns_token(server: FakeOpenAIServer, llm: ChatOpenAI):
+    bucket = TokenBucket(rate_per_minute=60, burst=1)  # 1 次/秒
+    await bucket.acquire()
+    waiter = asyncio.ensure_future(bucket.acquire())
+    await asyncio.sleep(0.05)
+    waiter.cancel()
+    try:
+        await waiter
+    except asyncio.CancelledError:
+        pass
+    # 被取消的等待者归还了令牌：桶中的令牌数与从未排队时一致（约 0.05 个，而不是负数）
+    assert bucket.stats()["tokens"] >= 0, bucket.stats()
+
+
+async def agent_does_not_retry_client_errors(server: FakeOpenAIServer, llm: ChatOpenAI):
+    import backend.main as main
+
+    agent = main.get_travel_agent()
+    before = server.app.state.requests
+    server.app.state.failures = [400, 400, 400]
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/api/chat", json={"message": "随便聊聊"})
+    # 400 不可重试：弹性层与 Agent 都不重试，上游只收到一次请求，本轮使用兜底回复
+    assert response.status_code == 200, response.text
+    assert server.app.state.requests - before == 1, server.app.state.requests - before
+    assert agent.retries == 0, agent.stats()
+    server.app.state.failures = []
+
+
+async def chat_endpoint_returns_503_with_retry_after(server: FakeOpenAIServer, llm: ChatOpenAI):
+    import backend.main as main
+
+    main.kimi_resilience.breaker.failure_threshold = 2
+    main.kimi_resilience.base_delay = 0.01
+    server.app.state.failures = [503] * 10
+    server.app.state.retry_after = None
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/api/chat", json={"message": "随便聊聊"})
+        assert response.status_code == 503, response.text
+        assert int(response.headers["retry-after"]) >= 1
+        health = (await client.get("/api/kimi/health")).json()
+        assert health["resilience"]["circuit"]["state"] == "open" and health["ok"] is False, health
+    server.app.state.failures = []
+
+
+SCENARIOS = [
+    retry_after_is_honored,
+    transient_5xx_recovers,
+    outage_opens_breaker_and_fails_fast,
+    half_open_trial_closes_breaker,
+    client_errors_are_not_retried,
+    token_bucket_paces_calls,
+    cancelled_wait_returns_token,
+    agent_does_not_retry_client_errors,
+    chat_endpoint_returns_503_with_retry_after,
+]
+
+
+def main() -> int:
+    failed = 0
+    with FakeOpenAIServer(port=PORT, latency=0.01) as server:
+        os.environ.update(KIMI_API_KEY="sk-fake", KIMI_BASE_URL=server.base_url, RULE_FAST_PATH="0")
+        for scenario in SCENARIOS:
+            server.app.state.failures = []
+            server.app.state.retry_after = None
+            try:
+                asyncio.run(run_scenario(scenario, server))
+                print(f"PASS  {scenario.__name__}")
+            except Exception as e:
+                failed += 1
+                print(f"FAIL  {scenario.__name__}: {type(e).__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
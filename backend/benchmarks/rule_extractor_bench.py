@@ -0,0 +1,91 @@
+"""
+规则快速路径基准：在录制的多轮对话语料上评估准确率、覆盖率与耗时。
+
+语料（data/conversations.jsonl）每轮标注了该条消息中真实包含的信息（expected）。
+逐轮运行 extract_rules，并按标注累积会话状态，统计：
+
+- fast_path_rate：规则完整解释消息、可跳过 LLM 的轮次比例
+- confident_exact：跳过 LLM 的轮次中，抽取结果与标注完全一致的比例（越接近 100% 越安全）
+- precision / recall：规则抽取字段的准确率与召回率
+- 每次抽取耗时（微秒）
+
+用法：
+    python -m backend.benchmarks.rule_extractor_bench
+"""
+import argparse
+import json
+import os
+import time
+from datetime import date
+from typing import Dict, List
+
+from backend.agents.rule_extractor import extract_rules
+from backend.base import TravelInfo
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "conversations.jsonl")
+
+
+def load_corpus(path: str) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return float(a) == float(b)
+    return a == b
+
+
+def main():
+    parser = argparse.ArgumentParser(description="规则快速路径基准")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=200, help="耗时统计的重复次数")
+    parser.add_argument("-v", "--verbose", action="store_true", help="打印不一致的轮次")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    turns = confident = confident_exact = 0
+    extracted_fields = correct_fields = expected_fields = recalled_fields = 0
+    timings: List[float] = []
+
+    for conv in corpus:
+        today = date.fromisoformat(conv["today"])
+        info = TravelInfo()
+        for turn in conv["turns"]:
+            message, expected = turn["message"], turn["expected"]
+            t0 = time.perf_counter()
+            for _ in range(args.repeat):
+                result = extract_rules(message, info, today)
+            timings.append((time.perf_counter() - t0) / args.repeat * 1e6)
+
+            turns += 1
+            expected_fields += len(expected)
+            extracted_fields += len(result.info)
+            for key, value in result.info.items():
+                if key in expected and _same(expected[key], value):
+                    correct_fields += 1
+            recalled_fields += sum(1 for k, v in expected.items() if k in result.info and _same(result.info[k], v))
+
+            if result.confident:
+                confident += 1
+                exact = result.info.keys() == expected.keys() and all(
+                    _same(expected[k], result.info[k]) for k in expected)
+                confident_exact += exact
+                if args.verbose and not exact:
+                    print(f"[MISMATCH] {conv['id']} {message!r}: got {result.info}, expected {expected}")
+            elif args.verbose:
+                print(f"[LLM] {conv['id']} {message!r}: leftover={result.leftover!r}")
+
+            # 按标注推进会话状态（模拟 LLM 处理后的状态）
+            info = info.model_copy(update={k: v for k, v in expected.items() if k in TravelInfo.model_fields})
+
+    timings.sort()
+    print(f"conversations={len(corpus)} turns={turns}")
+    print(f"fast_path_rate={confident / turns:.1%} ({confident}/{turns} 轮无需调用 LLM)")
+    print(f"confident_exact={confident_exact / confident:.1%}" if confident else "confident_exact=n/a")
+    print(f"precision={correct_fields / extracted_fields:.1%} recall={recalled_fields / expected_fields:.1%}")
+    print(f"latency p50={timings[len(timings) // 2]:.1f}us p99={timings[int(len(timings) * 0.99)]:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
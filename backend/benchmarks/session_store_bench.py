@@ -0,0 +1,92 @@
+"""
+SQLite 会话存储多进程基准：1 / 4 / 8 个 worker 进程下的 sessions/sec，
+以及同一会话并发修改时是否丢失更新。
+
+每个会话模拟一次完整对话：创建 + TURNS 轮 mutate（追加两条历史并更新 travel_info）+ 读取。
+
+用法：
+    python -m backend.benchmarks.session_store_bench --sessions 2000 --turns 5
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from backend.base import ChatSession, TravelInfo
+from backend.session_store import SQLiteSessionStore
+
+
+def _turn(i: int):
+    def apply(session: ChatSession):
+        session.conversation_history.append({"role": "user", "content": f"第{i}轮：我们想去杭州玩几天"})
+        session.conversation_history.append({"role": "assistant", "content": "好的，请问出发日期和预算是多少？"})
+        session.travel_info.num_people = (session.travel_info.num_people or 0) + 1
+    return apply
+
+
+def _worker(args):
+    path, worker_id, count, turns = args
+    store = SQLiteSessionStore(path, idle_ttl=0)
+    for n in range(count):
+        session_id = f"w{worker_id}-{n}"
+        store.put(ChatSession(session_id=session_id, travel_info=TravelInfo(destination="杭州"), conversation_history=[]))
+        for i in range(turns):
+            store.mutate(session_id, _turn(i))
+        store.get(session_id)
+    store.close()
+
+
+def _contend(args):
+    path, session_id, turns = args
+    store = SQLiteSessionStore(path, idle_ttl=0)
+    for i in range(turns):
+        store.mutate(session_id, _turn(i))
+    store.close()
+
+
+def bench(workers: int, sessions: int, turns: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.sqlite3")
+        SQLiteSessionStore(path).close()
+        per_worker = sessions // workers
+        t0 = time.perf_counter()
+        with multiprocessing.Pool(workers) as pool:
+            pool.map(_worker, [(path, w, per_worker, turns) for w in range(workers)])
+        elapsed = time.perf_counter() - t0
+        return per_worker * workers / elapsed
+
+
+def check_no_lost_updates(workers: int, turns: int) -> bool:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.sqlite3")
+        store = SQLiteSessionStore(path, idle_ttl=0)
+        store.put(ChatSession(session_id="shared", travel_info=TravelInfo(), conversation_history=[]))
+        with multiprocessing.Pool(workers) as pool:
+            pool.map(_contend, [(path, "shared", turns)] * workers)
+        session = store.get("shared")
+        store.close()
+        expected = workers * turns
+        ok = len(session.conversation_history) == 2 * expected and session.travel_info.num_people == expected
+        print(f"contention: workers={workers} turns={expected} "
+              f"history={len(session.conversation_history)} num_people={session.travel_info.num_people} "
+              f"{'OK' if ok else 'LOST UPDATES'}")
+        return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite 会话存储多进程基准")
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    for workers in args.workers:
+        rate = bench(workers, args.sessions, args.turns)
+        print(f"workers={workers} sessions/sec={rate:.0f} (每会话 {args.turns} 轮)")
+    ok = check_no_lost_updates(max(args.workers), 50)
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+启动耗时预算检查：多次在子进程中用 python -X importtime 导入 backend.main，
+取 backend.main 累计导入耗时的最小值与预算比较，并检查较重的 SDK 没有在导入时被加载。
+
+超出预算或导入了禁止的模块时以退出码 1 结束，可直接放进 CI。
+
+用法：
+    python -m backend.benchmarks.startup_budget --budget-ms 600 --runs 5
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import List, Tuple
+
+# 这些模块应在首次调用模型（或启动预热）时才导入
+FORBIDDEN = ["langchain_openai", "langchain_core", "openai", "agno"]
+
+_CHECK = (
+    "import sys, backend.main; "
+    "print(','.join(m for m in {forbidden!r} if m in sys.modules))"
+)
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+def measure_once() -> Tuple[float, List[str]]:
+    """
+    在全新子进程中导入一次 backend.main
+
+    Returns:
+        (backend.main 累计导入耗时（毫秒）, 已加载的禁止模块列表)
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHECK.format(forbidden=FORBIDDEN)],
+        capture_output=True, text=True, check=True
+    )
+    cumulative_us = None
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match and match.group(3) == "backend.main":
+            cumulative_us = int(match.group(2))
+    if cumulative_us is None:
+        raise RuntimeError("importtime output does not contain backend.main")
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return cumulative_us / 1000, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="backend.main 导入耗时预算检查")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", "600")))
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    samples, loaded = [], []
+    for _ in range(args.runs):
+        ms, loaded = measure_once()
+        samples.append(ms)
+    best = min(samples)
+    print(f"import backend.main: min {best:.0f} ms, max {max(samples):.0f} ms over {args.runs} runs "
+          f"(budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if best > args.budget_ms:
+        print(f"FAIL: import time {best:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+        failed = True
+    if loaded:
+        print(f"FAIL: heavy modules loaded at import time: {', '.join(loaded)}")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
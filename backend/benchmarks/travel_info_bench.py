@@ -0,0 +1,138 @@
+"""
+TravelInfo 每轮开销微基准：在 N 个常驻会话上模拟一轮对话的信息合并、完整性检查与上下文渲染。
+
+对比两种实现：
+- legacy：model_dump -> 修改字典 -> TravelInfo(**data) 重建，get_missing_fields / is_complete 逐字段扫描
+- slots：TravelInfo.patch 就地校验写入，缺失字段按槽位状态缓存，上下文按已填写槽位渲染
+
+同时用 tracemalloc 统计 N 个常驻 TravelInfo 的内存占用。
+
+用法：
+    python -m backend.benchmarks.travel_info_bench --sessions 100000
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from typing import Dict, List
+
+from backend.agents.travel_info_agent import TravelInfoAgent
+from backend.base import TravelInfo
+
+# 典型的每轮提取结果（大多数轮次只填写一两个字段）
+TURNS: List[Dict] = [
+    {"destination": "杭州"},
+    {"num_people": 2},
+    {"start_date": "2025-10-01", "end_date": "2025-10-03"},
+    {"budget": 3000.0},
+    {"preferences": "美食"},
+    {"budget": 5000.0, "num_people": 3},
+]
+
+
+def legacy_update(current_info: TravelInfo, extracted_info: Dict) -> TravelInfo:
+    updated_data = current_info.model_dump()
+    dest_confirmed = bool(getattr(current_info, "destination_confirmed", False))
+    for key, value in extracted_info.items():
+        if value is None or value == "":
+            continue
+        if key == "destination" and dest_confirmed:
+            continue
+        updated_data[key] = value
+    return TravelInfo(**updated_data)
+
+
+def legacy_missing(info: TravelInfo) -> List[str]:
+    labels = {"destination": "目的地", "start_date": "开始日期", "end_date": "结束日期",
+              "num_people": "人数", "budget": "预算"}
+    return [label for name, label in labels.items() if not getattr(info, name)]
+
+
+def legacy_context(info: TravelInfo) -> str:
+    parts = ["当前已收集的信息："]
+    if info.destination:
+        parts.append(f"- 目的地：{info.destination}")
+        if getattr(info, "destination_confirmed", False):
+            parts.append("✓ 目的地已确认，请不要再次询问或要求用户确认目的地")
+    if info.start_date:
+        parts.append(f"- 开始日期：{info.start_date}")
+    if info.end_date:
+        parts.append(f"- 结束日期：{info.end_date}")
+    if info.num_people:
+        parts.append(f"- 人数：{info.num_people}人")
+    if info.budget:
+        parts.append(f"- 预算：{info.budget}元")
+    if info.preferences:
+        parts.append(f"- 偏好：{info.preferences}")
+    if len(parts) == 1:
+        parts.append("（暂无）")
+    missing = legacy_missing(info)
+    parts.append(f"\n缺失的必要信息：{', '.join(missing)}" if missing else "\n✓ 所有必要信息已收集完成")
+    return "\n".join(parts)
+
+
+def make_sessions(n: int) -> List[TravelInfo]:
+    rng = random.Random(3)
+    sessions = []
+    for _ in range(n):
+        info = TravelInfo()
+        for turn in TURNS[:rng.randrange(len(TURNS))]:
+            info.patch(turn)
+        sessions.append(info)
+    return sessions
+
+
+def run_legacy(sessions: List[TravelInfo], turns: int, rng: random.Random) -> float:
+    t0 = time.perf_counter()
+    for _ in range(turns):
+        i = rng.randrange(len(sessions))
+        info = legacy_update(sessions[i], rng.choice(TURNS))
+        sessions[i] = info
+        legacy_context(info)
+        all([info.destination, info.start_date, info.end_date, info.num_people, info.budget])
+    return (time.perf_counter() - t0) / turns * 1e6
+
+
+def run_slots(agent: TravelInfoAgent, sessions: List[TravelInfo], turns: int, rng: random.Random) -> float:
+    t0 = time.perf_counter()
+    for _ in range(turns):
+        info = sessions[rng.randrange(len(sessions))]
+        agent.update_travel_info(info, rng.choice(TURNS), in_place=True)
+        agent._build_context(info)
+        info.is_complete()
+    return (time.perf_counter() - t0) / turns * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TravelInfo 每轮开销微基准")
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--turns", type=int, default=200000)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = make_sessions(args.sessions)
+    resident = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"{args.sessions:,} live TravelInfo: {resident / 1024 / 1024:.1f} MiB "
+          f"({resident / args.sessions:.0f} B/session)")
+
+    # 不调用模型，只使用 Agent 的合并与上下文渲染方法
+    agent = TravelInfoAgent.__new__(TravelInfoAgent)
+    legacy_sessions = [info.model_copy() for info in sessions]
+    gc.collect()
+    legacy_us = run_legacy(legacy_sessions, args.turns, random.Random(5))
+    gc.collect()
+    slots_us = run_slots(agent, sessions, args.turns, random.Random(5))
+    print(f"legacy  {legacy_us:6.2f} us/turn  (model_dump + rebuild + field scans)")
+    print(f"slots   {slots_us:6.2f} us/turn  (in-place patch + cached missing fields)")
+
+    for legacy, slots in zip(legacy_sessions[:1000], sessions[:1000]):
+        assert legacy.model_dump() == slots.model_dump()
+        assert legacy_context(legacy) == agent._build_context(slots)
+    print("legacy and slot-tracked sessions render identical context")
+
+
+if __name__ == "__main__":
+    main()
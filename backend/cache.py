@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[V]):
+    """
+    线程安全的 LRU + TTL 内存缓存
+
+    - 超过 max_size 时淘汰最久未使用的条目
+    - 条目写入 ttl 秒后过期（<=0 表示永不过期）
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 0):
+        """
+        初始化缓存
+
+        Args:
+            max_size: 最大条目数（<=0 表示不限制）
+            ttl: 默认过期时间（秒）
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        # key -> (值, 过期时间点)
+        self._data: "OrderedDict[Hashable, Tuple[V, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Optional[V]:
+        """读取缓存，未命中或已过期时返回 default"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at and now >= expires_at:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: Hashable, default: Any = None) -> Optional[V]:
+        """读取缓存但不计入命中统计、不调整淘汰顺序（用于检查预热状态）"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or (entry[1] and now >= entry[1]):
+                return default
+            return entry[0]
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None):
+        """
+        写入缓存
+
+        Args:
+            key: 键
+            value: 值
+            ttl: 本条目的过期时间（秒），默认使用缓存的 ttl
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl and ttl > 0 else 0
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            if self.max_size > 0:
+                while len(self._data) > self.max_size:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._data.pop(key, _MISSING) is not _MISSING
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            return entry is not _MISSING and not (entry[1] and now >= entry[1])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def stats(self) -> Dict:
+        """缓存统计"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
@@ -0,0 +1,413 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, TypeVar
+
+from .base import DestinationContext, Weather
+from .cache import TTLCache
+from .poi_service import POIService, get_amap_http_client, get_poi_service
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "data", "destination_fixture.json")
+
+AMAP_GEOCODE_URL = "https://restapi.amap.com/v3/geocode/geo"
+AMAP_WEATHER_URL = "https://restapi.amap.com/v3/weather/weatherInfo"
+
+
+class GeoPoint(NamedTuple):
+    """地理编码结果"""
+    lng: float
+    lat: float
+    city: Optional[str]
+    adcode: Optional[str]
+
+
+class Geocoder(ABC):
+    """地理编码数据源"""
+
+    @abstractmethod
+    async def geocode(self, address: str) -> Optional[GeoPoint]:
+        """
+        地名 -> 坐标
+
+        Args:
+            address: 地名或地址
+
+        Returns:
+            GeoPoint，无结果时返回 None
+        """
+
+
+class WeatherProvider(ABC):
+    """天气数据源"""
+
+    @abstractmethod
+    async def live(self, adcode: str) -> Optional[Weather]:
+        """
+        查询实况天气
+
+        Args:
+            adcode: 行政区编码
+
+        Returns:
+            Weather，无结果时返回 None
+        """
+
+
+async def _amap_get(url: str, params: Dict, timeout: float) -> Dict:
+    response = await get_amap_http_client().get(url, params=params, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    if str(data.get("status")) != "1":
+        raise RuntimeError(f"AMap request failed: {data.get('info')} ({data.get('infocode')})")
+    return data
+
+
+def _amap_str(value) -> Optional[str]:
+    """高德字段为空时返回 []，统一转为 None"""
+    return value if isinstance(value, str) and value else None
+
+
+class AmapGeocoder(Geocoder):
+    """高德 Web 服务地理编码（/v3/geocode/geo）"""
+
+    def __init__(self, key: str, timeout: float = 5.0):
+        self.key = key
+        self.timeout = timeout
+
+    async def geocode(self, address: str) -> Optional[GeoPoint]:
+        data = await _amap_get(AMAP_GEOCODE_URL, {"key": self.key, "address": address}, self.timeout)
+        geocodes = data.get("geocodes") or []
+        if not geocodes:
+            return None
+        first = geocodes[0]
+        lng, lat = (float(v) for v in str(first.get("location", "")).split(","))
+        return GeoPoint(lng, lat, _amap_str(first.get("city")) or _amap_str(first.get("province")),
+                        _amap_str(first.get("adcode")))
+
+
+class AmapWeatherProvider(WeatherProvider):
+    """高德 Web 服务实况天气（/v3/weather/weatherInfo）"""
+
+    def __init__(self, key: str, timeout: float = 5.0):
+        self.key = key
+        self.timeout = timeout
+
+    async def live(self, adcode: str) -> Optional[Weather]:
+        params = {"key": self.key, "city": adcode, "extensions": "base"}
+        data = await _amap_get(AMAP_WEATHER_URL, params, self.timeout)
+        lives = data.get("lives") or []
+        if not lives:
+            return None
+        item = lives[0]
+        wind = " ".join(filter(None, [_amap_str(item.get("winddirection")), _amap_str(item.get("windpower"))]))
+        return Weather(
+            city=_amap_str(item.get("city")) or adcode,
+            condition=_amap_str(item.get("weather")) or "",
+            temperature=_amap_str(item.get("temperature")),
+            humidity=_amap_str(item.get("humidity")),
+            wind=(wind + "级") if wind else None,
+            report_time=_amap_str(item.get("reporttime"))
+        )
+
+
+class FixtureDestinationProvider(Geocoder, WeatherProvider):
+    """本地固定数据源（压测与离线验证用，不调用高德）；只提供地理编码，天气查询不返回数据（不伪造实况天气）"""
+
+    def __init__(self, path: str = DEFAULT_FIXTURE_PATH, latency: float = 0.0):
+        """
+        初始化
+
+        Args:
+            path: JSON 文件路径，内容为 [{"name", "aliases", "location": [lng, lat], "city", "adcode"}]
+            latency: 模拟的单次调用耗时（秒），压测用
+        """
+        with open(path, encoding="utf-8") as f:
+            items: List[Dict] = json.load(f)
+        self.places: Dict[str, Dict] = {}
+        for item in items:
+            for name in [item["name"], *item.get("aliases", [])]:
+                self.places[name] = item
+        self.latency = latency
+
+    async def geocode(self, address: str) -> Optional[GeoPoint]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        item = self.places.get(address.strip())
+        if item is None:
+            return None
+        lng, lat = item["location"]
+        return GeoPoint(lng, lat, item["city"], item["adcode"])
+
+    async def live(self, adcode: str) -> Optional[Weather]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return None
+
+
+class DestinationContextService:
+    """
+    目的地确认后的数据预取：地理编码完成后，天气与各类 POI 查询并发进行，每个子任务单独超时
+
+    地图就绪耗时由“地理编码 + 天气 + 各类 POI 依次串行”降为“地理编码 + 其中最慢的一项”；
+    地理编码与天气结果按地名 / 行政区编码缓存，热门目的地通常只剩 POI 缓存查询。
+    某个子任务失败或超时只记录在 errors 中，不影响其它结果。
+    """
+
+    def __init__(
+        self,
+        geocoder: Optional[Geocoder],
+        weather: Optional[WeatherProvider],
+        poi_service: Optional[POIService],
+        geocode_cache: TTLCache,
+        weather_cache: TTLCache,
+        geocode_timeout: float = 3.0,
+        weather_timeout: float = 3.0,
+        poi_timeout: float = 4.0
+    ):
+        """
+        初始化
+
+        Args:
+            geocoder: 地理编码数据源（未配置时为 None，地理编码及依赖它的子任务记为不可用）
+            weather: 天气数据源（未配置时为 None，天气子任务记为不可用）
+            poi_service: 周边 POI 服务（未配置时为 None，POI 子任务记为不可用）
+            geocode_cache: 地理编码缓存（键为地名）
+            weather_cache: 天气缓存（键为行政区编码）
+            geocode_timeout: 地理编码超时（秒）
+            weather_timeout: 天气查询超时（秒）
+            poi_timeout: 单个类别 POI 查询超时（秒）
+        """
+        self.geocoder = geocoder
+        self.weather = weather
+        self.poi_service = poi_service
+        self.geocode_cache = geocode_cache
+        self.weather_cache = weather_cache
+        self.geocode_timeout = geocode_timeout
+        self.weather_timeout = weather_timeout
+        self.poi_timeout = poi_timeout
+        # 统计计数
+        self.builds = 0
+        self.warmed = 0
+        self.timeouts: Dict[str, int] = {}
+        self.failures: Dict[str, int] = {}
+
+    async def _geocode(self, destination: str) -> Optional[GeoPoint]:
+        key = destination.strip()
+        cached = self.geocode_cache.get(key)
+        if cached is not None:
+            return cached
+        point = await self.geocoder.geocode(key)
+        if point is not None:
+            self.geocode_cache.set(key, point)
+        return point
+
+    async def _weather(self, adcode: str) -> Optional[Weather]:
+        cached = self.weather_cache.get(adcode)
+        if cached is not None:
+            return cached
+        weather = await self.weather.live(adcode)
+        if weather is not None:
+            self.weather_cache.set(adcode, weather)
+        return weather
+
+    async def _run(self, ctx: DestinationContext, name: str, fn: Callable[[], Awaitable[T]],
+                   timeout: float) -> Optional[T]:
+        """
+        执行一个子任务：记录耗时，超时或失败时记录原因并返回 None
+
+        协程在这里才创建：子任务尚未开始就被取消（如应用关闭时取消预取）时，不会留下未等待的协程。
+        """
+        stage = name.split(":", 1)[0]
+        t0 = time.perf_counter()
+        try:
+            return await asyncio.wait_for(fn(), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts[stage] = self.timeouts.get(stage, 0) + 1
+            ctx.errors[name] = f"timeout after {timeout:g}s"
+        except Exception as e:
+            self.failures[stage] = self.failures.get(stage, 0) + 1
+            logger.warning(f"destination context {name} failed: {e}")
+            ctx.errors[name] = str(e) or type(e).__name__
+        finally:
+            ctx.timings_ms[name] = int((time.perf_counter() - t0) * 1000)
+        return None
+
+    async def build(self, destination: str, categories: List[str], radius: int = 2000,
+                    limit: int = 12) -> DestinationContext:
+        """
+        预取目的地的坐标、天气与周边 POI
+
+        Args:
+            destination: 已确认的目的地名称
+            categories: POI 类别
+            radius: POI 搜索半径（米）
+            limit: 每类最多返回条数
+
+        Returns:
+            DestinationContext
+        """
+        self.builds += 1
+        return await self._collect(destination, categories, radius, limit)
+
+    async def warm(self, destination: str, categories: List[str], radius: int = 2000, limit: int = 12):
+        """
+        预热缓存（后台预取用）：执行与 build 相同的查询，只为写入地理编码、天气与 POI 缓存
+
+        Args:
+            destination: 预计会确认的目的地名称
+            categories: POI 类别
+            radius: POI 搜索半径（米）
+            limit: 每类最多返回条数
+        """
+        self.warmed += 1
+        await self._collect(destination, categories, radius, limit)
+
+    def is_warm(self, destination: str, categories: List[str], radius: int = 2000) -> bool:
+        """
+        build 所需的数据是否已全部在缓存中（不计入缓存命中统计）
+
+        Args:
+            destination: 目的地名称
+            categories: POI 类别
+            radius: POI 搜索半径（米）
+
+        Returns:
+            地理编码、天气与各类 POI 均已缓存时为 True
+        """
+        if self.geocoder is None:
+            return False
+        point = self.geocode_cache.peek(destination.strip())
+        if point is None:
+            return False
+        if self.weather is not None and point.adcode and point.adcode not in self.weather_cache:
+            return False
+        if self.poi_service is None:
+            return True
+        poi_cache = self.poi_service.cache
+        return all(
+            self.poi_service.cache_key(point.lng, point.lat, category, radius) in poi_cache
+            for category in categories
+        )
+
+    async def _collect(self, destination: str, categories: List[str], radius: int, limit: int) -> DestinationContext:
+        started = time.perf_counter()
+        ctx = DestinationContext(destination=destination)
+
+        if self.geocoder is None:
+            # 未配置数据源：不查询，也不返回固定数据冒充真实结果
+            ctx.errors["geocode"] = "unavailable: geocoding is not configured (AMAP_KEY is not set)"
+            ctx.errors["weather"] = "unavailable: weather is not configured (AMAP_KEY is not set)"
+            ctx.elapsed_ms = int((time.perf_counter() - started) * 1000)
+            return ctx
+
+        # 天气与 POI 都依赖地理编码结果（行政区编码、坐标）
+        point = await self._run(ctx, "geocode", functools.partial(self._geocode, destination),
+                                self.geocode_timeout)
+        if point is None:
+            ctx.errors.setdefault("geocode", "not found")
+        else:
+            ctx.location = [point.lng, point.lat]
+            ctx.city = point.city
+            ctx.adcode = point.adcode
+
+            unique = list(dict.fromkeys(categories))
+            if self.poi_service is None:
+                # 未配置 POI 数据源：不查询，前端看到错误后改用浏览器端搜索
+                for category in unique:
+                    ctx.errors[f"poi:{category}"] = "unavailable: POI search is not configured"
+                unique = []
+            tasks = [
+                self._run(ctx, f"poi:{category}",
+                          functools.partial(self.poi_service.search, point.lng, point.lat, category, radius, limit),
+                          self.poi_timeout)
+                for category in unique
+            ]
+            query_weather = self.weather is not None and bool(point.adcode)
+            if self.weather is None:
+                ctx.errors["weather"] = "unavailable: weather is not configured"
+            if query_weather:
+                tasks.append(self._run(ctx, "weather", functools.partial(self._weather, point.adcode),
+                                       self.weather_timeout))
+            results = await asyncio.gather(*tasks)
+            for category, pois in zip(unique, results):
+                ctx.pois[category] = pois or []
+            if query_weather:
+                ctx.weather = results[-1]
+
+        ctx.elapsed_ms = int((time.perf_counter() - started) * 1000)
+        return ctx
+
+    def stats(self) -> Dict:
+        """预取次数、子任务超时 / 失败计数与缓存命中率"""
+        return {
+            "geocoder": type(self.geocoder).__name__ if self.geocoder is not None else None,
+            "weather": type(self.weather).__name__ if self.weather is not None else None,
+            "builds": self.builds,
+            "warmed": self.warmed,
+            "timeouts": dict(self.timeouts),
+            "failures": dict(self.failures),
+            "geocode_cache": self.geocode_cache.stats(),
+            "weather_cache": self.weather_cache.stats()
+        }
+
+
+def _create_service_from_env() -> DestinationContextService:
+    """
+    根据环境变量创建目的地预取服务
+
+    本地固定数据只覆盖少数目的地，仅在显式设置 DEST_PROVIDER=fixture 时使用（压测与离线验证）；
+    未配置 AMAP_KEY 时跳过地理编码与天气，在结果的 errors 中说明原因。
+
+    环境变量：
+        DEST_PROVIDER: amap（默认）或 fixture
+        AMAP_KEY: 高德 Web 服务 Key
+        DEST_FIXTURE_PATH: 固定数据文件路径（默认 backend/data/destination_fixture.json）
+        DEST_GEOCODE_TIMEOUT: 地理编码超时秒数（默认 3）
+        DEST_WEATHER_TIMEOUT: 天气查询超时秒数（默认 3）
+        DEST_POI_TIMEOUT: 单个类别 POI 查询超时秒数（默认 4）
+        GEOCODE_CACHE_TTL: 地理编码缓存有效期秒数（默认 7 天）
+        WEATHER_CACHE_TTL: 天气缓存有效期秒数（默认 10 分钟）
+    """
+    kind = os.getenv("DEST_PROVIDER", "amap").lower()
+    geocoder: Optional[Geocoder] = None
+    weather: Optional[WeatherProvider] = None
+    if kind == "fixture":
+        fixture = FixtureDestinationProvider(os.getenv("DEST_FIXTURE_PATH") or DEFAULT_FIXTURE_PATH)
+        geocoder, weather = fixture, fixture
+    elif kind == "amap":
+        amap_key = os.getenv("AMAP_KEY")
+        if amap_key:
+            geocoder, weather = AmapGeocoder(amap_key), AmapWeatherProvider(amap_key)
+        else:
+            logger.warning("AMAP_KEY is not set; destination geocoding and weather are disabled")
+    else:
+        raise ValueError(f"Unknown DEST_PROVIDER: {kind}")
+    return DestinationContextService(
+        geocoder=geocoder,
+        weather=weather,
+        poi_service=get_poi_service(),
+        geocode_cache=TTLCache(max_size=5000, ttl=float(os.getenv("GEOCODE_CACHE_TTL", str(7 * 86400)))),
+        weather_cache=TTLCache(max_size=2000, ttl=float(os.getenv("WEATHER_CACHE_TTL", "600"))),
+        geocode_timeout=float(os.getenv("DEST_GEOCODE_TIMEOUT", "3")),
+        weather_timeout=float(os.getenv("DEST_WEATHER_TIMEOUT", "3")),
+        poi_timeout=float(os.getenv("DEST_POI_TIMEOUT", "4"))
+    )
+
+
+_service: Optional[DestinationContextService] = None
+
+
+def get_destination_context_service() -> DestinationContextService:
+    """获取全局目的地预取服务（首次调用时创建）"""
+    global _service
+    if _service is None:
+        _service = _create_service_from_env()
+    return _service
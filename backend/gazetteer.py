@@ -0,0 +1,273 @@
+import logging
+import os
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .normalize_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), "data", "gazetteer.tsv")
+
+# 查询时可去掉的行政区划/景区后缀（按长度降序，优先匹配长后缀）
+_SUFFIXES = sorted(
+    ["特别行政区", "自治区", "风景名胜区", "风景区", "景区", "省", "市", "区", "县", "镇"],
+    key=len,
+    reverse=True
+)
+
+# 前缀补全时最多收集的候选数
+_PREFIX_LIMIT = 6
+
+
+class Place(NamedTuple):
+    """地名索引中的一个条目"""
+    kind: str          # province / city / district / scenic
+    full_name: str     # 标准全称，如 上海市黄浦区外滩
+    short: str         # 常用简称，如 外滩
+    city: str          # 所属城市（或省份）简称，如 上海
+    aliases: Tuple[str, ...]
+
+
+class _TrieNode:
+    __slots__ = ("children", "places")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.places: List[Place] = []
+
+
+def _strip_suffix(key: str) -> str:
+    for suffix in _SUFFIXES:
+        if key.endswith(suffix) and len(key) > len(suffix) + 1:
+            return key[:-len(suffix)]
+    return key
+
+
+class Gazetteer:
+    """
+    本地地名索引：精确/别名匹配 + 前缀（Trie）补全
+
+    只有唯一、可信的匹配才返回结果，其余交给 LLM 处理（长尾）。
+    """
+
+    def __init__(self, places: List[Place]):
+        """
+        初始化索引
+
+        Args:
+            places: 地名条目列表
+        """
+        self.places = places
+        self._exact: Dict[str, List[Place]] = {}
+        self._root = _TrieNode()
+        for place in places:
+            keys = {place.short, place.full_name, *place.aliases}
+            for key in keys:
+                self._add(normalize_text(key), place)
+
+        self._lock = threading.Lock()
+        # 统计计数
+        self.lookups = 0
+        self.hits = 0
+        self.hits_by_method: Dict[str, int] = {}
+
+    def _add(self, key: str, place: Place):
+        if not key:
+            return
+        bucket = self._exact.setdefault(key, [])
+        if place not in bucket:
+            bucket.append(place)
+        node = self._root
+        for ch in key:
+            node = node.children.setdefault(ch, _TrieNode())
+        if place not in node.places:
+            node.places.append(place)
+
+    @classmethod
+    def load(cls, path: str) -> "Gazetteer":
+        """
+        从 TSV 文件加载索引
+
+        每行：kind \\t full_name \\t short \\t city \\t aliases（逗号分隔），# 开头为注释
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            Gazetteer 实例
+        """
+        places: List[Place] = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if not line.strip() or line.startswith("#"):
+                    continue
+                cols = line.split("\t")
+                cols += [""] * (5 - len(cols))
+                kind, full_name, short, city, aliases = cols[:5]
+                if not full_name or not short:
+                    continue
+                places.append(Place(
+                    kind=kind,
+                    full_name=full_name,
+                    short=short,
+                    city=city,
+                    aliases=tuple(a.strip() for a in aliases.split(",") if a.strip())
+                ))
+        return cls(places)
+
+    def _prefix_places(self, key: str) -> List[Place]:
+        """前缀补全：收集以 key 开头的条目（最多 _PREFIX_LIMIT + 1 个）"""
+        node = self._root
+        for ch in key:
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        found: List[Place] = []
+        stack = [node]
+        while stack and len(found) <= _PREFIX_LIMIT:
+            current = stack.pop()
+            for place in current.places:
+                if place not in found:
+                    found.append(place)
+            stack.extend(current.children.values())
+        return found
+
+    def _candidates(self, key: str) -> Tuple[List[Place], str]:
+        # 1. 精确匹配（简称 / 全称 / 别名）
+        places = self._exact.get(key)
+        if places:
+            return places, "exact"
+
+        # 2. 去掉行政区划/景区后缀后匹配，如 杭州市 -> 杭州
+        stripped = _strip_suffix(key)
+        if stripped != key and stripped in self._exact:
+            return self._exact[stripped], "suffix"
+
+        # 3. “城市 + 地点”组合，如 杭州西湖、上海外滩
+        for i in range(len(key) - 1, 1, -1):
+            prefix, rest = key[:i], key[i:]
+            parents = [p for p in self._exact.get(prefix, []) if p.kind in ("province", "city")]
+            if not parents:
+                continue
+            inner = self._exact.get(rest) or self._exact.get(_strip_suffix(rest)) or []
+            scoped = [p for p in inner if any(parent.short == p.city or parent.full_name in p.full_name
+                                              for parent in parents)]
+            if scoped:
+                return scoped, "city_prefix"
+
+        # 4. 前缀补全，如 九寨 -> 九寨沟
+        if len(key) >= 2:
+            places = self._prefix_places(key)
+            if places:
+                return places, "prefix"
+
+        return [], ""
+
+    def lookup(self, name: str, city_hint: Optional[str] = None) -> Optional[Tuple[str, List[str]]]:
+        """
+        查询地名；只有唯一可信的匹配才返回
+
+        Args:
+            name: 原始名称
+            city_hint: 城市提示（用于消歧；给出时结果必须位于该城市）
+
+        Returns:
+            (建议名称, 候选列表)；没有可信匹配或与城市提示不符时返回 None
+        """
+        key = normalize_text(name)
+        with self._lock:
+            self.lookups += 1
+        if not key:
+            return None
+
+        places, method = self._candidates(key)
+        hint = _strip_suffix(normalize_text(city_hint)) if city_hint else ""
+        if hint:
+            # 城市提示既用于消歧，也用于校验：唯一的候选与提示不符时同样交给 LLM（如 鼓楼 + 西安）
+            places = [p for p in places
+                      if p.city == hint or hint in p.full_name or (p.city and p.city in hint)]
+
+        # 去重（不同键可能指向同一条目）
+        unique = list({p.full_name: p for p in places}.values())
+        if len(unique) != 1:
+            return None
+
+        place = unique[0]
+        with self._lock:
+            self.hits += 1
+            self.hits_by_method[method] = self.hits_by_method.get(method, 0) + 1
+        return place.full_name, self._alternatives(place)
+
+    def find(self, name: str) -> Optional[Place]:
+        """
+        严格查找：仅接受唯一的精确/别名匹配（或去掉行政区划后缀后的精确匹配），不做前缀补全
+
+        Args:
+            name: 名称
+
+        Returns:
+            匹配的条目；没有或有歧义时返回 None
+        """
+        key = normalize_text(name)
+        places = self._exact.get(key) or self._exact.get(_strip_suffix(key)) or []
+        unique = {p.full_name: p for p in places}
+        return next(iter(unique.values())) if len(unique) == 1 else None
+
+    @staticmethod
+    def _alternatives(place: Place) -> List[str]:
+        options: List[str] = []
+        if (place.city and place.kind in ("scenic", "district")
+                and not place.short.startswith(place.city) and not place.city.startswith(place.short)):
+            options.append(f"{place.city}{place.short}")
+        options.append(place.short)
+        options.extend(place.aliases)
+        alternatives: List[str] = []
+        for option in options:
+            if option and option != place.full_name and option not in alternatives:
+                alternatives.append(option)
+        return alternatives[:5]
+
+    def stats(self) -> Dict:
+        """索引统计"""
+        return {
+            "places": len(self.places),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "hits_by_method": dict(self.hits_by_method)
+        }
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_failed = False
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """
+    获取全局地名索引（首次调用时加载）
+
+    环境变量：
+        GAZETTEER_ENABLED: 是否启用本地索引（默认 1）
+        GAZETTEER_PATH: 索引文件路径（默认 backend/data/gazetteer.tsv）
+
+    Returns:
+        Gazetteer 实例；未启用或加载失败时返回 None
+    """
+    global _gazetteer, _gazetteer_failed
+    if os.getenv("GAZETTEER_ENABLED", "1") in ("0", "false", "False") or _gazetteer_failed:
+        return None
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None and not _gazetteer_failed:
+                path = os.getenv("GAZETTEER_PATH") or DEFAULT_GAZETTEER_PATH
+                try:
+                    _gazetteer = Gazetteer.load(path)
+                    logger.info(f"Loaded gazetteer: {len(_gazetteer.places)} places from {path}")
+                except OSError as e:
+                    # 加载失败只记录一次，之后直接走 LLM
+                    logger.warning(f"Gazetteer not available ({path}): {e}")
+                    _gazetteer_failed = True
+    return _gazetteer
@@ -0,0 +1,102 @@
+import math
+from typing import Tuple
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def geohash_encode(lat: float, lng: float, precision: int = 6) -> str:
+    """
+    计算经纬度的 geohash
+
+    Args:
+        lat: 纬度
+        lng: 经度
+        precision: 字符数（6 约 1.2km x 0.6km，7 约 153m x 153m）
+
+    Returns:
+        geohash 字符串
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        rng, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """
+    geohash 单元的大小
+
+    Args:
+        precision: 字符数
+
+    Returns:
+        (纬度跨度, 经度跨度)，单位为度
+    """
+    total_bits = precision * 5
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def geohash_center(geohash: str) -> Tuple[float, float]:
+    """
+    geohash 单元的中心点
+
+    Args:
+        geohash: geohash 字符串
+
+    Returns:
+        (纬度, 经度)
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for ch in geohash:
+        value = _BASE32.index(ch)
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lng_range[0] + lng_range[1]) / 2
+
+
+def haversine_m(lng1: float, lat1: float, lng2: float, lat2: float) -> float:
+    """两点间的球面距离（米）"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def cell_half_diagonal_m(precision: int, lat: float) -> float:
+    """某纬度处 geohash 单元中心到角点的最大距离（米），用于扩大查询半径以覆盖整个单元"""
+    dlat, dlng = geohash_cell_size(precision)
+    # 取单元内更靠近赤道一侧的纬度，经度方向的米数最大
+    lat_eq = math.radians(max(0.0, abs(lat) - dlat / 2))
+    meters_per_deg = math.pi * EARTH_RADIUS_M / 180
+    return math.hypot(dlat / 2 * meters_per_deg, dlng / 2 * meters_per_deg * math.cos(lat_eq))
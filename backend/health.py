@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values, q: float) -> Optional[float]:
+    """最近邻百分位（q 取 0~100）"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class UpstreamHealthProber:
+    """
+    上游模型服务健康探测
+
+    后台按固定间隔请求 GET {base_url}/models（只列模型，不产生 token 计费），
+    缓存最近一次结果和滚动延迟分位数，健康检查接口直接读取缓存，无需每次调用模型。
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], httpx.AsyncClient],
+        interval: float = 30.0,
+        timeout: float = 5.0,
+        window: int = 50
+    ):
+        """
+        初始化探测器
+
+        Args:
+            client_factory: 返回共享异步HTTP客户端的函数
+            interval: 后台探测间隔（秒），<= 0 时不启动后台探测
+            timeout: 单次探测超时（秒）
+            window: 计算延迟分位数的滚动窗口大小
+        """
+        self.client_factory = client_factory
+        self.interval = interval
+        self.timeout = timeout
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.last: Optional[Dict] = None
+        self.probes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    @staticmethod
+    def _config() -> Dict[str, Optional[str]]:
+        return {"base_url": os.getenv("KIMI_BASE_URL"), "api_key": os.getenv("KIMI_API_KEY")}
+
+    async def probe(self) -> Dict:
+        """
+        立即探测一次并更新缓存；已有探测在进行时等待其结果，不重复请求
+
+        Returns:
+            最新的探测结果
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        if self._lock.locked():
+            async with self._lock:
+                return self.last
+        async with self._lock:
+            self.last = await self._probe_once()
+            return self.last
+
+    async def _probe_once(self) -> Dict:
+        config = self._config()
+        if not config["base_url"] or not config["api_key"]:
+            return {
+                "ok": False,
+                "elapsed_ms": 0,
+                "error": "KIMI_API_KEY 或 KIMI_BASE_URL 未配置",
+                "checked_at": time.time()
+            }
+
+        url = f"{config['base_url'].rstrip('/')}/models"
+        t0 = time.perf_counter()
+        status_code = None
+        try:
+            response = await self.client_factory().get(
+                url,
+                headers={"Authorization": f"Bearer {config['api_key']}"},
+                timeout=self.timeout
+            )
+            status_code = response.status_code
+            response.raise_for_status()
+            error = None
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        elapsed_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+        self.probes += 1
+        if error is None:
+            self.latencies.append(elapsed_ms)
+            self.consecutive_failures = 0
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+            logger.warning(f"Kimi health probe failed: {error}")
+        return {
+            "ok": error is None,
+            "elapsed_ms": elapsed_ms,
+            "status_code": status_code,
+            "error": error,
+            "checked_at": time.time()
+        }
+
+    async def _probe_loop(self):
+        while True:
+            try:
+                await self.probe()
+            except Exception as e:
+                logger.error(f"Kimi health probe loop error: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """在当前事件循环中启动后台探测任务（interval <= 0 时不启动）"""
+        if self._task is not None or self.interval <= 0:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._probe_loop())
+
+    async def close(self):
+        """停止后台探测任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> Dict:
+        """
+        最近一次探测结果（不发起请求）
+
+        Returns:
+            ok / elapsed_ms / error / checked_at / age_s，以及滚动 p50/p95 延迟和探测计数；
+            尚未探测过时 ok 为 False
+        """
+        result = dict(self.last) if self.last else {
+            "ok": False, "elapsed_ms": None, "error": "尚未完成首次探测", "checked_at": None
+        }
+        checked_at = result.get("checked_at")
+        result.update({
+            "age_s": round(time.time() - checked_at, 1) if checked_at else None,
+            "p50_ms": percentile(self.latencies, 50),
+            "p95_ms": percentile(self.latencies, 95),
+            "probes": self.probes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "interval_s": self.interval
+        })
+        return result
@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+from typing import Dict, List
+
+
+SUMMARY_PREFIX = "早前对话摘要："
+
+
+def _message_bytes(message: dict) -> int:
+    """单条消息序列化后的字节数（与持久化时的紧凑 JSON 一致）"""
+    return len(json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def _is_summary(message: dict) -> bool:
+    return bool(message.get("summary"))
+
+
+class HistoryPolicy:
+    """
+    会话历史保留策略
+
+    - 最近 max_turns 轮（一问一答为一轮）原样保留
+    - 更早的轮次折叠为一条摘要消息（mode="summary"），或直接丢弃（mode="drop"）
+    - 单个会话历史总字节数不超过 max_bytes：超出时继续折叠更早轮次，必要时截断摘要和过长消息
+    """
+
+    def __init__(
+        self,
+        max_turns: int = 20,
+        max_bytes: int = 32768,
+        mode: str = "summary",
+        summary_max_chars: int = 600,
+        point_max_chars: int = 40
+    ):
+        """
+        初始化历史保留策略
+
+        Args:
+            max_turns: 原样保留的最近轮数（<=0 表示不限制）
+            max_bytes: 单个会话历史的字节上限（<=0 表示不限制）
+            mode: summary（折叠为摘要）、drop（丢弃）或 off（不处理）
+            summary_max_chars: 摘要内容最大字符数，超出时保留最近的要点
+            point_max_chars: 每条被折叠的用户消息在摘要中保留的字符数
+        """
+        if mode not in ("summary", "drop", "off"):
+            raise ValueError(f"Unknown history mode: {mode}")
+        self.max_turns = max_turns
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.summary_max_chars = summary_max_chars
+        self.point_max_chars = point_max_chars
+
+        self._lock = threading.Lock()
+        # 统计计数：自进程启动以来的累计值，会话过期或被淘汰后不会回减；
+        # 当前存活会话的节省量记在各会话的 history_bytes_saved 上，由会话存储统计（/api/stats 的 sessions）
+        self.compactions = 0
+        self.messages_folded = 0
+        self.messages_truncated = 0
+        self.bytes_saved_total = 0
+
+    @classmethod
+    def from_env(cls) -> "HistoryPolicy":
+        """
+        根据环境变量创建策略
+
+        环境变量：
+            HISTORY_MODE: summary（默认）、drop 或 off
+            HISTORY_MAX_TURNS: 原样保留的最近轮数（默认 20）
+            HISTORY_MAX_BYTES: 单个会话历史字节上限（默认 32768）
+        """
+        return cls(
+            max_turns=int(os.getenv("HISTORY_MAX_TURNS", "20")),
+            max_bytes=int(os.getenv("HISTORY_MAX_BYTES", "32768")),
+            mode=os.getenv("HISTORY_MODE", "summary").lower()
+        )
+
+    def _fold(self, summary: dict, folded: List[dict]) -> dict:
+        """把被折叠的消息并入摘要消息"""
+        previous = str(summary.get("content", ""))[len(SUMMARY_PREFIX):]
+        points = previous.split("；") if previous else []
+        for message in folded:
+            if message.get("role") == "user":
+                content = str(message.get("content", "")).strip().replace("\n", " ").replace("；", "，")
+                if content:
+                    points.append(content[:self.point_max_chars])
+
+        # 摘要超长时丢弃最早的要点
+        while points and len("；".join(points)) > self.summary_max_chars:
+            points.pop(0)
+
+        return {
+            "role": "system",
+            "content": SUMMARY_PREFIX + "；".join(points),
+            "summary": True,
+            "turns": summary.get("turns", 0) + sum(1 for m in folded if m.get("role") == "user"),
+            "folded_bytes": summary.get("folded_bytes", 0) + sum(_message_bytes(m) for m in folded)
+        }
+
+    def apply(self, history: List[dict]) -> int:
+        """
+        就地压缩会话历史
+
+        Args:
+            history: 会话的 conversation_history（会被原地修改）
+
+        Returns:
+            本次节省的字节数
+        """
+        if self.mode == "off" or not history:
+            return 0
+
+        summary = history[0] if _is_summary(history[0]) else None
+        messages = history[1:] if summary is not None else history[:]
+
+        def total_bytes() -> int:
+            size = sum(_message_bytes(m) for m in messages)
+            return size + (_message_bytes(summary) if summary is not None else 0)
+
+        over_turns = self.max_turns > 0 and len(messages) > 2 * self.max_turns
+        over_bytes = self.max_bytes > 0 and total_bytes() > self.max_bytes
+        if not over_turns and not over_bytes:
+            return 0
+
+        before = total_bytes()
+        folded: List[dict] = []
+        folded_count = 0
+        truncated = 0
+
+        # 1. 超出轮数：折叠最早的轮次
+        if over_turns:
+            cut = len(messages) - 2 * self.max_turns
+            folded.extend(messages[:cut])
+            messages = messages[cut:]
+
+        def merge_folded():
+            nonlocal summary, folded, folded_count
+            if folded:
+                if self.mode == "summary":
+                    summary = self._fold(summary or {}, folded)
+                folded_count += len(folded)
+                folded = []
+
+        merge_folded()
+
+        # 2. 超出字节上限：继续折叠最早的一轮，至少保留最近一轮
+        while self.max_bytes > 0 and total_bytes() > self.max_bytes and len(messages) > 2:
+            folded.extend(messages[:2])
+            messages = messages[2:]
+            merge_folded()
+
+        # 3. 仍然超出：先丢弃摘要，再截断剩余的长消息
+        if self.max_bytes > 0 and total_bytes() > self.max_bytes and summary is not None:
+            summary = None
+        if self.max_bytes > 0 and total_bytes() > self.max_bytes:
+            budget = max(self.max_bytes // max(len(messages), 1), 64)
+            for i, message in enumerate(messages):
+                content = str(message.get("content", ""))
+                if _message_bytes(message) > budget:
+                    # 按字节预算粗略截断（中文约 3 字节/字符）
+                    keep = max(budget // 3, 16)
+                    messages[i] = {**message, "content": content[:keep] + "…", "truncated": True}
+                    truncated += 1
+
+        history[:] = ([summary] if summary is not None else []) + messages
+
+        saved = max(before - total_bytes(), 0)
+        with self._lock:
+            self.compactions += 1
+            self.messages_folded += folded_count
+            self.messages_truncated += truncated
+            self.bytes_saved_total += saved
+        return saved
+
+    def stats(self) -> Dict:
+        """历史压缩统计（计数均为进程内累计值）"""
+        return {
+            "mode": self.mode,
+            "max_turns": self.max_turns,
+            "max_bytes": self.max_bytes,
+            "compactions": self.compactions,
+            "messages_folded": self.messages_folded,
+            "messages_truncated": self.messages_truncated,
+            "bytes_saved_total": self.bytes_saved_total
+        }
+
+
+# 全局历史保留策略
+history_policy = HistoryPolicy.from_env()
@@ -0,0 +1,215 @@
+import importlib.util
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from .metrics import mark_first
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionStats:
+    """
+    连接复用统计：通过 httpcore 的 trace 扩展记录新建 TCP 连接与 TLS 握手次数
+
+    reuse_rate = 1 - 新建连接数 / 请求数；连接池正常工作时热路径上不应再出现握手。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.tls_handshakes = 0
+
+    def on_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def trace(self, name: str, info: Dict):
+        """同步客户端的 trace 回调"""
+        if name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.new_connections += 1
+        elif name == "connection.start_tls.complete":
+            with self._lock:
+                self.tls_handshakes += 1
+
+    async def atrace(self, name: str, info: Dict):
+        """异步客户端的 trace 回调（httpcore 要求为协程函数）"""
+        self.trace(name, info)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            reused = max(0, self.requests - self.new_connections)
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "tls_handshakes": self.tls_handshakes,
+                "reuse_rate": round(reused / self.requests, 4) if self.requests else 0.0
+            }
+
+
+class LLMClients:
+    """
+    某个 (base_url, model) 的共享 HTTP 客户端：同步 + 异步各一个，带连接池与 keep-alive
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        timeout: httpx.Timeout,
+        limits: httpx.Limits,
+        http2: bool = False
+    ):
+        """
+        初始化客户端
+
+        Args:
+            base_url: 上游 API 基础URL
+            model: 模型名称
+            timeout: 单次调用的超时设置（连接/读/写/等待连接池）
+            limits: 连接池上限与 keep-alive 设置
+            http2: 是否启用 HTTP/2（需要安装 h2）
+        """
+        self.base_url = base_url
+        self.model = model
+        self.http2 = http2
+        self.connections = ConnectionStats()
+        self.http_client = httpx.Client(
+            timeout=timeout,
+            limits=limits,
+            http2=http2,
+            event_hooks={"request": [self._on_request]}
+        )
+        self.http_async_client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=limits,
+            http2=http2,
+            event_hooks={"request": [self._aon_request], "response": [self._aon_response]}
+        )
+
+    def _on_request(self, request: httpx.Request):
+        self.connections.on_request()
+        request.extensions["trace"] = self.connections.trace
+
+    async def _aon_request(self, request: httpx.Request):
+        self.connections.on_request()
+        request.extensions["trace"] = self.connections.atrace
+
+    async def _aon_response(self, response: httpx.Response):
+        # 响应头到达：记录本轮模型调用的首字节耗时
+        mark_first("llm_ttfb", "llm")
+
+    def close(self):
+        """关闭同步客户端"""
+        self.http_client.close()
+
+    async def aclose(self):
+        """关闭同步与异步客户端"""
+        self.http_client.close()
+        await self.http_async_client.aclose()
+
+    def stats(self) -> Dict:
+        return {"base_url": self.base_url, "model": self.model, "http2": self.http2, **self.connections.stats()}
+
+
+class LLMClientRegistry:
+    """
+    LLM 客户端注册表：按 (base_url, model) 复用 HTTP 客户端，所有 Agent 共享同一组连接池
+    """
+
+    def __init__(
+        self,
+        timeout: float = 60.0,
+        connect_timeout: float = 10.0,
+        max_connections: int = 100,
+        max_keepalive: int = 20,
+        keepalive_expiry: float = 120.0,
+        http2: bool = False
+    ):
+        """
+        初始化注册表
+
+        Args:
+            timeout: 读/写超时（秒）
+            connect_timeout: 建立连接与等待连接池的超时（秒）
+            max_connections: 每组客户端的最大连接数
+            max_keepalive: 保持空闲的最大连接数
+            keepalive_expiry: 空闲连接保持时间（秒）
+            http2: 是否启用 HTTP/2（未安装 h2 时自动关闭）
+        """
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed; falling back to HTTP/1.1")
+            http2 = False
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout, pool=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = http2
+        self._entries: Dict[Tuple[str, str], LLMClients] = {}
+        self._lock = threading.Lock()
+
+    def get(self, base_url: Optional[str], model: str) -> LLMClients:
+        """
+        获取 (base_url, model) 对应的共享客户端，不存在时创建
+
+        Args:
+            base_url: 上游 API 基础URL
+            model: 模型名称
+
+        Returns:
+            LLMClients 实例
+        """
+        key = ((base_url or "").rstrip("/"), model)
+        entry = self._entries.get(key)
+        if entry is None:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    entry = LLMClients(key[0], model, timeout=self.timeout, limits=self.limits, http2=self.http2)
+                    self._entries[key] = entry
+        return entry
+
+    async def aclose(self):
+        """关闭所有客户端（应用关闭时调用）"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            await entry.aclose()
+
+    def stats(self) -> List[Dict]:
+        """各组客户端的连接复用统计"""
+        return [entry.stats() for entry in list(self._entries.values())]
+
+
+def _create_registry_from_env() -> LLMClientRegistry:
+    """
+    根据环境变量创建注册表
+
+    环境变量：
+        KIMI_TIMEOUT: 读/写超时秒数（默认 60）
+        LLM_CONNECT_TIMEOUT: 连接超时秒数（默认 10）
+        LLM_MAX_CONNECTIONS: 最大连接数（默认 100）
+        LLM_MAX_KEEPALIVE: 保持空闲的最大连接数（默认 20）
+        LLM_KEEPALIVE_EXPIRY: 空闲连接保持秒数（默认 120）
+        LLM_HTTP2: 是否启用 HTTP/2（默认 0，需要安装 h2）
+    """
+    return LLMClientRegistry(
+        timeout=float(os.getenv("KIMI_TIMEOUT", "60")),
+        connect_timeout=float(os.getenv("LLM_CONNECT_TIMEOUT", "10")),
+        max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+        max_keepalive=int(os.getenv("LLM_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", "120")),
+        http2=os.getenv("LLM_HTTP2", "0") in ("1", "true", "True")
+    )
+
+
+# 全局 LLM 客户端注册表
+llm_clients = _create_registry_from_env()
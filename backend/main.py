@@ -1,27 +1,50 @@
+import asyncio
+import json
 import logging
 import os
-import time
-from typing import Optional, List
+import threading
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Optional, List
 from urllib.parse import urlparse
 
+import httpx
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
-from .base import POI, TravelInfo
-from .session_manager import session_manager
-from .agents.travel_info_agent import TravelInfoAgent
-
-app = FastAPI()
-
 # 加载环境变量（优先 .env.local，其次 .env）
+# 需在导入会话管理器等模块之前完成，它们在导入时读取配置
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 # 先加载 .env（不覆盖已有环境变量）
 load_dotenv(os.path.join(PROJECT_ROOT, '.env'), override=False)
 # 再加载 .env.local（允许覆盖，便于本地开发）
 load_dotenv(os.path.join(PROJECT_ROOT, '.env.local'), override=True)
 
+from .base import POI, TravelInfo, ChatSession, DestinationContext
+from .session_manager import session_manager
+from .admission import Overloaded, admission, session_locks
+from .history import history_policy
+from .normalize_cache import normalize_cache, normalize_key
+from .gazetteer import get_gazetteer
+from .poi_service import close_poi_clients, get_poi_service
+from .destination_context import get_destination_context_service
+from .prefetch import prefetcher
+from .turn_cache import turn_cache
+from .health import UpstreamHealthProber
+from .llm_clients import llm_clients
+from . import metrics
+from .metrics import bind_timer, record_chat_turn, stage, start_timer
+from .resilience import create_resilient_caller_from_env
+from .single_flight import llm_flight
+from .agents.destination_normalizer import anormalize_destination, anormalize_destinations
+from .agents.token_budget import add_usage, token_meter
+
+if TYPE_CHECKING:  # langchain_openai 较重，在首次创建 Agent（或启动预热）时才导入
+    from .agents.travel_info_agent import TravelInfoAgent
+
+app = FastAPI()
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -37,21 +60,161 @@ app.add_middleware(
 KIMI_API_KEY = os.getenv("KIMI_API_KEY")
 KIMI_BASE_URL = os.getenv("KIMI_BASE_URL")
 
-travel_agent: Optional[TravelInfoAgent] = None
+travel_agent: Optional["TravelInfoAgent"] = None
+_travel_agent_lock = threading.Lock()
+# Kimi 调用的限速/重试/熔断层（所有 Agent 共享同一配额与熔断状态）
+kimi_resilience = create_resilient_caller_from_env()
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """当前 Kimi 配置对应的共享异步HTTP客户端（与 Agent、健康探测复用同一连接池）"""
+    return llm_clients.get(os.getenv("KIMI_BASE_URL"), os.getenv("KIMI_MODEL", "kimi-k2-0905")).http_async_client
+
+
+# 上游健康探测：后台定期请求 /models（不计费），/api/kimi/health 直接返回缓存结果
+health_prober = UpstreamHealthProber(
+    client_factory=get_async_http_client,
+    interval=float(os.getenv("KIMI_HEALTH_INTERVAL", "30")),
+    timeout=float(os.getenv("KIMI_HEALTH_TIMEOUT", "5"))
+)
+
 
-def get_travel_agent() -> TravelInfoAgent:
+def get_travel_agent() -> "TravelInfoAgent":
     global travel_agent
     if travel_agent is not None:
         return travel_agent
+    # 启动预热在线程中执行，与首个请求并发时只创建一次
+    with _travel_agent_lock:
+        if travel_agent is None:
+            travel_agent = _create_travel_agent()
+    return travel_agent
+
+
+def _create_travel_agent() -> "TravelInfoAgent":
+    from .agents.travel_info_agent import TravelInfoAgent
+
     api_key = os.getenv("KIMI_API_KEY")
     api_base = os.getenv("KIMI_BASE_URL")
     model_name = os.getenv("KIMI_MODEL", "kimi-k2-0905")
     if not api_key or not api_base:
         raise HTTPException(status_code=503, detail="Kimi API 未配置，请设置 KIMI_API_KEY 和 KIMI_BASE_URL")
-    travel_agent = TravelInfoAgent(api_key=api_key, api_base=api_base, model_name=model_name)
+    # 同一 (base_url, model) 的同步/异步调用共享注册表中的连接池
+    clients = llm_clients.get(api_base, model_name)
+    travel_agent = TravelInfoAgent(
+        api_key=api_key,
+        api_base=api_base,
+        model_name=model_name,
+        http_client=clients.http_client,
+        http_async_client=clients.http_async_client,
+        rule_fast_path=os.getenv("RULE_FAST_PATH", "1") not in ("0", "false", "False"),
+        retry_budget=int(os.getenv("LLM_RETRY_BUDGET", "1")),
+        retry_backoff=float(os.getenv("LLM_RETRY_BACKOFF", "0.5")),
+        max_tokens=int(os.getenv("LLM_MAX_TOKENS", "0")) or None,
+        prompt_token_budget=int(os.getenv("PROMPT_TOKEN_BUDGET", "0")) or None,
+        stream_usage=os.getenv("LLM_STREAM_USAGE", "1") not in ("0", "false", "False"),
+        resilience=kimi_resilience,
+        turn_cache=turn_cache
+    )
     return travel_agent
 
 
+# 预取时预热的 POI 类别（与前端确认目的地时请求的类别一致）
+PREFETCH_CATEGORIES = [c for c in os.getenv("PREFETCH_CATEGORIES", "food,hotel").split(",") if c]
+# 预取时是否允许调用模型补全目的地名称（仅在准入有空闲名额时）
+PREFETCH_NORMALIZE_LLM = os.getenv("PREFETCH_NORMALIZE_LLM", "1") not in ("0", "false", "False")
+# 预取与用户请求共用 KIMI_RPM 令牌桶：桶中令牌少于容量的该比例时不再投机调用模型，余量留给用户请求
+PREFETCH_TOKEN_RESERVE = float(os.getenv("PREFETCH_TOKEN_RESERVE", "0.5"))
+
+
+def _prefetch_may_call_llm() -> bool:
+    """投机调用模型的条件：准入有一半以上的空闲名额，且限速令牌高于保留线"""
+    if admission.active + admission.waiting >= admission.concurrency // 2:
+        return False
+    bucket = kimi_resilience.bucket
+    if bucket.available() < max(1.0, bucket.capacity * PREFETCH_TOKEN_RESERVE):
+        prefetcher.llm_skipped += 1
+        return False
+    return True
+
+
+async def _prefetch_destination(destination: str):
+    """
+    预取：补全对话中提取到的目的地名称，并按最可能被确认的名称预热地理编码、天气与 POI 缓存
+
+    Args:
+        destination: 对话中提取到、尚未确认的目的地
+    """
+    suggestion = None
+    cached = await normalize_cache.aget(destination, None)
+    if cached is None:
+        gazetteer = get_gazetteer()
+        cached = gazetteer.lookup(destination, None) if gazetteer is not None else None
+    if cached is not None:
+        suggestion = cached[0]
+    elif PREFETCH_NORMALIZE_LLM and _prefetch_may_call_llm():
+        # 投机调用只使用空闲名额与富余的限速配额，不与用户请求争抢
+        try:
+            agent = get_travel_agent()
+            async with admission.admit(_upstream_key()):
+                found = await anormalize_destination(agent.llm, destination, None, resilience=kimi_resilience)
+            # 模型输出无法解析时不缓存，也不按原始名称预热
+            if found is not None:
+                suggestion, alternatives = found
+                await normalize_cache.aset(destination, None, suggestion, alternatives)
+        except (Overloaded, HTTPException) as e:
+            logger.info(f"prefetch skipped normalization for {destination}: {e}")
+    await get_destination_context_service().warm(suggestion or destination, PREFETCH_CATEGORIES)
+
+
+# 批量地名补全：每次模型调用包含的名称数与单次请求的名称数上限
+NORMALIZE_BATCH_SIZE = max(1, int(os.getenv("NORMALIZE_BATCH_SIZE", "20")))
+NORMALIZE_BATCH_MAX_ITEMS = int(os.getenv("NORMALIZE_BATCH_MAX_ITEMS", "500"))
+# 批量获取会话时单次请求的会话数上限
+SESSION_BATCH_MAX = int(os.getenv("SESSION_BATCH_MAX", "1000"))
+
+# 在 /api/chat 响应中附带 Server-Timing 头（浏览器开发者工具中可查看各阶段耗时），默认关闭
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0").lower() in ("1", "true", "yes")
+
+# 启动后在后台线程中预热 LLM 客户端（导入 langchain_openai 并创建 Agent），默认开启
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "1").lower() not in ("0", "false", "no")
+_warmup_task: Optional[asyncio.Task] = None
+
+
+def _warm_up():
+    """导入较重的 SDK 并创建 Agent，使首个对话请求不再承担这部分耗时"""
+    try:
+        get_travel_agent()
+        logger.info("LLM client warm-up finished")
+    except Exception as e:
+        logger.warning(f"LLM client warm-up failed: {e}")
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    """启动会话过期清理、上游健康探测等后台任务，并预热本地数据与 LLM 客户端"""
+    global _warmup_task
+    session_manager.start()
+    health_prober.start()
+    # 本地数据加载很快（毫秒级），直接在启动时完成；导入模块本身不做任何工作
+    get_gazetteer()
+    get_poi_service()
+    get_destination_context_service()
+    if STARTUP_WARMUP and os.getenv("KIMI_API_KEY") and os.getenv("KIMI_BASE_URL"):
+        # 不阻塞启动：服务立即可以接收请求，首个请求若早于预热完成会在 get_travel_agent 的锁上等待
+        _warmup_task = asyncio.create_task(asyncio.to_thread(_warm_up))
+
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    """关闭共享的HTTP客户端，释放连接，停止后台任务"""
+    await prefetcher.close()
+    await health_prober.close()
+    await llm_clients.aclose()
+    await close_poi_clients()
+    session_manager.close()
+    normalize_cache.close()
+
+
 def _mask_key(key: Optional[str]) -> str:
     if not key:
         return ""
@@ -105,137 +268,358 @@ class NormalizeDestinationResponse(BaseModel):
     alternatives: List[str] = []
 
 
+class NormalizeDestinationBatchRequest(BaseModel):
+    """批量地名补全请求"""
+    items: List[NormalizeDestinationRequest] = Field(..., min_length=1)
+
+
+class NormalizeDestinationBatchItem(NormalizeDestinationResponse):
+    """批量补全中的一条结果"""
+    source: str  # cache / gazetteer / llm / fallback（补全失败，返回原始名称）
+    error: Optional[str] = None
+
+
+class NormalizeDestinationBatchResponse(BaseModel):
+    """批量地名补全响应：results 与请求的 items 一一对应"""
+    results: List[NormalizeDestinationBatchItem]
+    llm_calls: int
+
+
+class SessionBatchRequest(BaseModel):
+    """批量获取会话请求"""
+    session_ids: List[str] = Field(..., min_length=1)
+
+
+class SessionBatchResponse(BaseModel):
+    """批量获取会话响应：不存在或已过期的会话ID列在 missing 中"""
+    sessions: List[ChatResponse]
+    missing: List[str] = []
+
+
 class ConfirmDestinationRequest(BaseModel):
     destination: str
+    prefetch: bool = True  # 同时并发预取坐标、天气与周边 POI
+    categories: List[str] = ["food", "hotel"]
+    radius: int = Field(2000, gt=0, le=50000)
+    limit: int = Field(12, gt=0, le=25)
 
 
-@app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+class POISearchRequest(BaseModel):
+    """周边 POI 查询请求"""
+    lng: float
+    lat: float
+    categories: List[str] = ["food", "hotel"]
+    radius: int = Field(2000, gt=0, le=50000)
+    limit: int = Field(12, gt=0, le=25)
+
+
+class POISearchResponse(BaseModel):
+    """周边 POI 查询响应：每个类别一个按距离排序的列表"""
+    center: List[float]
+    radius: int
+    results: Dict[str, List[POI]]
+
+
+async def _open_chat_session(request: ChatRequest) -> ChatSession:
     """
-    处理用户聊天消息，收集旅行信息
+    获取本轮对话的会话；没有session_id或会话不存在时创建新会话
 
     Args:
-        request: 包含session_id和用户消息的请求
+        request: 聊天请求
 
     Returns:
-        ChatResponse: 包含回复、旅行信息和完成状态
+        ChatSession对象（本轮开始时的快照）
     """
+    # 如果没有session_id，创建新会话
+    if not request.session_id or not await session_manager.asession_exists(request.session_id):
+        session_id = await session_manager.acreate_session()
+        logger.info(f"Created new session: {session_id}")
+    else:
+        session_id = request.session_id
+
+    # 获取会话
+    return await session_manager.aget_session(session_id)
+
+
+async def _reload_session(session: ChatSession) -> ChatSession:
+    """持有会话锁后重新读取会话，使本轮基于上一轮写入后的最新状态；会话已过期时沿用快照"""
     try:
-        # 如果没有session_id，创建新会话
-        if not request.session_id or not session_manager.session_exists(request.session_id):
-            session_id = session_manager.create_session()
-            logger.info(f"Created new session: {session_id}")
-        else:
-            session_id = request.session_id
+        return await session_manager.aget_session(session.session_id)
+    except KeyError:
+        return session
+
+
+def _upstream_key() -> str:
+    """准入控制使用的上游标识（Kimi base_url 的 host）"""
+    return urlparse(os.getenv("KIMI_BASE_URL") or "").netloc or "kimi"
+
+
+def _overloaded_error(e: Overloaded) -> HTTPException:
+    """将准入拒绝转换为带 Retry-After 的 429/503 响应"""
+    return HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
 
-        # 获取会话
-        session = session_manager.get_session(session_id)
 
+async def _finish_chat_turn(
+    agent: "TravelInfoAgent",
+    session: ChatSession,
+    request: ChatRequest,
+    result: Dict
+) -> ChatResponse:
+    """
+    将 Agent 结果合并进会话（update_travel_info + 历史记录）并构建响应
+
+    合并在 mutate_session 中基于会话最新状态完成，同一会话并发的轮次不会互相覆盖。
+
+    Args:
+        agent: 旅行信息采集Agent
+        session: 本轮开始时的会话快照
+        request: 聊天请求
+        result: process_message / aprocess_message 返回的字典
+
+    Returns:
+        ChatResponse
+    """
+    session_id = session.session_id
+    previous_destination = session.travel_info.destination
+
+    # 获取回复
+    agent_response = result.get("response", "抱歉，我没有理解您的意思，能否再说一遍？")
+    is_complete = result.get("is_complete", False)
+
+    def apply(current: ChatSession):
         # 添加用户消息到历史
-        session.conversation_history.append({
+        current.conversation_history.append({
             "role": "user",
             "content": request.message
         })
 
-        # 使用Agent处理消息（懒加载）
-        agent = get_travel_agent()
-        result = agent.process_message(
-            user_message=request.message,
-            current_info=session.travel_info
-        )
-
         # 更新旅行信息
         if "extracted_info" in result and result["extracted_info"]:
-            session.travel_info = agent.update_travel_info(
-                current_info=session.travel_info,
-                extracted_info=result["extracted_info"]
-            )
-
-        # 获取回复
-        agent_response = result.get("response", "抱歉，我没有理解您的意思，能否再说一遍？")
-        is_complete = result.get("is_complete", False)
+            # current 由 mutate_session 独占修改，直接就地合并
+            with stage("update_travel_info"):
+                agent.update_travel_info(
+                    current_info=current.travel_info,
+                    extracted_info=result["extracted_info"],
+                    in_place=True
+                )
 
         # 添加Agent回复到历史
-        session.conversation_history.append({
+        current.conversation_history.append({
             "role": "assistant",
             "content": agent_response
         })
 
-        # 更新会话
-        session_manager.update_session(session_id, session)
+        # 按策略压缩历史：保留最近若干轮，更早的折叠为摘要
+        current.history_bytes_saved += history_policy.apply(current.conversation_history)
 
-        logger.info(f"Session {session_id}: User: {request.message[:50]}...")
-        logger.info(f"Session {session_id}: Info complete: {is_complete}")
+        # 累计本会话的模型调用与 token 用量
+        if result.get("usage"):
+            add_usage(current.token_usage, result["usage"])
 
-        return ChatResponse(
-            session_id=session_id,
-            response=agent_response,
-            travel_info=session.travel_info,
-            is_complete=is_complete
-        )
+    # 更新会话
+    try:
+        session = await session_manager.amutate_session(session_id, apply)
+    except KeyError:
+        # 处理期间会话已过期/被淘汰：基于本轮快照重新写入
+        apply(session)
+        await session_manager.aupdate_session(session_id, session)
+
+    # 刚提取到（或改变了）尚未确认的目的地：后台预热确认时需要的数据，目的地再变化时旧任务会被取消
+    info = session.travel_info
+    if info.destination and info.destination != previous_destination and not info.destination_confirmed:
+        prefetcher.schedule(session_id, info.destination, _prefetch_destination)
+
+    logger.info(f"Session {session_id}: User: {request.message[:50]}...")
+    logger.info(f"Session {session_id}: Info complete: {is_complete}")
+
+    return ChatResponse(
+        session_id=session_id,
+        response=agent_response,
+        travel_info=session.travel_info,
+        is_complete=is_complete
+    )
 
+
+@app.post("/api/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest):
+    """
+    处理用户聊天消息，收集旅行信息
+
+    Args:
+        request: 包含session_id和用户消息的请求
+
+    Returns:
+        ChatResponse: 包含回复、旅行信息和完成状态
+    """
+    # 各阶段耗时写入 /metrics 直方图；开启 SERVER_TIMING 时同时通过响应头返回
+    timer = start_timer()
+    outcome = "error"
+    try:
+        with stage("session"):
+            session = await _open_chat_session(request)
+
+        # 使用Agent处理消息（懒加载）
+        agent = get_travel_agent()
+
+        # 同一会话的轮次按顺序处理；规则或轮次缓存能回答的轮次不占用准入名额
+        async with session_locks.hold(session.session_id):
+            with stage("session"):
+                session = await _reload_session(session)
+            result = agent.local_answer(request.message, session.travel_info)
+            if result is None:
+                async with admission.admit(_upstream_key()):
+                    result = await agent.aprocess_message(
+                        user_message=request.message,
+                        current_info=session.travel_info,
+                        try_local=False
+                    )
+
+            response = await _finish_chat_turn(agent, session, request, result)
+
+        # 直接序列化并返回，序列化耗时计入 serialize 阶段
+        with stage("serialize"):
+            body = response.model_dump_json()
+        outcome = "ok"
+        headers = {"Server-Timing": timer.server_timing(), "Timing-Allow-Origin": "*"} if SERVER_TIMING else None
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    except Overloaded as e:
+        outcome = "overloaded"
+        raise _overloaded_error(e)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        record_chat_turn(timer, "chat", outcome)
+
+
+def _sse_event(event: str, data: Dict) -> str:
+    """格式化一条 Server-Sent Events 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    流式聊天（Server-Sent Events）：边生成边推送回复文本
+
+    事件：
+        session: {"session_id": ...}，最先发送
+        delta:   {"text": 新增的回复文本}，可能有多条
+        done:    与 /api/chat 相同结构的 ChatResponse（合并后的 travel_info 与 is_complete）
+        error:   {"detail": 错误信息}，排队超时时附带 retry_after 秒数
+    """
+    agent = get_travel_agent()
+    # 流式响应的头在开始推流时已发出，这里只记录指标，不返回 Server-Timing
+    timer = start_timer()
+    try:
+        with stage("session"):
+            session = await _open_chat_session(request)
+        # 等待队列已满时，需要调用模型的轮次在开始推流前直接返回 429；规则或缓存能回答的轮次照常处理
+        if not admission.has_capacity() and agent.local_answer(request.message, session.travel_info) is None:
+            admission.check_capacity()
+    except Overloaded as e:
+        record_chat_turn(timer, "chat_stream", "overloaded")
+        raise _overloaded_error(e)
+    except Exception as e:
+        record_chat_turn(timer, "chat_stream", "error")
+        logger.error(f"Error in chat stream endpoint: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def event_stream() -> AsyncIterator[str]:
+        # 生成器在响应任务中执行，需要重新绑定本轮计时器
+        bind_timer(timer)
+        outcome = "error"
+        try:
+            yield _sse_event("session", {"session_id": session.session_id})
+            result: Dict = {}
+            async with session_locks.hold(session.session_id):
+                with stage("session"):
+                    current = await _reload_session(session)
+                local = agent.local_answer(request.message, current.travel_info)
+                if local is not None:
+                    yield _sse_event("delta", {"text": local["response"]})
+                    result = local
+                else:
+                    async with admission.admit(_upstream_key()):
+                        async for event in agent.astream_message(
+                            user_message=request.message,
+                            current_info=current.travel_info,
+                            try_local=False
+                        ):
+                            if event["type"] == "delta":
+                                yield _sse_event("delta", {"text": event["text"]})
+                            else:
+                                result = {k: v for k, v in event.items() if k != "type"}
+
+                response = await _finish_chat_turn(agent, current, request, result)
+            with stage("serialize"):
+                done = _sse_event("done", response.model_dump())
+            outcome = "ok"
+            yield done
+        except Overloaded as e:
+            outcome = "overloaded"
+            yield _sse_event("error", {"detail": e.detail, "retry_after": e.retry_after})
+        except Exception as e:
+            logger.error(f"Error in chat stream: {str(e)}", exc_info=True)
+            yield _sse_event("error", {"detail": str(e)})
+        finally:
+            record_chat_turn(timer, "chat_stream", outcome)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @app.post("/api/normalize_destination", response_model=NormalizeDestinationResponse)
 async def normalize_destination(req: NormalizeDestinationRequest):
     """
     使用 Kimi 对目的地名称进行补全/规范化（不调用高德），返回一个建议名称和若干候选项。
+    先查缓存与本地地名索引，均未命中时才调用模型；
+    模型结果按规范化后的 (name, city_hint) 缓存，热门目的地无需再次调用模型。
 
     输入：粗略名称 + 可选城市提示
     输出：标准化建议 + 备用候选
     """
+    cached = await normalize_cache.aget(req.name, req.city_hint)
+    if cached is not None:
+        prefetcher.record("normalize", True)
+        suggestion, alternatives = cached
+        return NormalizeDestinationResponse(raw=req.name, suggestion=suggestion, alternatives=alternatives)
+
+    # 本地地名索引有唯一可信匹配时直接返回，仅长尾名称调用模型
+    gazetteer = get_gazetteer()
+    local = gazetteer.lookup(req.name, req.city_hint) if gazetteer is not None else None
+    if local is not None:
+        prefetcher.record("normalize", True)
+        suggestion, alternatives = local
+        return NormalizeDestinationResponse(raw=req.name, suggestion=suggestion, alternatives=alternatives)
+
+    # 需要调用模型：后台预取未能提前补全该名称
+    prefetcher.record("normalize", False)
     try:
         agent = get_travel_agent()
-        sys_prompt = (
-            "你是一名地点标准化助手。任务：将用户给出的中文目的地名称补全为更完整、常用、官方的称谓，"
-            "尽量包含城市和区县信息（如能确定），但不要编造不存在的信息。"
-            "每次补全时，只能根据本次输入的 name 字段独立判断，不要参考历史、会话、已确认目的地或任何缓存。"
-            "请只返回 JSON，字段：suggestion (字符串，最佳补全)、alternatives (字符串数组，最多5条不同的合理补全，不包含suggestion)；"
-            "如果无法确定更完整名称，请将 suggestion 设为原始输入。"
-        )
-        human = (
-            f"原始名称: {req.name}\n"
-            f"城市提示: {req.city_hint or '无'}\n"
-            "请输出JSON。示例：{\"suggestion\": \"上海市黄浦区外滩\", \"alternatives\":[\"上海外滩\", \"上海黄浦外滩\"]}"
-        )
-
-        from langchain_core.messages import SystemMessage, HumanMessage
-        res = agent.llm.invoke([SystemMessage(content=sys_prompt), HumanMessage(content=human)])
-        content = getattr(res, "content", "") or ""
-
-        # 解析 JSON（容错提取）
-        import json, re
-        data = None
-        try:
-            # 直接解析
-            data = json.loads(content)
-        except Exception:
-            # 从文本中提取第一个花括号JSON片段
-            try:
-                m = re.search(r"\{[\s\S]*\}", content)
-                if m:
-                    data = json.loads(m.group(0))
-            except Exception:
-                data = None
-
-        suggestion = req.name
-        alternatives: List[str] = []
-        if isinstance(data, dict):
-            s = data.get("suggestion")
-            if isinstance(s, str) and s.strip():
-                suggestion = s.strip()
-            alts = data.get("alternatives", [])
-            if isinstance(alts, list):
-                alternatives = [str(a).strip() for a in alts if str(a).strip()]
+        async with admission.admit(_upstream_key()):
+            found = await anormalize_destination(agent.llm, req.name, req.city_hint, resilience=kimi_resilience)
+        # 仅缓存模型成功返回并解析出的结果；输出无法解析时回退为原始名称，不缓存
+        if found is None:
+            logger.warning(f"normalize_destination: unparseable model output for {req.name!r}")
+            suggestion, alternatives = req.name, []
+        else:
+            suggestion, alternatives = found
+            await normalize_cache.aset(req.name, req.city_hint, suggestion, alternatives)
 
         return NormalizeDestinationResponse(
             raw=req.name,
             suggestion=suggestion,
-            alternatives=alternatives[:5]
+            alternatives=alternatives
         )
+    except Overloaded as e:
+        raise _overloaded_error(e)
     except HTTPException:
         raise
     except Exception as e:
@@ -248,26 +632,119 @@ async def normalize_destination(req: NormalizeDestinationRequest):
         )
 
 
+@app.post("/api/normalize_destination/batch", response_model=NormalizeDestinationBatchResponse)
+async def normalize_destination_batch(req: NormalizeDestinationBatchRequest):
+    """
+    批量补全目的地名称（如预先规范化一批目的地）
+
+    每条先查缓存与本地地名索引（与单条接口相同）；其余名称去重后按 NORMALIZE_BATCH_SIZE 分块，
+    每块一次模型调用，各块并发执行并各自经过准入控制。模型成功返回的结果写入缓存，单条接口可直接命中。
+    某块调用失败或模型漏掉某条时，该条返回原始名称（source=fallback，不缓存），不影响其它条目。
+    """
+    if len(req.items) > NORMALIZE_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"单次最多补全 {NORMALIZE_BATCH_MAX_ITEMS} 个名称")
+
+    results: List[Optional[NormalizeDestinationBatchItem]] = [None] * len(req.items)
+    gazetteer = get_gazetteer()
+    # 规范化键 -> (名称, 城市提示)，以及等待该结果的条目下标（批内重复名称只补全一次）
+    pending: Dict[str, tuple] = {}
+    waiting: Dict[str, List[int]] = {}
+    # 缓存整批查询：内存未命中的条目一次读取持久化文件
+    cached = await normalize_cache.aget_many((item.name, item.city_hint) for item in req.items)
+    for i, item in enumerate(req.items):
+        found = cached[i]
+        source = "cache"
+        if found is None and gazetteer is not None:
+            found = gazetteer.lookup(item.name, item.city_hint)
+            source = "gazetteer"
+        if found is not None:
+            results[i] = NormalizeDestinationBatchItem(
+                raw=item.name, suggestion=found[0], alternatives=found[1], source=source
+            )
+            continue
+        key = normalize_key(item.name, item.city_hint)
+        pending.setdefault(key, (item.name, item.city_hint))
+        waiting.setdefault(key, []).append(i)
+
+    keys = list(pending)
+    chunks = [keys[i:i + NORMALIZE_BATCH_SIZE] for i in range(0, len(keys), NORMALIZE_BATCH_SIZE)]
+
+    async def run_chunk(chunk: List[str]):
+        items = [pending[key] for key in chunk]
+        error = None
+        try:
+            agent = get_travel_agent()
+            async with admission.admit(_upstream_key()):
+                parsed = await anormalize_destinations(agent.llm, items, resilience=kimi_resilience)
+        except (Overloaded, HTTPException) as e:
+            parsed, error = [None] * len(items), str(e.detail)
+        except Exception as e:
+            logger.error(f"normalize_destination_batch error: {e}")
+            parsed, error = [None] * len(items), str(e)
+
+        # 模型成功返回的结果整块写入缓存
+        await normalize_cache.aset_many(
+            (name, city_hint, *found) for (name, city_hint), found in zip(items, parsed) if found is not None
+        )
+        for key, (name, city_hint), found in zip(chunk, items, parsed):
+            if found is not None:
+                source = "llm"
+            else:
+                found, source = (name, []), "fallback"
+            for i in waiting[key]:
+                results[i] = NormalizeDestinationBatchItem(
+                    raw=req.items[i].name,
+                    suggestion=found[0],
+                    alternatives=found[1],
+                    source=source,
+                    error=(error or "模型未返回该条的有效结果") if source == "fallback" else None
+                )
+
+    await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+    return NormalizeDestinationBatchResponse(results=results, llm_calls=len(chunks))
+
+
 @app.post("/api/session/{session_id}/confirm_destination")
 async def confirm_destination(session_id: str, req: ConfirmDestinationRequest):
     """
     将用户确认后的目的地写入会话，并标记为已确认，避免模型重复询问。
+
+    prefetch 为真时，同时预取地图所需数据（地理编码后天气与各类 POI 并发查询，每项单独超时），
+    结果写入会话并在响应的 context 中一并返回，前端无需再依次请求。
     """
     try:
-        if not session_manager.session_exists(session_id):
+        if not await session_manager.asession_exists(session_id):
             raise HTTPException(status_code=404, detail="Session not found")
-        session = session_manager.get_session(session_id)
-        # 更新 travel_info
-        ti = session.travel_info
-        ti.destination = req.destination
-        # 兼容旧会话没有该字段
+
+        # 记录确认时数据是否已由后台预取预热，随后取消该会话尚未完成的预取
+        service = get_destination_context_service()
+        prefetcher.record("confirm", service.is_warm(req.destination, req.categories, req.radius))
+        prefetcher.cancel(session_id)
+
+        context: Optional[DestinationContext] = None
+        if req.prefetch:
+            context = await service.build(
+                req.destination, req.categories, req.radius, req.limit
+            )
+
+        def apply(session: ChatSession):
+            # 更新 travel_info
+            # 就地更新槽位（赋值会同步槽位状态与缺失字段缓存）
+            ti = session.travel_info
+            ti.destination = req.destination
+            ti.destination_confirmed = True
+            # 未预取时丢弃旧目的地的预取结果
+            if context is not None or (
+                session.destination_context is not None
+                and session.destination_context.destination != req.destination
+            ):
+                session.destination_context = context
+
         try:
-            setattr(ti, 'destination_confirmed', True)
-        except Exception:
-            pass
-        session.travel_info = ti
-        session_manager.update_session(session_id, session)
-        return {"ok": True, "destination": req.destination}
+            await session_manager.amutate_session(session_id, apply)
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Session not found")
+        return {"ok": True, "destination": req.destination, "context": context}
     except HTTPException:
         raise
     except Exception as e:
@@ -276,46 +753,28 @@ async def confirm_destination(session_id: str, req: ConfirmDestinationRequest):
 
 
 @app.get("/api/kimi/health")
-async def kimi_health():
-    """Kimi API 健康检查：尝试最小调用来验证联通性"""
-    from langchain_core.messages import HumanMessage
-    t0 = time.perf_counter()
-    try:
-        msg = HumanMessage(content="ping")
-        # 若未配置密钥，直接返回失败但不抛异常
-        if not os.getenv("KIMI_API_KEY") or not os.getenv("KIMI_BASE_URL"):
-            elapsed_ms = int((time.perf_counter() - t0) * 1000)
-            return {
-                "ok": False,
-                "elapsed_ms": elapsed_ms,
-                "error": "KIMI_API_KEY 或 KIMI_BASE_URL 未配置",
-                "env": {
-                    "base_url": _mask_url(os.getenv("KIMI_BASE_URL")),
-                    "key_hint": _mask_key(os.getenv("KIMI_API_KEY"))
-                }
-            }
-        agent = get_travel_agent()
-        res = agent.llm.invoke([msg])
-        elapsed_ms = int((time.perf_counter() - t0) * 1000)
-        content = getattr(res, "content", "")
-        model = getattr(agent.llm, "model", os.getenv("KIMI_MODEL", "unknown"))
-        return {
-            "ok": True,
-            "elapsed_ms": elapsed_ms,
-            "model": model,
-            "preview": str(content)[:120],
-            "env": {
-                "base_url": _mask_url(os.getenv("KIMI_BASE_URL"))
-            }
-        }
-    except Exception as e:
-        elapsed_ms = int((time.perf_counter() - t0) * 1000)
-        logger.error(f"Kimi health check failed: {e}")
-        return {
-            "ok": False,
-            "elapsed_ms": elapsed_ms,
-            "error": str(e)
-        }
+async def kimi_health(live: bool = False):
+    """
+    Kimi API 健康检查：返回后台探测缓存的最近结果（不调用模型、不消耗 token）
+
+    Args:
+        live: 为 true 时立即探测一次再返回
+
+    Returns:
+        ok / elapsed_ms / error / age_s / p50_ms / p95_ms 等探测状态
+    """
+    if live:
+        await health_prober.probe()
+    result = health_prober.snapshot()
+    result["model"] = os.getenv("KIMI_MODEL", "kimi-k2-0905")
+    result["resilience"] = kimi_resilience.stats()
+    # 熔断打开时即使探测成功也视为不可用（实际调用会被直接拒绝）
+    result["ok"] = result["ok"] and kimi_resilience.breaker.state != "open"
+    result["env"] = {
+        "base_url": _mask_url(os.getenv("KIMI_BASE_URL")),
+        "key_hint": _mask_key(os.getenv("KIMI_API_KEY"))
+    }
+    return result
 
 
 @app.post("/api/session/new", response_model=SessionResponse)
@@ -327,7 +786,7 @@ async def create_new_session():
         SessionResponse: 包含新创建的session_id
     """
     try:
-        session_id = session_manager.create_session()
+        session_id = await session_manager.acreate_session()
         logger.info(f"Created new session: {session_id}")
         return SessionResponse(session_id=session_id)
     except Exception as e:
@@ -347,10 +806,10 @@ async def get_session_info(session_id: str):
         ChatResponse: 包含当前会话的旅行信息和完成状态
     """
     try:
-        if not session_manager.session_exists(session_id):
+        if not await session_manager.asession_exists(session_id):
             raise HTTPException(status_code=404, detail="Session not found")
 
-        session = session_manager.get_session(session_id)
+        session = await session_manager.aget_session(session_id)
         is_complete = session.travel_info.is_complete()
 
         return ChatResponse(
@@ -366,6 +825,72 @@ async def get_session_info(session_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/sessions/batch", response_model=SessionBatchResponse)
+async def get_sessions_batch(req: SessionBatchRequest):
+    """
+    批量获取会话信息（如管理面板），每个会话的内容与 GET /api/session/{id} 相同
+
+    只读，不刷新会话的访问时间；SQLite 存储按块一次查询多条，不逐个读取。
+    """
+    if len(req.session_ids) > SESSION_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"单次最多获取 {SESSION_BATCH_MAX} 个会话")
+    try:
+        found = await session_manager.aget_sessions(req.session_ids)
+    except Exception as e:
+        logger.error(f"Error getting sessions: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    sessions, missing = [], []
+    for session_id in dict.fromkeys(req.session_ids):
+        session = found.get(session_id)
+        if session is None:
+            missing.append(session_id)
+            continue
+        sessions.append(ChatResponse(
+            session_id=session_id,
+            response="",
+            travel_info=session.travel_info,
+            is_complete=session.travel_info.is_complete()
+        ))
+    return SessionBatchResponse(sessions=sessions, missing=missing)
+
+
+@app.get("/api/session/{session_id}/usage")
+async def get_session_usage(session_id: str):
+    """
+    获取会话累计的模型调用次数与 token 用量
+
+    Args:
+        session_id: 会话ID
+
+    Returns:
+        {"session_id", "token_usage": {"calls", "prompt_tokens", "completion_tokens", "cached_tokens"}}
+    """
+    try:
+        session = await session_manager.aget_session(session_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"session_id": session_id, "token_usage": session.token_usage}
+
+
+@app.get("/api/session/{session_id}/destination_context")
+async def get_destination_context(session_id: str):
+    """
+    获取确认目的地时预取的地图数据
+
+    Args:
+        session_id: 会话ID
+
+    Returns:
+        {"session_id", "context": DestinationContext 或 None}
+    """
+    try:
+        session = await session_manager.aget_session(session_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"session_id": session_id, "context": session.destination_context}
+
+
 @app.delete("/api/session/{session_id}")
 async def delete_session(session_id: str):
     """
@@ -378,10 +903,11 @@ async def delete_session(session_id: str):
         成功消息
     """
     try:
-        if not session_manager.session_exists(session_id):
+        if not await session_manager.asession_exists(session_id):
             raise HTTPException(status_code=404, detail="Session not found")
 
-        session_manager.delete_session(session_id)
+        await session_manager.adelete_session(session_id)
+        prefetcher.cancel(session_id)
         logger.info(f"Deleted session: {session_id}")
         return {"message": "Session deleted successfully"}
     except HTTPException:
@@ -391,9 +917,58 @@ async def delete_session(session_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# @app.post("/api/gaode_poi")
-# async def gaode_poi_retrival(user_input: str):
-#     pass
+@app.get("/api/stats")
+async def stats():
+    """运行统计：会话存储容量、淘汰与过期计数、存活会话的历史压缩节省字节数、缓存命中率、模型调用与解析失败等"""
+    gazetteer = get_gazetteer()
+    poi_service = get_poi_service()
+    return {
+        "agent": travel_agent.stats() if travel_agent is not None else None,
+        "tokens": token_meter.stats(),
+        "llm_clients": llm_clients.stats(),
+        "single_flight": llm_flight.stats(),
+        "admission": {**admission.stats(), "sessions": session_locks.stats()},
+        "poi": poi_service.stats() if poi_service is not None else None,
+        "destination_context": get_destination_context_service().stats(),
+        "prefetch": prefetcher.stats(),
+        "sessions": await session_manager.astats(),
+        "history": history_policy.stats(),
+        "normalize_cache": normalize_cache.stats(),
+        "turn_cache": turn_cache.stats(),
+        "gazetteer": gazetteer.stats() if gazetteer is not None else None,
+        "chat": metrics.stats()
+    }
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus 文本格式的指标：对话轮次计数、端到端与各阶段耗时直方图"""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.post("/api/gaode_poi", response_model=POISearchResponse)
+async def gaode_poi_retrival(req: POISearchRequest):
+    """
+    查询终点附近的 POI（美食、酒店等），一次请求可查询多个类别
+
+    结果按 (geohash 单元, 类别, 半径) 在服务端跨用户缓存，热门目的地不必每个浏览器各自调用高德。
+
+    Args:
+        req: 中心点、类别列表、半径与每类条数
+
+    Returns:
+        POISearchResponse
+    """
+    service = get_poi_service()
+    if service is None:
+        # 未配置高德 Key：不返回固定数据冒充真实结果，前端收到 503 后改用浏览器端搜索
+        raise HTTPException(status_code=503, detail="POI search is not configured (AMAP_KEY is not set)")
+    try:
+        results = await service.search_many(req.lng, req.lat, req.categories, req.radius, req.limit)
+    except Exception as e:
+        logger.error(f"POI search error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return POISearchResponse(center=[req.lng, req.lat], radius=req.radius, results=results)
 
 
 @app.get("/")
@@ -404,4 +979,8 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # 多 worker 需要共享会话存储：请同时设置 SESSION_BACKEND=sqlite
+    workers = int(os.getenv("UVICORN_WORKERS", "1"))
+    if workers > 1 and os.getenv("SESSION_BACKEND", "memory").lower() == "memory":
+        logger.warning("UVICORN_WORKERS > 1 但 SESSION_BACKEND=memory：各 worker 之间的会话不共享")
+    uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, workers=workers)
@@ -0,0 +1,300 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 默认分桶（秒）：覆盖从亚毫秒级的本地处理到数十秒的模型调用
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """单调递增计数器，按标签值分组"""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {"/".join(k) or "total": v for k, v in sorted(self._values.items())}
+
+
+class Histogram:
+    """
+    固定分桶直方图，按标签值分组
+
+    每个序列只保存各桶计数、总和与次数，观测为 O(log 桶数)，内存与请求量无关。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> [各桶计数（最后一个为 +Inf）, 总和, 次数]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._series.items())
+        for labelvalues, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def quantile(self, q: float, *labelvalues: str) -> Optional[float]:
+        """
+        按分桶估算分位数（取所在桶的上界），用于 /api/stats 摘要
+
+        落在最高桶之外的观测没有有限上界，此时返回最高桶的上界（即"至少这么久"），
+        保证结果可以序列化为 JSON。
+        """
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None or not series[2]:
+                return None
+            counts, count = [*series[0]], series[2]
+        target, cumulative = q * count, 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            if cumulative >= target:
+                return bound
+        return self.buckets[-1]
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            keys = {k: (v[1], v[2]) for k, v in self._series.items()}
+        return {
+            "/".join(k) or "total": {
+                "count": count,
+                "avg_ms": round(total / count * 1000, 2) if count else 0.0,
+                "p50_ms": round(self.quantile(0.5, *k) * 1000, 1),
+                "p99_ms": round(self.quantile(0.99, *k) * 1000, 1)
+            }
+            for k, (total, count) in sorted(keys.items())
+        }
+
+
+class MetricsRegistry:
+    """指标注册表：按 Prometheus 文本格式（0.0.4）导出所有指标"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """
+    单次请求的分阶段计时
+
+    同一阶段多次进入（如重试的模型调用）时耗时累加；mark_first 记录某阶段开始后首个事件的耗时（如首字节）。
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+        # 处理路径（如 cache），为空时按是否调用了模型推断为 llm / fast
+        self.path: Optional[str] = None
+        self._open: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        self._open[name] = t0
+        try:
+            yield
+        finally:
+            self._open.pop(name, None)
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - t0
+
+    def mark_first(self, name: str, since: str):
+        """
+        记录阶段 since 开始到现在的耗时（每个请求只记录第一次）
+
+        Args:
+            name: 记录的名称（如 llm_ttfb）
+            since: 正在进行中的阶段名（如 llm）
+        """
+        t0 = self._open.get(since)
+        if t0 is not None and name not in self.durations:
+            self.durations[name] = time.perf_counter() - t0
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Server-Timing 响应头：各阶段耗时与总耗时（毫秒）"""
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.durations.items()]
+        entries.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(entries)
+
+
+# 当前请求的计时器；Agent 与 HTTP 客户端回调通过它记录阶段，无需逐层传参
+_current_timer: ContextVar[Optional[StageTimer]] = ContextVar("stage_timer", default=None)
+
+
+def start_timer() -> StageTimer:
+    """为当前请求（当前异步上下文）创建计时器"""
+    timer = StageTimer()
+    _current_timer.set(timer)
+    return timer
+
+
+def bind_timer(timer: StageTimer):
+    """在另一个异步上下文（如 StreamingResponse 的生成器任务）中继续使用已有计时器"""
+    _current_timer.set(timer)
+
+
+def current_timer() -> Optional[StageTimer]:
+    return _current_timer.get()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """在当前请求的计时器上记录一个阶段；不在计时的请求中时不做任何事"""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
+
+
+def mark_first(name: str, since: str):
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.mark_first(name, since)
+
+
+def set_path(path: str):
+    """标记当前请求的处理路径（如命中轮次缓存时为 cache）"""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.path = path
+
+
+# 全局指标
+registry = MetricsRegistry()
+chat_requests = registry.counter(
+    "chat_requests_total", "Chat turns by endpoint, path (fast/llm) and outcome", ("endpoint", "path", "outcome")
+)
+chat_request_seconds = registry.histogram(
+    "chat_request_seconds", "End-to-end chat turn latency", ("endpoint", "path")
+)
+chat_stage_seconds = registry.histogram(
+    "chat_stage_seconds", "Chat turn latency by pipeline stage", ("endpoint", "stage")
+)
+chat_fallbacks = registry.counter(
+    "chat_fallbacks_total", "Turns answered with the fallback reply", ("endpoint",)
+)
+turn_cache_lookups = registry.counter(
+    "chat_turn_cache_lookups_total", "Turn response cache lookups by result (hit/miss)", ("result",)
+)
+
+
+def record_chat_turn(timer: StageTimer, endpoint: str, outcome: str):
+    """
+    请求结束时将本轮各阶段耗时写入直方图
+
+    Args:
+        timer: 本轮计时器
+        endpoint: chat / chat_stream（path 为 fast / cache / llm）
+        outcome: ok / overloaded / error
+    """
+    path = timer.path or ("llm" if "llm" in timer.durations else "fast")
+    chat_requests.inc(endpoint, path, outcome)
+    chat_request_seconds.observe(timer.elapsed(), endpoint, path)
+    for name, seconds in timer.durations.items():
+        chat_stage_seconds.observe(seconds, endpoint, name)
+    if "fallback" in timer.durations:
+        chat_fallbacks.inc(endpoint)
+
+
+def stats() -> Dict:
+    """/api/stats 中的摘要：各阶段次数、平均与分位耗时"""
+    return {
+        "requests": chat_requests.stats(),
+        "latency": chat_request_seconds.stats(),
+        "stages": chat_stage_seconds.stats()
+    }
@@ -0,0 +1,266 @@
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# 地名中常见的繁体字 -> 简体字（未安装 opencc 时使用）
+_TRADITIONAL = (
+    "臺台 灣湾 門门 廣广 東东 龍龙 華华 陽阳 蘇苏 錫锡 漢汉 廈厦 濟济 寧宁 島岛 長长 慶庆 鄭郑 瀋沈 連连 "
+    "雲云 貴贵 灘滩 橋桥 園园 湯汤 澤泽 區区 縣县 鎮镇 鄉乡 關关 開开 豐丰 衛卫 陝陕 寶宝 蓮莲 閣阁 樓楼 "
+    "臨临 麗丽 觀观 嶺岭 峽峡 遼辽 黃黄 頤颐 鳳凤 塢坞 湧涌 滬沪 灕漓 蘭兰 紹绍 溫温 遠远 嶽岳 齊齐 魯鲁 "
+    "晉晋 贛赣 閩闽 粵粤 瓊琼 甯宁 烏乌 倫伦 薩萨 爾尔 團团 崗岗 館馆 廟庙 國国 際际 場场 廳厅 莊庄 劃划 "
+    "線线 車车 鐵铁 頭头 龕龛 窩窝 潯浔 楊杨 張张 陳陈 葉叶 賓宾 饒饶 邊边 驛驿 舊旧 亞亚 號号 壩坝 銀银 "
+    "鄰邻 禪禅 淨净 蕪芜 蕭萧 興兴 潛潜 廬庐 歷历 營营 盤盘 錦锦 撫抚 順顺 贊赞 綿绵 僑侨 盧卢"
+)
+_T2S_TABLE = {ord(pair[0]): pair[1] for pair in _TRADITIONAL.split()}
+
+try:  # 可选依赖：安装 opencc 时使用完整的繁简转换
+    from opencc import OpenCC  # type: ignore
+
+    _opencc = OpenCC("t2s")
+except Exception:
+    _opencc = None
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """
+    规范化地名文本，用作缓存键
+
+    - NFKC：全角字母/数字/标点转半角
+    - 去掉所有空白
+    - 繁体转简体
+    - 拉丁字母转小写
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        规范化后的文本
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text)
+    text = _WHITESPACE.sub("", text)
+    if _opencc is not None:
+        text = _opencc.convert(text)
+    else:
+        text = text.translate(_T2S_TABLE)
+    return text.lower()
+
+
+def normalize_key(name: str, city_hint: Optional[str] = None) -> str:
+    """由 (name, city_hint) 生成缓存键"""
+    return f"{normalize_text(name)}|{normalize_text(city_hint)}"
+
+
+class NormalizationCache:
+    """
+    目的地补全结果缓存：内存 LRU/TTL，可选持久化到本地 SQLite 文件（重启后仍然有效）
+
+    同步方法供脚本使用；接口中使用 a 前缀的异步方法。启用持久化时，内存未命中后的 SQLite 读写
+    在专用线程池中执行，不占用事件循环；内存命中直接返回。
+    """
+
+    def __init__(self, max_size: int = 5000, ttl: float = 7 * 24 * 3600, path: Optional[str] = None,
+                 io_threads: int = 2):
+        """
+        初始化缓存
+
+        Args:
+            max_size: 内存中最多缓存的条目数
+            ttl: 条目有效期（秒）
+            path: 持久化 SQLite 文件路径，为空时仅使用内存
+            io_threads: 持久化读写使用的线程数
+        """
+        self.memory: TTLCache[Tuple[str, List[str]]] = TTLCache(max_size=max_size, ttl=ttl)
+        self.ttl = ttl
+        self.path = path
+        self.persistent_hits = 0
+        self._local = threading.local()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn().execute(
+                "CREATE TABLE IF NOT EXISTS normalize_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            self._executor = ThreadPoolExecutor(max_workers=max(1, io_threads), thread_name_prefix="normalize-cache")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """执行一次持久化读写；启用持久化时放到线程池，并带上当前上下文"""
+        if self._executor is None:
+            return fn(*args)
+        call = functools.partial(contextvars.copy_context().run, fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    def _load(self, keys: Sequence[str]) -> Dict[str, Tuple[str, List[str]]]:
+        """从持久化文件读取未过期的条目并放回内存缓存"""
+        if not self.path or not keys:
+            return {}
+        try:
+            placeholders = ",".join("?" * len(keys))
+            rows = self._conn().execute(
+                f"SELECT key, value, expires_at FROM normalize_cache WHERE key IN ({placeholders})", tuple(keys)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"normalize cache read failed: {e}")
+            return {}
+        now = time.time()
+        found = {}
+        for key, raw, expires_at in rows:
+            if expires_at < now:
+                continue
+            data = json.loads(raw)
+            value = (data["suggestion"], data["alternatives"])
+            self.memory.set(key, value, ttl=expires_at - now)
+            self.persistent_hits += 1
+            found[key] = value
+        return found
+
+    def _store(self, entries: Sequence[Tuple[str, str, List[str]]]):
+        """写入持久化文件：[(键, 建议名称, 候选列表)]"""
+        if not self.path or not entries:
+            return
+        expires_at = time.time() + self.ttl
+        try:
+            self._conn().executemany(
+                "INSERT OR REPLACE INTO normalize_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                [(key, json.dumps({"suggestion": suggestion, "alternatives": list(alternatives)}, ensure_ascii=False),
+                  expires_at) for key, suggestion, alternatives in entries]
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"normalize cache write failed: {e}")
+
+    def get(self, name: str, city_hint: Optional[str] = None) -> Optional[Tuple[str, List[str]]]:
+        """
+        查询缓存
+
+        Returns:
+            (建议名称, 候选列表)；未命中时返回 None
+        """
+        key = normalize_key(name, city_hint)
+        value = self.memory.get(key)
+        if value is not None or not self.path:
+            return value
+        return self._load([key]).get(key)
+
+    def set(self, name: str, city_hint: Optional[str], suggestion: str, alternatives: List[str]):
+        """写入缓存（内存 + 持久化）"""
+        key = normalize_key(name, city_hint)
+        self.memory.set(key, (suggestion, list(alternatives)))
+        self._store([(key, suggestion, alternatives)])
+
+    # ---- 异步版本：接口处理函数使用，持久化读写不阻塞事件循环 ----
+
+    async def aget(self, name: str, city_hint: Optional[str] = None) -> Optional[Tuple[str, List[str]]]:
+        key = normalize_key(name, city_hint)
+        value = self.memory.get(key)
+        if value is not None or not self.path:
+            return value
+        return (await self._run(self._load, [key])).get(key)
+
+    async def aget_many(
+        self,
+        items: Iterable[Tuple[str, Optional[str]]]
+    ) -> List[Optional[Tuple[str, List[str]]]]:
+        """
+        批量查询缓存：内存未命中的条目一次查询持久化文件
+
+        Args:
+            items: [(原始名称, 城市提示)]
+
+        Returns:
+            与 items 等长的 (建议名称, 候选列表)；未命中的条目为 None
+        """
+        keys = [normalize_key(name, city_hint) for name, city_hint in items]
+        found = {}
+        for key in keys:
+            value = self.memory.get(key)
+            if value is not None:
+                found[key] = value
+        missing = list(dict.fromkeys(key for key in keys if key not in found))
+        if missing and self.path:
+            for start in range(0, len(missing), 500):
+                found.update(await self._run(self._load, missing[start:start + 500]))
+        return [found.get(key) for key in keys]
+
+    async def aset(self, name: str, city_hint: Optional[str], suggestion: str, alternatives: List[str]):
+        await self.aset_many([(name, city_hint, suggestion, alternatives)])
+
+    async def aset_many(self, entries: Iterable[Tuple[str, Optional[str], str, List[str]]]):
+        """
+        批量写入缓存（内存 + 一次持久化写入）
+
+        Args:
+            entries: [(原始名称, 城市提示, 建议名称, 候选列表)]
+        """
+        rows = []
+        for name, city_hint, suggestion, alternatives in entries:
+            key = normalize_key(name, city_hint)
+            self.memory.set(key, (suggestion, list(alternatives)))
+            rows.append((key, suggestion, list(alternatives)))
+        if rows and self.path:
+            await self._run(self._store, rows)
+
+    def close(self):
+        """等待进行中的持久化读写完成"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def stats(self) -> Dict:
+        """缓存统计（hits 含从持久化文件加载的命中）"""
+        stats = self.memory.stats()
+        stats["hits"] += self.persistent_hits
+        stats["misses"] -= self.persistent_hits
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / total, 4) if total else 0.0
+        stats["persistent_hits"] = self.persistent_hits
+        stats["persistent"] = bool(self.path)
+        return stats
+
+
+def _create_cache_from_env() -> NormalizationCache:
+    """
+    根据环境变量创建缓存
+
+    环境变量：
+        NORMALIZE_CACHE_SIZE: 内存条目上限（默认 5000）
+        NORMALIZE_CACHE_TTL: 有效期秒数（默认 7 天）
+        NORMALIZE_CACHE_PATH: 持久化 SQLite 文件路径（默认不持久化）
+        NORMALIZE_CACHE_IO_THREADS: 持久化读写使用的线程数（默认 2）
+    """
+    return NormalizationCache(
+        max_size=int(os.getenv("NORMALIZE_CACHE_SIZE", "5000")),
+        ttl=float(os.getenv("NORMALIZE_CACHE_TTL", str(7 * 24 * 3600))),
+        path=os.getenv("NORMALIZE_CACHE_PATH") or None,
+        io_threads=int(os.getenv("NORMALIZE_CACHE_IO_THREADS", "2"))
+    )
+
+
+# 全局目的地补全缓存
+normalize_cache = _create_cache_from_env()
@@ -0,0 +1,387 @@
+import asyncio
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from .base import POI
+from .cache import TTLCache
+from .geo import cell_half_diagonal_m, geohash_center, geohash_encode, haversine_m
+from .single_flight import SingleFlight
+from .spatial_index import POIIndex
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "data", "poi_fixture.json")
+
+# 前端使用的类别 -> 高德搜索关键字；其它类别直接作为关键字
+CATEGORY_KEYWORDS = {
+    "food": "美食",
+    "hotel": "酒店",
+    "scenic": "景点"
+}
+
+AMAP_AROUND_URL = "https://restapi.amap.com/v3/place/around"
+# 高德周边搜索单页最多返回 25 条
+AMAP_PAGE_SIZE = 25
+
+
+class POIProvider(ABC):
+    """POI 数据源"""
+
+    # 单次查询最多返回的条数（None 表示返回半径内全部结果）；达到上限说明结果被截断，只覆盖离中心最近的部分
+    max_results: Optional[int] = None
+
+    @abstractmethod
+    async def search_nearby(self, lng: float, lat: float, category: str, radius: int) -> List[POI]:
+        """
+        搜索中心点附近某类 POI
+
+        Args:
+            lng: 中心经度
+            lat: 中心纬度
+            category: 类别（food / hotel / scenic 或任意关键字）
+            radius: 搜索半径（米）
+
+        Returns:
+            POI 列表（distance 为到中心点的距离）
+        """
+
+
+class AmapPOIProvider(POIProvider):
+    """
+    高德 Web 服务周边搜索（/v3/place/around）
+
+    结果按距离排序并分页返回；逐页获取直到取完或达到 max_pages，
+    达到上限时返回的是离中心最近的 max_pages * 25 条。
+    """
+
+    def __init__(self, key: str, client_factory, timeout: float = 5.0, max_pages: int = 4):
+        """
+        初始化
+
+        Args:
+            key: 高德 Web 服务 Key
+            client_factory: 返回共享异步HTTP客户端的函数
+            timeout: 单次请求超时（秒）
+            max_pages: 单次查询最多获取的页数（每页 25 条，每页消耗一次配额）
+        """
+        self.key = key
+        self.client_factory = client_factory
+        self.timeout = timeout
+        self.max_pages = max(1, max_pages)
+        self.max_results = self.max_pages * AMAP_PAGE_SIZE
+
+    async def _page(self, params: Dict, page: int) -> Dict:
+        response = await self.client_factory().get(
+            AMAP_AROUND_URL, params={**params, "page": page}, timeout=self.timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+        if str(data.get("status")) != "1":
+            raise RuntimeError(f"AMap place/around failed: {data.get('info')} ({data.get('infocode')})")
+        return data
+
+    async def search_nearby(self, lng: float, lat: float, category: str, radius: int) -> List[POI]:
+        params = {
+            "key": self.key,
+            "location": f"{lng:.6f},{lat:.6f}",
+            "keywords": CATEGORY_KEYWORDS.get(category, category),
+            "radius": min(int(radius), 50000),
+            "offset": AMAP_PAGE_SIZE,
+            "sortrule": "distance",
+            "extensions": "base"
+        }
+        first = await self._page(params, 1)
+        items = list(first.get("pois") or [])
+        # 首页返回总条数，其余页并发获取
+        try:
+            total = int(first.get("count") or 0)
+        except (TypeError, ValueError):
+            total = 0
+        pages = min(self.max_pages, -(-total // AMAP_PAGE_SIZE))
+        if len(items) >= AMAP_PAGE_SIZE and pages > 1:
+            for data in await asyncio.gather(*(self._page(params, page) for page in range(2, pages + 1))):
+                items.extend(data.get("pois") or [])
+
+        pois: List[POI] = []
+        for item in items:
+            try:
+                poi_lng, poi_lat = (float(v) for v in str(item.get("location", "")).split(","))
+            except ValueError:
+                continue
+            address = item.get("address")
+            pois.append(POI(
+                name=item.get("name") or "",
+                type=str(item.get("type") or "").split(";")[0],
+                location=[poi_lng, poi_lat],
+                distance=int(float(item.get("distance") or 0)),
+                address=address if isinstance(address, str) else None
+            ))
+        return pois
+
+
+class FixturePOIProvider(POIProvider):
+    """
+    本地 JSON 数据源（离线开发、压测与验证用，不调用高德）
+
+    数据加载到空间索引中，以类别为标签，半径查询只扫描覆盖范围内的网格，可用于较大的本地 POI 数据集。
+    """
+
+    def __init__(self, path: str = DEFAULT_FIXTURE_PATH, precision: int = 6):
+        """
+        初始化
+
+        Args:
+            path: JSON 文件路径，内容为 [{"name", "type", "category", "location": [lng, lat], "address"}]
+            precision: 空间索引的网格精度
+        """
+        with open(path, encoding="utf-8") as f:
+            items: List[Dict] = json.load(f)
+        self.index = POIIndex(precision)
+        self.index.bulk_load(
+            (
+                item["location"][0],
+                item["location"][1],
+                POI(
+                    name=item["name"],
+                    type=item.get("type", ""),
+                    location=list(item["location"]),
+                    distance=0,
+                    address=item.get("address")
+                ),
+                item.get("category")
+            )
+            for item in items
+        )
+        self.categories = {item.get("category") for item in items}
+        self.calls = 0
+
+    async def search_nearby(self, lng: float, lat: float, category: str, radius: int) -> List[POI]:
+        self.calls += 1
+        if category in self.categories:
+            return self.index.pois_within(lng, lat, radius, tag=category)
+        # 未登记的类别按关键字匹配名称或类型
+        keyword = CATEGORY_KEYWORDS.get(category, category)
+        return [
+            poi for poi in self.index.pois_within(lng, lat, radius)
+            if keyword in poi.name or keyword in poi.type
+        ]
+
+
+class POIService:
+    """
+    周边 POI 查询：按 (geohash 单元, 类别, 半径) 跨用户共享缓存
+
+    同一单元内的请求统一以单元中心、半径加上单元半对角线向数据源查询并缓存，
+    再按请求的实际中心点重新计算距离、过滤与排序。
+    数据源返回了完整结果时，缓存对单元内任意中心点都准确；结果被截断（达到数据源的 max_results）时，
+    缓存只覆盖单元中心到最远一条结果的距离，其中不足以给出最近的 limit 条时改为以实际中心点直接查询数据源。
+    """
+
+    def __init__(self, provider: POIProvider, cache: TTLCache, precision: int = 6):
+        """
+        初始化
+
+        Args:
+            provider: POI 数据源
+            cache: 缓存（键为 geohash|类别|半径）
+            precision: geohash 精度（6 约 1.2km x 0.6km）
+        """
+        self.provider = provider
+        self.cache = cache
+        self.precision = precision
+        # 相同单元的并发未命中只查询一次数据源
+        self._flight = SingleFlight()
+        self.provider_errors = 0
+        # 单元结果被截断、完整部分不足 limit 条而直接查询的次数
+        self.direct_queries = 0
+
+    def cache_key(self, lng: float, lat: float, category: str, radius: int) -> str:
+        """缓存键：geohash 单元 + 类别 + 半径"""
+        return f"{geohash_encode(lat, lng, self.precision)}|{category}|{int(radius)}"
+
+    async def _cell_pois(
+        self,
+        lng: float,
+        lat: float,
+        category: str,
+        radius: int
+    ) -> Tuple[List[POI], float, float, float]:
+        """
+        单元的缓存结果
+
+        Returns:
+            (POI 列表, 覆盖距离（米，单元中心到该距离内的 POI 完整）, 单元中心经度, 单元中心纬度)
+        """
+        key = self.cache_key(lng, lat, category, radius)
+        cell_lat, cell_lng = geohash_center(key.split("|", 1)[0])
+        cached = self.cache.get(key)
+        if cached is not None:
+            return (*cached, cell_lng, cell_lat)
+
+        query_radius = int(radius + cell_half_diagonal_m(self.precision, cell_lat)) + 1
+
+        async def fetch() -> Tuple[List[POI], float]:
+            pois = await self.provider.search_nearby(cell_lng, cell_lat, category, query_radius)
+            covered = float(query_radius)
+            limit = self.provider.max_results
+            if limit is not None and len(pois) >= limit:
+                # 按距离截断：只有最远一条结果以内是完整的
+                covered = max(haversine_m(cell_lng, cell_lat, p.location[0], p.location[1]) for p in pois)
+            entry = (pois, covered)
+            self.cache.set(key, entry)
+            return entry
+
+        entry, _ = await self._flight.run(key, fetch)
+        return (*entry, cell_lng, cell_lat)
+
+    @staticmethod
+    def _nearest(lng: float, lat: float, pois: List[POI], radius: float) -> List[POI]:
+        """半径内的 POI，距离改为到 (lng, lat) 的距离并按距离排序"""
+        results: List[POI] = []
+        for poi in pois:
+            distance = haversine_m(lng, lat, poi.location[0], poi.location[1])
+            if distance <= radius:
+                results.append(poi.model_copy(update={"distance": int(distance)}))
+        results.sort(key=lambda p: p.distance)
+        return results
+
+    async def search(self, lng: float, lat: float, category: str, radius: int = 2000,
+                     limit: int = 12) -> List[POI]:
+        """
+        查询单个类别
+
+        单元结果被截断时，只有到请求中心不超过（覆盖距离 - 中心到单元中心的距离）的部分是完整的；
+        这部分已有 limit 条时直接返回，否则以请求中心直接查询数据源。
+
+        Args:
+            lng: 中心经度
+            lat: 中心纬度
+            category: 类别
+            radius: 半径（米）
+            limit: 最多返回条数
+
+        Returns:
+            按距离排序的 POI 列表
+        """
+        pois, covered, cell_lng, cell_lat = await self._cell_pois(lng, lat, category, radius)
+        exact = covered - haversine_m(lng, lat, cell_lng, cell_lat)
+        if exact > radius:
+            return self._nearest(lng, lat, pois, radius)[:limit]
+        results = self._nearest(lng, lat, pois, exact)
+        if len(results) >= limit:
+            return results[:limit]
+        self.direct_queries += 1
+        pois = await self.provider.search_nearby(lng, lat, category, radius)
+        return self._nearest(lng, lat, pois, radius)[:limit]
+
+    async def search_many(self, lng: float, lat: float, categories: List[str], radius: int = 2000,
+                          limit: int = 12) -> Dict[str, List[POI]]:
+        """
+        一次查询多个类别（并发），某个类别失败时返回空列表，不影响其它类别
+
+        Returns:
+            {类别: POI 列表}
+        """
+        unique = list(dict.fromkeys(categories))
+        results = await asyncio.gather(
+            *[self.search(lng, lat, category, radius, limit) for category in unique],
+            return_exceptions=True
+        )
+        merged: Dict[str, List[POI]] = {}
+        for category, result in zip(unique, results):
+            if isinstance(result, Exception):
+                self.provider_errors += 1
+                logger.warning(f"POI search failed for {category}: {result}")
+                merged[category] = []
+            else:
+                merged[category] = result
+        return merged
+
+    def stats(self) -> Dict:
+        """缓存命中率与数据源调用统计"""
+        return {
+            "provider": type(self.provider).__name__,
+            "precision": self.precision,
+            "cache": self.cache.stats(),
+            "provider_calls": self._flight.upstream_calls,
+            "coalesced": self._flight.coalesced,
+            "provider_errors": self.provider_errors,
+            "direct_queries": self.direct_queries,
+            "index": self.provider.index.stats() if isinstance(self.provider, FixturePOIProvider) else None
+        }
+
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_amap_http_client() -> httpx.AsyncClient:
+    """高德 Web 服务请求共用的异步HTTP客户端（POI、地理编码、天气）"""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=10))
+    return _http_client
+
+
+async def close_poi_clients():
+    """关闭高德请求使用的HTTP客户端（应用关闭时调用）"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _create_service_from_env() -> Optional[POIService]:
+    """
+    根据环境变量创建 POI 服务
+
+    本地固定数据只覆盖少数景区，仅在显式设置 POI_PROVIDER=fixture 时使用（压测与离线验证）；
+    未配置 AMAP_KEY 时不提供服务（返回 None），由前端改用浏览器端搜索，而不是返回不完整的固定数据。
+
+    环境变量：
+        POI_PROVIDER: amap（默认）或 fixture
+        AMAP_KEY: 高德 Web 服务 Key
+        POI_FIXTURE_PATH: 固定数据文件路径（默认 backend/data/poi_fixture.json）
+        POI_CACHE_SIZE: 缓存条目上限（默认 5000）
+        POI_CACHE_TTL: 缓存有效期秒数（默认 6 小时）
+        POI_GEOHASH_PRECISION: 缓存单元的 geohash 精度（默认 6）
+        AMAP_POI_MAX_PAGES: 高德周边搜索单次查询最多获取的页数（默认 4，每页 25 条）
+    """
+    kind = os.getenv("POI_PROVIDER", "amap").lower()
+    if kind == "fixture":
+        provider: POIProvider = FixturePOIProvider(os.getenv("POI_FIXTURE_PATH") or DEFAULT_FIXTURE_PATH)
+    elif kind == "amap":
+        amap_key = os.getenv("AMAP_KEY")
+        if not amap_key:
+            logger.warning("AMAP_KEY is not set; backend POI search is disabled")
+            return None
+        provider = AmapPOIProvider(
+            amap_key, get_amap_http_client, max_pages=int(os.getenv("AMAP_POI_MAX_PAGES", "4"))
+        )
+    else:
+        raise ValueError(f"Unknown POI_PROVIDER: {kind}")
+    return POIService(
+        provider=provider,
+        cache=TTLCache(
+            max_size=int(os.getenv("POI_CACHE_SIZE", "5000")),
+            ttl=float(os.getenv("POI_CACHE_TTL", str(6 * 3600)))
+        ),
+        precision=int(os.getenv("POI_GEOHASH_PRECISION", "6"))
+    )
+
+
+_poi_service: Optional[POIService] = None
+_poi_service_loaded = False
+
+
+def get_poi_service() -> Optional[POIService]:
+    """获取全局 POI 服务（首次调用时创建）；未配置数据源时返回 None"""
+    global _poi_service, _poi_service_loaded
+    if not _poi_service_loaded:
+        _poi_service = _create_service_from_env()
+        _poi_service_loaded = True
+    return _poi_service
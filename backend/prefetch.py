@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """
+    后台预取：对话中提取到目的地（尚未确认）时，提前预热补全、地理编码与 POI 等缓存
+
+    - 每个会话最多一个预取任务；目的地变化时取消旧任务再启动新任务
+    - 有界工作池：最多 workers 个任务同时执行，排队任务超过 max_pending 时丢弃新任务
+    - 预取只为预热缓存，失败只计数、不影响对话
+    """
+
+    def __init__(self, workers: int = 4, max_pending: int = 64, enabled: bool = True):
+        """
+        初始化
+
+        Args:
+            workers: 同时执行的预取任务数
+            max_pending: 未完成（执行中 + 排队）的任务数上限
+            enabled: 是否启用
+        """
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.enabled = enabled
+        self._sem: Optional[asyncio.Semaphore] = None
+        # session_id -> (目的地, 任务)
+        self._tasks: Dict[str, Tuple[str, asyncio.Task]] = {}
+        # 统计计数
+        self.scheduled = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.dropped = 0
+        # 限速配额不足而跳过的投机模型调用
+        self.llm_skipped = 0
+        # 阶段 -> [查询次数, 命中（已预热）次数]
+        self.lookups: Dict[str, list] = {}
+
+    def schedule(self, session_id: str, destination: str, job: Callable[[str], Awaitable[None]]) -> bool:
+        """
+        为会话安排一次预取；同一目的地已在预取时不重复安排
+
+        需在事件循环中调用（接口处理函数内）。
+
+        Args:
+            session_id: 会话ID
+            destination: 目的地
+            job: 预取协程函数，参数为目的地
+
+        Returns:
+            是否安排了新任务
+        """
+        if not self.enabled or not destination:
+            return False
+        current = self._tasks.get(session_id)
+        if current is not None:
+            if current[0] == destination and not current[1].done():
+                return False
+            self.cancel(session_id)
+        if len(self._tasks) >= self.max_pending:
+            self.dropped += 1
+            return False
+        if self._sem is None:
+            # 首次使用时创建，绑定到服务运行的事件循环
+            self._sem = asyncio.Semaphore(self.workers)
+
+        task = asyncio.create_task(self._run(destination, job))
+        self._tasks[session_id] = (destination, task)
+        task.add_done_callback(lambda done: self._on_done(session_id, done))
+        self.scheduled += 1
+        return True
+
+    async def _run(self, destination: str, job: Callable[[str], Awaitable[None]]):
+        async with self._sem:
+            await job(destination)
+
+    def _on_done(self, session_id: str, task: asyncio.Task):
+        current = self._tasks.get(session_id)
+        if current is not None and current[1] is task:
+            del self._tasks[session_id]
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is None:
+            self.completed += 1
+        else:
+            self.failed += 1
+            logger.warning(f"prefetch failed for session {session_id}: {error}")
+
+    def cancel(self, session_id: str) -> bool:
+        """取消会话的预取任务（目的地变化、已确认或会话删除时调用）"""
+        current = self._tasks.pop(session_id, None)
+        if current is None or current[1].done():
+            return False
+        current[1].cancel()
+        self.cancelled += 1
+        return True
+
+    def record(self, stage: str, warm: bool):
+        """
+        记录一次用户实际查询时缓存是否已预热
+
+        Args:
+            stage: 阶段（如 normalize / confirm）
+            warm: 所需数据是否已全部在缓存中
+        """
+        counts = self.lookups.setdefault(stage, [0, 0])
+        counts[0] += 1
+        counts[1] += int(warm)
+
+    async def close(self):
+        """取消所有预取任务（应用关闭时调用）"""
+        tasks = [task for _, task in self._tasks.values()]
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict:
+        """预取任务计数与各阶段的预热命中率"""
+        return {
+            "enabled": self.enabled,
+            "workers": self.workers,
+            "in_flight": len(self._tasks),
+            "scheduled": self.scheduled,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "dropped": self.dropped,
+            "llm_skipped": self.llm_skipped,
+            "warm_hits": {
+                stage: {"lookups": total, "warm": warm, "hit_rate": round(warm / total, 3) if total else 0.0}
+                for stage, (total, warm) in self.lookups.items()
+            }
+        }
+
+
+def _create_prefetcher_from_env() -> Prefetcher:
+    """
+    根据环境变量创建预取器
+
+    环境变量：
+        PREFETCH_ENABLED: 是否启用（默认 1）
+        PREFETCH_WORKERS: 同时执行的预取任务数（默认 4）
+        PREFETCH_MAX_PENDING: 未完成任务数上限（默认 64）
+    """
+    return Prefetcher(
+        workers=int(os.getenv("PREFETCH_WORKERS", "4")),
+        max_pending=int(os.getenv("PREFETCH_MAX_PENDING", "64")),
+        enabled=os.getenv("PREFETCH_ENABLED", "1").lower() not in ("0", "false", "no")
+    )
+
+
+# 全局预取器
+prefetcher = _create_prefetcher_from_env()
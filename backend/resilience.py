@@ -0,0 +1,386 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+
+from .admission import Overloaded
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class UpstreamUnavailable(Overloaded):
+    """上游限流/故障且重试已用尽，或熔断器处于打开状态：返回 503 并附带 Retry-After"""
+
+    def __init__(self, retry_after: int, detail: str = "模型服务暂时不可用，请稍后重试"):
+        super().__init__(503, retry_after, detail)
+
+
+class TokenBucket:
+    """令牌桶限速：按配额（每分钟请求数）匀速发放令牌，允许 burst 个突发"""
+
+    def __init__(self, rate_per_minute: float, burst: int, max_wait: float = 10.0):
+        """
+        初始化令牌桶
+
+        Args:
+            rate_per_minute: 每分钟请求配额（<= 0 表示不限速）
+            burst: 桶容量（允许的突发请求数）
+            max_wait: 等待令牌的最长秒数，超过时直接拒绝
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.max_wait = max_wait
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        # 统计计数
+        self.throttled = 0
+        self.rejected = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """
+        取一个令牌，不足时等待（事件循环内单线程调用，预留令牌后再等待，保证先到先得）
+
+        Raises:
+            UpstreamUnavailable: 需要等待的时间超过 max_wait
+        """
+        if self.rate <= 0:
+            return
+        self._refill()
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return
+        wait = -self.tokens / self.rate
+        if wait > self.max_wait:
+            self.tokens += 1
+            self.rejected += 1
+            raise UpstreamUnavailable(int(wait) + 1, "已达到模型调用配额上限，请稍后重试")
+        self.throttled += 1
+        acquired = False
+        try:
+            await asyncio.sleep(wait)
+            acquired = True
+        finally:
+            # 等待期间被取消（如客户端断开）：归还预留的令牌，不占用后来者的配额
+            if not acquired:
+                self.tokens += 1
+
+    def available(self) -> float:
+        """当前可用的令牌数（不限速时为无穷大）；可用于让低优先级的调用在配额紧张时主动让路"""
+        if self.rate <= 0:
+            return float("inf")
+        self._refill()
+        return self.tokens
+
+    def stats(self) -> Dict:
+        if self.rate <= 0:
+            return {"enabled": False}
+        self._refill()
+        return {
+            "enabled": True,
+            "rate_per_minute": round(self.rate * 60, 1),
+            "burst": self.capacity,
+            "tokens": round(self.tokens, 2),
+            "throttled": self.throttled,
+            "rejected": self.rejected
+        }
+
+
+class CircuitBreaker:
+    """
+    熔断器：连续失败达到阈值后打开，打开期间直接失败；
+    reset_timeout 秒后进入半开状态，只放行一个试探请求，成功则关闭，失败则重新打开
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        初始化熔断器
+
+        Args:
+            failure_threshold: 连续失败多少次后打开
+            reset_timeout: 打开后多久进入半开状态（秒）
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        # 统计计数
+        self.opened = 0
+        self.short_circuited = 0
+
+    def retry_after(self) -> int:
+        """距离进入半开状态的剩余秒数"""
+        return max(1, int(self.opened_at + self.reset_timeout - time.monotonic()) + 1)
+
+    def allow(self):
+        """
+        检查是否允许发起调用
+
+        Raises:
+            UpstreamUnavailable: 熔断器打开，或半开状态下已有试探请求
+        """
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.short_circuited += 1
+                raise UpstreamUnavailable(self.retry_after())
+            self.state = self.HALF_OPEN
+            self.trial_in_flight = False
+        if self.state == self.HALF_OPEN:
+            if self.trial_in_flight:
+                self.short_circuited += 1
+                raise UpstreamUnavailable(1)
+            self.trial_in_flight = True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opened += 1
+                logger.warning(f"Kimi circuit breaker opened after {self.failures} consecutive failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """调用以非上游故障的原因结束（如参数错误）：释放半开试探名额，不改变状态"""
+        self.trial_in_flight = False
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opened": self.opened,
+            "short_circuited": self.short_circuited,
+            "retry_after": self.retry_after() if self.state == self.OPEN else None
+        }
+
+
+def _retry_after_header(error: Exception) -> Optional[float]:
+    """读取上游响应中的 Retry-After（秒）"""
+    response = getattr(error, "response", None)
+    if not isinstance(response, httpx.Response):
+        return None
+    value = response.headers.get("retry-after")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """429、5xx、连接失败与超时视为上游故障，可以重试；其余（如 400/401）直接失败"""
+    # 能走到这里说明已经发起过模型调用，openai 已被导入；放在函数内避免启动时导入整个 SDK
+    import openai
+
+    return isinstance(error, (
+        openai.RateLimitError,
+        openai.InternalServerError,
+        openai.APIConnectionError,  # 包括 APITimeoutError
+        httpx.TransportError
+    ))
+
+
+class ResilientCaller:
+    """
+    LLM 调用的弹性层：令牌桶限速 + 带抖动的指数退避重试（遵循 Retry-After）+ 熔断
+
+    上游故障且重试用尽、或熔断打开时抛出 UpstreamUnavailable，由接口返回 503 + Retry-After，
+    而不是返回“抱歉…请重试”让客户端立刻重试。
+    """
+
+    def __init__(
+        self,
+        bucket: TokenBucket,
+        breaker: CircuitBreaker,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0
+    ):
+        """
+        初始化
+
+        Args:
+            bucket: 令牌桶
+            breaker: 熔断器
+            max_attempts: 单次调用最多尝试次数（含首次）
+            base_delay: 退避基数（秒）
+            max_delay: 单次退避上限（秒），Retry-After 超过该值时不再重试
+        """
+        self.bucket = bucket
+        self.breaker = breaker
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # 统计计数
+        self.calls = 0
+        self.retries = 0
+        self.upstream_errors = 0
+        self.gave_up = 0
+
+    def _delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """第 attempt 次失败后的等待秒数；Retry-After 超过上限时返回 None（不再重试）"""
+        retry_after = _retry_after_header(error)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_delay else None
+        # full jitter：在 [0, base * 2^attempt] 内随机，避免大量请求同时重试
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def _before_call(self):
+        self.breaker.allow()
+        try:
+            await self.bucket.acquire()
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.calls += 1
+
+    def _give_up(self, error: Exception) -> UpstreamUnavailable:
+        self.gave_up += 1
+        retry_after = _retry_after_header(error)
+        if self.breaker.state == CircuitBreaker.OPEN:
+            hint = self.breaker.retry_after()
+        else:
+            hint = int(retry_after) + 1 if retry_after is not None else max(1, int(self.base_delay * 4))
+        return UpstreamUnavailable(hint)
+
+    async def _on_error(self, error: Exception, attempt: int) -> bool:
+        """
+        处理一次失败；返回 True 表示已等待完毕、可以重试
+
+        Raises:
+            原异常（不可重试的错误）或 UpstreamUnavailable（重试用尽）
+        """
+        if not is_retryable(error):
+            self.breaker.release()
+            raise error
+        self.upstream_errors += 1
+        self.breaker.record_failure()
+        delay = self._delay(error, attempt)
+        if attempt + 1 >= self.max_attempts or delay is None or self.breaker.state == CircuitBreaker.OPEN:
+            raise self._give_up(error) from error
+        self.retries += 1
+        logger.warning(f"Kimi upstream error, retrying in {delay:.2f}s: {error}")
+        await asyncio.sleep(delay)
+        return True
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        执行一次 LLM 调用（必要时限速、重试）
+
+        Args:
+            fn: 发起调用的协程函数（每次重试会重新调用）
+
+        Returns:
+            调用结果
+        """
+        for attempt in range(self.max_attempts):
+            await self._before_call()
+            try:
+                result = await fn()
+            except Exception as e:
+                await self._on_error(e, attempt)
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+        raise UpstreamUnavailable(self.breaker.retry_after())
+
+    async def stream(self, factory: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """
+        流式调用：只在收到第一个分块之前重试，已开始输出后出错直接抛出
+
+        Args:
+            factory: 返回异步迭代器的函数（每次重试会重新调用）
+
+        Yields:
+            上游返回的分块
+        """
+        for attempt in range(self.max_attempts):
+            await self._before_call()
+            started = False
+            try:
+                async for chunk in factory():
+                    started = True
+                    yield chunk
+            except Exception as e:
+                if started:
+                    if is_retryable(e):
+                        self.upstream_errors += 1
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.release()
+                    raise
+                await self._on_error(e, attempt)
+                continue
+            except BaseException:
+                # 消费方提前关闭或请求被取消
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return
+        raise UpstreamUnavailable(self.breaker.retry_after())
+
+    def stats(self) -> Dict:
+        """限速、重试与熔断状态"""
+        return {
+            "circuit": self.breaker.stats(),
+            "rate_limit": self.bucket.stats(),
+            "calls": self.calls,
+            "retries": self.retries,
+            "upstream_errors": self.upstream_errors,
+            "gave_up": self.gave_up,
+            "max_attempts": self.max_attempts
+        }
+
+
+def create_resilient_caller_from_env() -> ResilientCaller:
+    """
+    根据环境变量创建弹性层
+
+    环境变量：
+        KIMI_RPM: 每分钟请求配额（默认 200，0 表示不限速）
+        KIMI_BURST: 令牌桶容量（默认 20）
+        KIMI_RATE_MAX_WAIT: 等待令牌的最长秒数（默认 10）
+        KIMI_MAX_ATTEMPTS: 单次调用最多尝试次数（默认 3）
+        KIMI_RETRY_BASE: 退避基数秒数（默认 0.5）
+        KIMI_RETRY_MAX_DELAY: 单次退避上限秒数（默认 8）
+        KIMI_BREAKER_THRESHOLD: 连续失败多少次后熔断（默认 5）
+        KIMI_BREAKER_RESET: 熔断持续秒数（默认 30）
+    """
+    return ResilientCaller(
+        bucket=TokenBucket(
+            rate_per_minute=float(os.getenv("KIMI_RPM", "200")),
+            burst=int(os.getenv("KIMI_BURST", "20")),
+            max_wait=float(os.getenv("KIMI_RATE_MAX_WAIT", "10"))
+        ),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv("KIMI_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("KIMI_BREAKER_RESET", "30"))
+        ),
+        max_attempts=int(os.getenv("KIMI_MAX_ATTEMPTS", "3")),
+        base_delay=float(os.getenv("KIMI_RETRY_BASE", "0.5")),
+        max_delay=float(os.getenv("KIMI_RETRY_MAX_DELAY", "8"))
+    )
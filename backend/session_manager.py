@@ -1,13 +1,42 @@
+import asyncio
+import contextvars
+import functools
+import os
 import uuid
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
 from .base import TravelInfo, ChatSession
+from .session_store import SessionStore, InMemorySessionStore, SQLiteSessionStore
 
 
 class SessionManager:
-    """会话管理器，用于管理多个用户的对话会话"""
+    """
+    会话管理器，用于管理多个用户的对话会话
 
-    def __init__(self):
-        self.sessions: Dict[str, ChatSession] = {}
+    同步方法供脚本与后台线程使用；接口中使用 a 前缀的异步方法。
+    存储会阻塞（如 SQLite 的磁盘读写与跨进程写锁等待）时，异步方法在专用线程池中执行存储操作，
+    不占用事件循环；内存存储只涉及加锁的字典操作，直接在当前线程执行。
+    """
+
+    def __init__(self, store: Optional[SessionStore] = None, io_threads: int = 4):
+        """
+        初始化会话管理器
+
+        Args:
+            store: 会话存储后端，默认使用进程内 LRU/TTL 存储
+            io_threads: 阻塞型存储使用的线程数
+        """
+        self.store: SessionStore = store if store is not None else InMemorySessionStore()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if self.store.blocking:
+            self._executor = ThreadPoolExecutor(max_workers=max(1, io_threads), thread_name_prefix="session-store")
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """执行一次存储操作；阻塞型存储放到线程池，并带上当前上下文（分阶段计时等 contextvar）"""
+        if self._executor is None:
+            return fn(*args)
+        call = functools.partial(contextvars.copy_context().run, fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
 
     def create_session(self) -> str:
         """
@@ -17,11 +46,11 @@ class SessionManager:
             会话ID
         """
         session_id = str(uuid.uuid4())
-        self.sessions[session_id] = ChatSession(
+        self.store.put(ChatSession(
             session_id=session_id,
             travel_info=TravelInfo(),
             conversation_history=[]
-        )
+        ))
         return session_id
 
     def get_session(self, session_id: str) -> ChatSession:
@@ -35,11 +64,24 @@ class SessionManager:
             ChatSession对象
 
         Raises:
-            KeyError: 如果会话不存在
+            KeyError: 如果会话不存在（或已过期）
         """
-        if session_id not in self.sessions:
+        session = self.store.get(session_id)
+        if session is None:
             raise KeyError(f"Session {session_id} not found")
-        return self.sessions[session_id]
+        return session
+
+    def get_sessions(self, session_ids: Iterable[str]) -> Dict[str, ChatSession]:
+        """
+        批量获取会话（SQLite 存储为每 500 个ID一次查询）
+
+        Args:
+            session_ids: 会话ID列表
+
+        Returns:
+            session_id -> ChatSession；不存在或已过期的会话不在结果中
+        """
+        return self.store.get_many(session_ids)
 
     def update_session(self, session_id: str, session: ChatSession):
         """
@@ -49,7 +91,30 @@ class SessionManager:
             session_id: 会话ID
             session: 更新后的ChatSession对象
         """
-        self.sessions[session_id] = session
+        if session.session_id != session_id:
+            session = session.model_copy(update={"session_id": session_id})
+        self.store.put(session)
+
+    def mutate_session(self, session_id: str, fn: Callable[[ChatSession], None]) -> ChatSession:
+        """
+        原子地修改会话：读取最新状态、调用 fn 就地修改、写回
+
+        并发的多个轮次（包括其他 worker 进程）对同一会话的修改依次生效，不会互相覆盖。
+
+        Args:
+            session_id: 会话ID
+            fn: 就地修改会话的函数
+
+        Returns:
+            修改后的ChatSession对象
+
+        Raises:
+            KeyError: 如果会话不存在（或已过期）
+        """
+        session = self.store.mutate(session_id, fn)
+        if session is None:
+            raise KeyError(f"Session {session_id} not found")
+        return session
 
     def delete_session(self, session_id: str):
         """
@@ -58,8 +123,7 @@ class SessionManager:
         Args:
             session_id: 会话ID
         """
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        self.store.delete(session_id)
 
     def session_exists(self, session_id: str) -> bool:
         """
@@ -71,8 +135,83 @@ class SessionManager:
         Returns:
             会话是否存在
         """
-        return session_id in self.sessions
+        return self.store.contains(session_id)
+
+    # ---- 异步版本：接口处理函数使用，存储操作不阻塞事件循环 ----
+
+    async def acreate_session(self) -> str:
+        return await self._run(self.create_session)
+
+    async def aget_session(self, session_id: str) -> ChatSession:
+        return await self._run(self.get_session, session_id)
+
+    async def aget_sessions(self, session_ids: Iterable[str]) -> Dict[str, ChatSession]:
+        return await self._run(self.get_sessions, list(session_ids))
+
+    async def aupdate_session(self, session_id: str, session: ChatSession):
+        await self._run(self.update_session, session_id, session)
+
+    async def amutate_session(self, session_id: str, fn: Callable[[ChatSession], None]) -> ChatSession:
+        return await self._run(self.mutate_session, session_id, fn)
+
+    async def adelete_session(self, session_id: str):
+        await self._run(self.delete_session, session_id)
+
+    async def asession_exists(self, session_id: str) -> bool:
+        return await self._run(self.session_exists, session_id)
+
+    async def astats(self) -> Dict:
+        return await self._run(self.stats)
+
+    def start(self):
+        """启动存储后台任务（如过期会话清理）"""
+        self.store.start()
+
+    def close(self):
+        """停止存储后台任务，等待进行中的存储操作完成"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.store.close()
+
+    def stats(self) -> Dict:
+        """会话存储统计"""
+        return self.store.stats()
+
+
+def _create_store_from_env() -> SessionStore:
+    """
+    根据环境变量创建会话存储
+
+    环境变量：
+        SESSION_BACKEND: memory（默认，仅支持单 worker）或 sqlite（多 worker 共享）
+        SESSION_DB_PATH: sqlite 数据库文件路径（默认 backend/data/sessions.sqlite3）
+        SESSION_MAX_COUNT: 最大会话数（默认 10000，0 表示不限制；仅 memory）
+        SESSION_IDLE_TTL: 会话空闲过期秒数（默认 3600，0 表示永不过期）
+        SESSION_SWEEP_INTERVAL: 过期清理间隔秒数（默认 60）
+        SESSION_IO_THREADS: sqlite 存储操作使用的线程数（默认 4）
+    """
+    backend = os.getenv("SESSION_BACKEND", "memory").lower()
+    idle_ttl = float(os.getenv("SESSION_IDLE_TTL", "3600"))
+    sweep_interval = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+    if backend == "sqlite":
+        default_path = os.path.join(os.path.dirname(__file__), "data", "sessions.sqlite3")
+        return SQLiteSessionStore(
+            path=os.getenv("SESSION_DB_PATH", default_path),
+            idle_ttl=idle_ttl,
+            sweep_interval=sweep_interval
+        )
+    if backend != "memory":
+        raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+    return InMemorySessionStore(
+        max_sessions=int(os.getenv("SESSION_MAX_COUNT", "10000")),
+        idle_ttl=idle_ttl,
+        sweep_interval=sweep_interval
+    )
 
 
 # 全局会话管理器实例
-session_manager = SessionManager()
+session_manager = SessionManager(
+    store=_create_store_from_env(),
+    io_threads=int(os.getenv("SESSION_IO_THREADS", "4"))
+)
@@ -0,0 +1,480 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from .base import ChatSession, TravelInfo
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore(ABC):
+    """会话存储接口，SessionManager 通过它读写会话"""
+
+    # 操作是否可能阻塞（磁盘 IO、等待锁）；为真时 SessionManager 的异步方法在线程池中调用
+    blocking: bool = False
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        """读取会话，不存在（或已过期）时返回 None"""
+
+    def get_many(self, session_ids: Iterable[str]) -> Dict[str, ChatSession]:
+        """
+        批量读取会话（只读，不刷新访问时间，批量查看不会延长会话寿命）
+
+        Args:
+            session_ids: 会话ID列表
+
+        Returns:
+            session_id -> 会话；不存在或已过期的会话不在结果中
+        """
+        result = {}
+        for session_id in session_ids:
+            session = self.get(session_id)
+            if session is not None:
+                result[session_id] = session
+        return result
+
+    @abstractmethod
+    def put(self, session: ChatSession):
+        """写入（新建或覆盖）会话"""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """删除会话，返回是否确实删除了"""
+
+    @abstractmethod
+    def contains(self, session_id: str) -> bool:
+        """检查会话是否存在（且未过期）"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """当前保存的会话数量"""
+
+    @abstractmethod
+    def history_bytes_saved(self) -> int:
+        """当前存活（未过期）会话的历史压缩节省字节数之和；会话被删除、淘汰或过期后不再计入"""
+
+    @abstractmethod
+    def mutate(self, session_id: str, fn: Callable[[ChatSession], None]) -> Optional[ChatSession]:
+        """
+        原子地读取-修改-写回一个会话，避免并发轮次互相覆盖
+
+        Args:
+            session_id: 会话ID
+            fn: 就地修改会话的函数（应尽量快，执行期间持有该会话的锁）
+
+        Returns:
+            修改后的会话；会话不存在时返回 None（不调用 fn）
+        """
+
+    # 后台过期清理（子类设置 idle_ttl / sweep_interval 并实现 sweep）
+    idle_ttl: float = 0
+    sweep_interval: float = 60
+    _sweeper: Optional[threading.Thread] = None
+    _stop: Optional[threading.Event] = None
+
+    def sweep(self) -> int:
+        """清理已过期的会话，返回清理数量；默认无操作"""
+        return 0
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Session sweep failed")
+
+    def start(self):
+        """启动后台过期清理线程（idle_ttl <= 0 时不启动）"""
+        if self._sweeper is not None or self.idle_ttl <= 0:
+            return
+        self._stop = threading.Event()
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def close(self):
+        """停止后台任务并释放资源"""
+        if self._sweeper is not None:
+            self._stop.set()
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+
+    def stats(self) -> Dict:
+        """存储的运行统计"""
+        return {"backend": type(self).__name__, "sessions": len(self), "history_bytes_saved": self.history_bytes_saved()}
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    进程内会话存储：LRU + 空闲过期（TTL）
+
+    - 超过 max_sessions 时淘汰最久未访问的会话
+    - 空闲超过 idle_ttl 秒的会话视为不存在，并由后台清理线程定期回收
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 10000,
+        idle_ttl: float = 3600,
+        sweep_interval: float = 60
+    ):
+        """
+        初始化内存会话存储
+
+        Args:
+            max_sessions: 最大会话数（<=0 表示不限制）
+            idle_ttl: 空闲过期时间（秒，<=0 表示永不过期）
+            sweep_interval: 后台清理间隔（秒）
+        """
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+
+        # session_id -> (会话, 最近访问时间)，按访问顺序排列（最旧在前）
+        self._sessions: "OrderedDict[str, Tuple[ChatSession, float]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+        # 统计计数
+        self.evicted_lru = 0
+        self.expired_ttl = 0
+        self.sweeps = 0
+
+    def _is_expired(self, last_access: float, now: float) -> bool:
+        return self.idle_ttl > 0 and now - last_access > self.idle_ttl
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            session, last_access = entry
+            if self._is_expired(last_access, now):
+                del self._sessions[session_id]
+                self.expired_ttl += 1
+                return None
+            self._sessions[session_id] = (session, now)
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def get_many(self, session_ids: Iterable[str]) -> Dict[str, ChatSession]:
+        now = time.monotonic()
+        result = {}
+        # 整批只加一次锁；过期会话留给后台清理，这里只是跳过
+        with self._lock:
+            for session_id in session_ids:
+                entry = self._sessions.get(session_id)
+                if entry is not None and not self._is_expired(entry[1], now):
+                    result[session_id] = entry[0]
+        return result
+
+    def put(self, session: ChatSession):
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[session.session_id] = (session, now)
+            self._sessions.move_to_end(session.session_id)
+            if self.max_sessions > 0:
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evicted_lru += 1
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def mutate(self, session_id: str, fn: Callable[[ChatSession], None]) -> Optional[ChatSession]:
+        with self._lock:
+            session = self.get(session_id)
+            if session is None:
+                return None
+            fn(session)
+            self.put(session)
+            return session
+
+    def contains(self, session_id: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return False
+            if self._is_expired(entry[1], now):
+                del self._sessions[session_id]
+                self.expired_ttl += 1
+                return False
+            return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def history_bytes_saved(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            return sum(session.history_bytes_saved for session, last_access in self._sessions.values()
+                       if not self._is_expired(last_access, now))
+
+    def sweep(self) -> int:
+        """
+        清理所有已过期的会话
+
+        Returns:
+            本次清理的会话数
+        """
+        if self.idle_ttl <= 0:
+            return 0
+        now = time.monotonic()
+        removed = 0
+        with self._lock:
+            # 按访问顺序排列，遇到第一个未过期的会话即可停止
+            while self._sessions:
+                session_id, (_, last_access) = next(iter(self._sessions.items()))
+                if not self._is_expired(last_access, now):
+                    break
+                del self._sessions[session_id]
+                removed += 1
+            self.expired_ttl += removed
+            self.sweeps += 1
+        return removed
+
+    def stats(self) -> Dict:
+        return {
+            "backend": type(self).__name__,
+            "sessions": len(self),
+            "history_bytes_saved": self.history_bytes_saved(),
+            "max_sessions": self.max_sessions,
+            "idle_ttl": self.idle_ttl,
+            "evicted_lru": self.evicted_lru,
+            "expired_ttl": self.expired_ttl,
+            "sweeps": self.sweeps
+        }
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    基于 SQLite（WAL 模式）的持久化会话存储，多个 uvicorn worker 进程可共享同一个本地文件
+
+    - travel_info 以紧凑 JSON 保存（省略空字段）
+    - conversation_history 以 JSON 保存，超过阈值时 zlib 压缩
+    - mutate 在 BEGIN IMMEDIATE 事务中完成读-改-写，并递增 version，
+      同一会话的并发轮次（无论来自哪个进程）依次生效，不会丢失更新
+    - 空闲过期以最近一次写入时间计算
+    """
+
+    # conversation_history 超过该字节数时压缩存储
+    COMPRESS_THRESHOLD = 512
+    # 读写磁盘、BEGIN IMMEDIATE 可能等待其他进程的写锁（最长 busy_timeout_ms）
+    blocking = True
+
+    def __init__(
+        self,
+        path: str,
+        idle_ttl: float = 3600,
+        sweep_interval: float = 60,
+        busy_timeout_ms: int = 5000
+    ):
+        """
+        初始化 SQLite 会话存储
+
+        Args:
+            path: 数据库文件路径（目录不存在时自动创建）
+            idle_ttl: 空闲过期时间（秒，<=0 表示永不过期）
+            sweep_interval: 后台清理间隔（秒）
+            busy_timeout_ms: 等待其他进程释放写锁的最长时间（毫秒）
+        """
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self.busy_timeout_ms = busy_timeout_ms
+
+        # sqlite3 连接不能跨线程共享，每个线程各自持有一个
+        self._local = threading.local()
+        self.conflicts = 0
+        self.expired_ttl = 0
+        self.sweeps = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " travel_info TEXT NOT NULL,"
+            " history BLOB NOT NULL,"
+            " extra TEXT,"
+            " version INTEGER NOT NULL DEFAULT 0,"
+            " updated_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None：自行管理事务（BEGIN IMMEDIATE）
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+        return conn
+
+    # ---- 序列化 ----
+
+    @classmethod
+    def _encode(cls, session: ChatSession) -> Tuple[str, bytes, Optional[str]]:
+        travel_info = session.travel_info.model_dump_json(exclude_none=True, exclude_defaults=True)
+        history = json.dumps(session.conversation_history, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if len(history) > cls.COMPRESS_THRESHOLD:
+            history = b"z" + zlib.compress(history)
+        else:
+            history = b"j" + history
+        # 其余字段（新增字段也能保存，无需改表结构）
+        extra = session.model_dump(exclude={"session_id", "travel_info", "conversation_history"}, exclude_defaults=True)
+        return travel_info, history, (json.dumps(extra, ensure_ascii=False, separators=(",", ":")) if extra else None)
+
+    @staticmethod
+    def _decode(session_id: str, travel_info: str, history: bytes, extra: Optional[str]) -> ChatSession:
+        history = bytes(history)
+        raw = zlib.decompress(history[1:]) if history[:1] == b"z" else history[1:]
+        return ChatSession(
+            session_id=session_id,
+            travel_info=TravelInfo.model_validate_json(travel_info),
+            conversation_history=json.loads(raw),
+            **(json.loads(extra) if extra else {})
+        )
+
+    def _expiry_cutoff(self) -> float:
+        return time.time() - self.idle_ttl if self.idle_ttl > 0 else float("-inf")
+
+    # ---- SessionStore 接口 ----
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        row = self._conn().execute(
+            "SELECT travel_info, history, extra FROM sessions WHERE session_id = ? AND updated_at >= ?",
+            (session_id, self._expiry_cutoff())
+        ).fetchone()
+        if row is None:
+            return None
+        return self._decode(session_id, *row)
+
+    # 单条 SQL 中 IN (...) 的参数个数上限（旧版 SQLite 默认最多 999 个参数）
+    GET_MANY_CHUNK = 500
+
+    def get_many(self, session_ids: Iterable[str]) -> Dict[str, ChatSession]:
+        ids = list(dict.fromkeys(session_ids))
+        conn = self._conn()
+        cutoff = self._expiry_cutoff()
+        result = {}
+        for start in range(0, len(ids), self.GET_MANY_CHUNK):
+            chunk = ids[start:start + self.GET_MANY_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                "SELECT session_id, travel_info, history, extra FROM sessions"
+                f" WHERE session_id IN ({placeholders}) AND updated_at >= ?",
+                (*chunk, cutoff)
+            ).fetchall()
+            for session_id, *row in rows:
+                result[session_id] = self._decode(session_id, *row)
+        return result
+
+    def put(self, session: ChatSession):
+        travel_info, history, extra = self._encode(session)
+        self._conn().execute(
+            "INSERT INTO sessions (session_id, travel_info, history, extra, version, updated_at)"
+            " VALUES (?, ?, ?, ?, 0, ?)"
+            " ON CONFLICT(session_id) DO UPDATE SET"
+            " travel_info = excluded.travel_info, history = excluded.history, extra = excluded.extra,"
+            " version = sessions.version + 1, updated_at = excluded.updated_at",
+            (session.session_id, travel_info, history, extra, time.time())
+        )
+
+    def delete(self, session_id: str) -> bool:
+        cur = self._conn().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        return cur.rowcount > 0
+
+    def contains(self, session_id: str) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM sessions WHERE session_id = ? AND updated_at >= ?",
+            (session_id, self._expiry_cutoff())
+        ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        # 已过期但尚未被清理的会话不计入
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM sessions WHERE updated_at >= ?", (self._expiry_cutoff(),)
+        ).fetchone()[0]
+
+    def history_bytes_saved(self) -> int:
+        # 该字段保存在 extra（JSON）中，为 0 时省略
+        return self._conn().execute(
+            "SELECT COALESCE(SUM(json_extract(extra, '$.history_bytes_saved')), 0) FROM sessions"
+            " WHERE updated_at >= ? AND extra IS NOT NULL",
+            (self._expiry_cutoff(),)
+        ).fetchone()[0]
+
+    def mutate(self, session_id: str, fn: Callable[[ChatSession], None]) -> Optional[ChatSession]:
+        conn = self._conn()
+        # BEGIN IMMEDIATE 立即获取写锁：其他进程对同一会话的读-改-写会排队等待，而不是各自覆盖
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT travel_info, history, extra, version FROM sessions"
+                " WHERE session_id = ? AND updated_at >= ?",
+                (session_id, self._expiry_cutoff())
+            ).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                return None
+            session = self._decode(session_id, *row[:3])
+            fn(session)
+            travel_info, history, extra = self._encode(session)
+            cur = conn.execute(
+                "UPDATE sessions SET travel_info = ?, history = ?, extra = ?, version = version + 1, updated_at = ?"
+                " WHERE session_id = ? AND version = ?",
+                (travel_info, history, extra, time.time(), session_id, row[3])
+            )
+            if cur.rowcount != 1:
+                # 写锁下不应发生；作为防御仍按冲突处理
+                self.conflicts += 1
+                raise RuntimeError(f"Concurrent update conflict on session {session_id}")
+            conn.execute("COMMIT")
+            return session
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def sweep(self) -> int:
+        if self.idle_ttl <= 0:
+            return 0
+        cur = self._conn().execute("DELETE FROM sessions WHERE updated_at < ?", (self._expiry_cutoff(),))
+        self.expired_ttl += cur.rowcount
+        self.sweeps += 1
+        return cur.rowcount
+
+    def close(self):
+        super().close()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def stats(self) -> Dict:
+        return {
+            "backend": type(self).__name__,
+            "path": self.path,
+            "sessions": len(self),
+            "history_bytes_saved": self.history_bytes_saved(),
+            "idle_ttl": self.idle_ttl,
+            "expired_ttl": self.expired_ttl,
+            "conflicts": self.conflicts,
+            "sweeps": self.sweeps
+        }
@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize_content(content: Any) -> str:
+    text = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False, sort_keys=True)
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def prompt_key(scope: str, messages: Sequence[Any]) -> str:
+    """
+    由规范化后的提示内容生成合并键
+
+    内容做 NFKC 与空白折叠，只差全角/空格的相同请求会得到同一个键。
+
+    Args:
+        scope: 调用方标识（如模型名 + 用途），不同用途的相同提示不会合并
+        messages: LangChain 消息列表
+
+    Returns:
+        sha256 十六进制摘要
+    """
+    digest = hashlib.sha256(scope.encode("utf-8"))
+    for message in messages:
+        digest.update(b"\x00")
+        digest.update(str(getattr(message, "type", "")).encode("utf-8"))
+        digest.update(b"\x01")
+        digest.update(_normalize_content(getattr(message, "content", message)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    """
+    异步 single-flight：相同键的请求在途时只发起一次上游调用，其余请求等待并共享结果
+
+    上游调用在独立任务中执行，发起者断开（被取消）不会影响其它等待者。
+    """
+
+    def __init__(self, enabled: bool = True):
+        """
+        初始化
+
+        Args:
+            enabled: 为 False 时直接调用，不做合并
+        """
+        self.enabled = enabled
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # 统计计数
+        self.calls = 0
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        执行或加入一次调用
+
+        Args:
+            key: 合并键（见 prompt_key）
+            fn: 发起上游调用的协程函数
+
+        Returns:
+            (结果, 是否为合并得到的结果)；上游异常会传递给所有等待者
+        """
+        self.calls += 1
+        if not self.enabled:
+            self.upstream_calls += 1
+            return await fn(), False
+
+        task = self._inflight.get(key)
+        coalesced = task is not None
+        if coalesced:
+            self.coalesced += 1
+        else:
+            self.upstream_calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, k=key: self._finish(k, done))
+        return await asyncio.shield(task), coalesced
+
+    def _finish(self, key: str, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> Dict:
+        """合并统计（coalesce_rate 为被合并、未产生上游调用的请求占比）"""
+        return {
+            "enabled": self.enabled,
+            "calls": self.calls,
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "coalesce_rate": round(self.coalesced / self.calls, 4) if self.calls else 0.0,
+            "errors": self.errors,
+            "in_flight": len(self._inflight)
+        }
+
+
+# 全局 LLM 调用合并层（SINGLE_FLIGHT_ENABLED=0 关闭）
+llm_flight = SingleFlight(enabled=os.getenv("SINGLE_FLIGHT_ENABLED", "1") not in ("0", "false", "False"))
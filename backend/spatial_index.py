@@ -0,0 +1,261 @@
+import heapq
+import math
+from array import array
+from typing import Any, Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+from .base import POI
+from .geo import EARTH_RADIUS_M, geohash_cell_size, haversine_m
+
+T = TypeVar("T")
+
+_METERS_PER_DEG = math.pi * EARTH_RADIUS_M / 180
+
+
+class GeoGridIndex(Generic[T]):
+    """
+    进程内空间索引：按 geohash 同精度的经纬度网格分桶
+
+    - 坐标存放在 array('d') 中，条目与标签按插入顺序保存，内存占用小
+    - 支持批量加载与增量插入
+    - 查询：半径、k 近邻、矩形范围，均可按标签（如 POI 类型）过滤
+    """
+
+    def __init__(self, precision: int = 6):
+        """
+        初始化索引
+
+        Args:
+            precision: 网格精度，单元大小与同精度 geohash 一致（6 约 1.2km x 0.6km）
+        """
+        self.precision = precision
+        self.cell_lat, self.cell_lng = geohash_cell_size(precision)
+        self.lngs = array("d")
+        self.lats = array("d")
+        self.tags: List[Optional[str]] = []
+        self.items: List[T] = []
+        self.buckets: Dict[Tuple[int, int], List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _cell(self, lng: float, lat: float) -> Tuple[int, int]:
+        return int(math.floor((lat + 90.0) / self.cell_lat)), int(math.floor((lng + 180.0) / self.cell_lng))
+
+    def insert(self, lng: float, lat: float, item: T, tag: Optional[str] = None) -> int:
+        """
+        增量插入一个条目
+
+        Args:
+            lng: 经度
+            lat: 纬度
+            item: 条目（如 POI）
+            tag: 过滤用标签（如 POI 类型）
+
+        Returns:
+            条目编号
+        """
+        idx = len(self.items)
+        self.lngs.append(lng)
+        self.lats.append(lat)
+        self.items.append(item)
+        self.tags.append(tag)
+        self.buckets.setdefault(self._cell(lng, lat), []).append(idx)
+        return idx
+
+    def bulk_load(self, entries: Iterable[Tuple[float, float, T, Optional[str]]]):
+        """
+        批量加载 (lng, lat, item, tag)，比逐条 insert 更快
+
+        Args:
+            entries: 可迭代的 (经度, 纬度, 条目, 标签)
+        """
+        lngs, lats, items, tags = self.lngs, self.lats, self.items, self.tags
+        buckets = self.buckets
+        cell_lat, cell_lng = self.cell_lat, self.cell_lng
+        floor = math.floor
+        idx = len(items)
+        for lng, lat, item, tag in entries:
+            lngs.append(lng)
+            lats.append(lat)
+            items.append(item)
+            tags.append(tag)
+            key = (int(floor((lat + 90.0) / cell_lat)), int(floor((lng + 180.0) / cell_lng)))
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [idx]
+            else:
+                bucket.append(idx)
+            idx += 1
+
+    def _scan(self, rows: range, cols: range, tag: Optional[str]) -> Iterable[int]:
+        buckets = self.buckets
+        tags = self.tags
+        for row in rows:
+            for col in cols:
+                bucket = buckets.get((row, col))
+                if not bucket:
+                    continue
+                if tag is None:
+                    yield from bucket
+                else:
+                    for idx in bucket:
+                        if tags[idx] == tag:
+                            yield idx
+
+    def _degree_span(self, lat: float, radius_m: float) -> Tuple[float, float]:
+        dlat = radius_m / _METERS_PER_DEG
+        cos_lat = max(math.cos(math.radians(min(89.9, abs(lat) + dlat))), 1e-6)
+        return dlat, dlat / cos_lat
+
+    def within_radius(self, lng: float, lat: float, radius_m: float, tag: Optional[str] = None,
+                      limit: Optional[int] = None) -> List[Tuple[T, float]]:
+        """
+        半径查询
+
+        Args:
+            lng: 中心经度
+            lat: 中心纬度
+            radius_m: 半径（米）
+            tag: 只返回该标签的条目
+            limit: 最多返回条数
+
+        Returns:
+            [(条目, 距离米)]，按距离升序
+        """
+        dlat, dlng = self._degree_span(lat, radius_m)
+        row0, col0 = self._cell(lng - dlng, lat - dlat)
+        row1, col1 = self._cell(lng + dlng, lat + dlat)
+        lngs, lats = self.lngs, self.lats
+        min_lat, max_lat, min_lng, max_lng = lat - dlat, lat + dlat, lng - dlng, lng + dlng
+        found: List[Tuple[float, int]] = []
+        for idx in self._scan(range(row0, row1 + 1), range(col0, col1 + 1), tag):
+            p_lat, p_lng = lats[idx], lngs[idx]
+            # 先用经纬度外接矩形粗筛，再计算球面距离
+            if p_lat < min_lat or p_lat > max_lat or p_lng < min_lng or p_lng > max_lng:
+                continue
+            distance = haversine_m(lng, lat, p_lng, p_lat)
+            if distance <= radius_m:
+                found.append((distance, idx))
+        if limit is not None and limit < len(found):
+            found = heapq.nsmallest(limit, found)
+        else:
+            found.sort()
+        return [(self.items[idx], distance) for distance, idx in found]
+
+    def nearest(self, lng: float, lat: float, k: int, tag: Optional[str] = None,
+                max_radius_m: Optional[float] = None) -> List[Tuple[T, float]]:
+        """
+        k 近邻查询：从中心单元向外逐圈扩展，已找到的第 k 近距离不超过下一圈的最小可能距离时停止
+
+        Args:
+            lng: 中心经度
+            lat: 中心纬度
+            k: 返回条数
+            tag: 只返回该标签的条目
+            max_radius_m: 最大搜索半径（米），为空时不限制
+
+        Returns:
+            [(条目, 距离米)]，按距离升序
+        """
+        if k <= 0 or not self.items:
+            return []
+        row_c, col_c = self._cell(lng, lat)
+        cos_lat = max(math.cos(math.radians(min(89.9, abs(lat)))), 1e-6)
+        # 第 ring 圈之外的点，距离至少为 ring 个单元的短边
+        step_m = min(self.cell_lat * _METERS_PER_DEG, self.cell_lng * _METERS_PER_DEG * cos_lat)
+        rows_total = int(180.0 / self.cell_lat) + 1
+        cols_total = int(360.0 / self.cell_lng) + 1
+        lngs, lats = self.lngs, self.lats
+        heap: List[Tuple[float, int]] = []  # 最大堆（存负距离）
+
+        ring = 0
+        max_ring = max(rows_total, cols_total)
+        if max_radius_m is not None:
+            max_ring = min(max_ring, int(max_radius_m / step_m) + 2)
+        while ring <= max_ring:
+            if len(heap) >= k and -heap[0][0] <= (ring - 1) * step_m:
+                break
+            if ring == 0:
+                cells = [(row_c, col_c)]
+            else:
+                top, bottom = row_c - ring, row_c + ring
+                cells = [(top, c) for c in range(col_c - ring, col_c + ring + 1)]
+                cells += [(bottom, c) for c in range(col_c - ring, col_c + ring + 1)]
+                cells += [(r, col_c - ring) for r in range(top + 1, bottom)]
+                cells += [(r, col_c + ring) for r in range(top + 1, bottom)]
+            for row, col in cells:
+                bucket = self.buckets.get((row, col))
+                if not bucket:
+                    continue
+                for idx in bucket:
+                    if tag is not None and self.tags[idx] != tag:
+                        continue
+                    distance = haversine_m(lng, lat, lngs[idx], lats[idx])
+                    if max_radius_m is not None and distance > max_radius_m:
+                        continue
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-distance, idx))
+                    elif distance < -heap[0][0]:
+                        heapq.heapreplace(heap, (-distance, idx))
+            ring += 1
+
+        return [(self.items[idx], -neg) for neg, idx in sorted(heap, reverse=True)]
+
+    def within_bbox(self, min_lng: float, min_lat: float, max_lng: float, max_lat: float,
+                    tag: Optional[str] = None) -> List[T]:
+        """
+        矩形范围查询
+
+        Args:
+            min_lng: 西边界经度
+            min_lat: 南边界纬度
+            max_lng: 东边界经度
+            max_lat: 北边界纬度
+            tag: 只返回该标签的条目
+
+        Returns:
+            范围内的条目（按插入顺序）
+        """
+        row0, col0 = self._cell(min_lng, min_lat)
+        row1, col1 = self._cell(max_lng, max_lat)
+        lngs, lats = self.lngs, self.lats
+        found = [
+            idx for idx in self._scan(range(row0, row1 + 1), range(col0, col1 + 1), tag)
+            if min_lat <= lats[idx] <= max_lat and min_lng <= lngs[idx] <= max_lng
+        ]
+        found.sort()
+        return [self.items[idx] for idx in found]
+
+    def stats(self) -> Dict[str, Any]:
+        """索引规模与分桶情况"""
+        sizes = [len(bucket) for bucket in self.buckets.values()]
+        return {
+            "items": len(self.items),
+            "cells": len(self.buckets),
+            "max_bucket": max(sizes) if sizes else 0,
+            "precision": self.precision
+        }
+
+
+class POIIndex(GeoGridIndex[POI]):
+    """POI 空间索引：location 为 [经度, 纬度]，默认以 POI.type 作为过滤标签"""
+
+    def insert_poi(self, poi: POI, tag: Optional[str] = None) -> int:
+        """增量插入一个 POI"""
+        return self.insert(poi.location[0], poi.location[1], poi, tag if tag is not None else poi.type)
+
+    def load_pois(self, pois: Iterable[POI], tag: Optional[str] = None):
+        """批量加载 POI"""
+        self.bulk_load((p.location[0], p.location[1], p, tag if tag is not None else p.type) for p in pois)
+
+    def pois_within(self, lng: float, lat: float, radius_m: float, tag: Optional[str] = None,
+                    limit: Optional[int] = None) -> List[POI]:
+        """半径内的 POI，distance 字段为到中心点的距离"""
+        return [poi.model_copy(update={"distance": int(d)})
+                for poi, d in self.within_radius(lng, lat, radius_m, tag, limit)]
+
+    def nearest_pois(self, lng: float, lat: float, k: int, tag: Optional[str] = None,
+                     max_radius_m: Optional[float] = None) -> List[POI]:
+        """最近的 k 个 POI，distance 字段为到中心点的距离"""
+        return [poi.model_copy(update={"distance": int(d)})
+                for poi, d in self.nearest(lng, lat, k, tag, max_radius_m)]
@@ -0,0 +1,139 @@
+import logging
+import os
+import unicodedata
+from typing import Dict, Optional
+
+from .base import TravelInfo
+from .cache import TTLCache
+from .metrics import turn_cache_lookups
+from .normalize_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_message(message: str) -> str:
+    """
+    规范化用户消息，用作缓存键：在 normalize_text（全半角、空白、繁简、大小写）基础上去掉标点与符号
+
+    “你好！”、“你好~”、“ 你 好 ” 得到相同的键。
+    """
+    text = normalize_text(message)
+    return "".join(ch for ch in text if unicodedata.category(ch)[0] not in "PS")
+
+
+class TurnCache:
+    """
+    对话轮次回复缓存：开场白等常见轮次（“你好”“我想去旅游”“帮我规划一下”）直接返回缓存的回复，不调用模型
+
+    - 只缓存槽位全部为空时的轮次：此时提示中只有用户消息本身，回复不可能带有其他用户的取值
+      （目的地、日期、预算等），同一条消息的回复对任何新会话都成立
+    - 键：规范化后的用户消息
+    - 只缓存没有提取到任何新信息的轮次
+    - 只缓存较短的消息；长消息几乎不会重复，缓存只会占用内存
+    - 内存 LRU + TTL
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: float = 3600, max_chars: int = 32, enabled: bool = True):
+        """
+        初始化
+
+        Args:
+            max_size: 最多缓存的轮次数
+            ttl: 条目有效期（秒）
+            max_chars: 参与缓存的消息最大长度（规范化后）
+            enabled: 是否启用
+        """
+        self.enabled = enabled
+        self.max_chars = max_chars
+        self.cache: TTLCache[Dict] = TTLCache(max_size=max_size, ttl=ttl)
+        # 统计计数
+        self.stored = 0
+        self.skipped_extracted = 0
+
+    def key(self, message: str, info: TravelInfo) -> Optional[str]:
+        """缓存键；未启用、已有槽位被填写或消息不适合缓存（过长/规范化后为空）时返回 None"""
+        if not self.enabled or info.slot_state:
+            return None
+        text = normalize_message(message)
+        if not text or len(text) > self.max_chars:
+            return None
+        return text
+
+    def get(self, message: str, info: TravelInfo) -> Optional[Dict]:
+        """
+        查询缓存
+
+        Args:
+            message: 用户消息
+            info: 当前已收集的旅行信息
+
+        Returns:
+            与 process_message 相同结构的结果（不含 usage）；未命中时返回 None
+        """
+        key = self.key(message, info)
+        if key is None:
+            return None
+        cached = self.cache.get(key)
+        turn_cache_lookups.inc("miss" if cached is None else "hit")
+        if cached is None:
+            return None
+        return {**cached, "extracted_info": dict(cached["extracted_info"])}
+
+    def put(self, message: str, info: TravelInfo, result: Dict) -> bool:
+        """
+        在符合条件时缓存模型的回复
+
+        Args:
+            message: 用户消息
+            info: 本轮开始时的旅行信息
+            result: 模型返回并解析后的结果
+
+        Returns:
+            是否写入了缓存
+        """
+        key = self.key(message, info)
+        if key is None:
+            return False
+        if any(value not in (None, "") for value in (result.get("extracted_info") or {}).values()):
+            self.skipped_extracted += 1
+            return False
+        response = result.get("response") or ""
+        if not response:
+            return False
+        self.cache.set(key, {
+            "extracted_info": dict(result.get("extracted_info") or {}),
+            "response": response,
+            "is_complete": bool(result.get("is_complete"))
+        })
+        self.stored += 1
+        return True
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "stored": self.stored,
+            "skipped_extracted": self.skipped_extracted,
+            **self.cache.stats()
+        }
+
+
+def _create_turn_cache_from_env() -> TurnCache:
+    """
+    根据环境变量创建轮次回复缓存
+
+    环境变量：
+        TURN_CACHE_ENABLED: 是否启用（默认 1，设为 0 关闭）
+        TURN_CACHE_SIZE: 最多缓存的轮次数（默认 1000）
+        TURN_CACHE_TTL: 有效期秒数（默认 3600）
+        TURN_CACHE_MAX_CHARS: 参与缓存的消息最大长度（默认 32）
+    """
+    return TurnCache(
+        max_size=int(os.getenv("TURN_CACHE_SIZE", "1000")),
+        ttl=float(os.getenv("TURN_CACHE_TTL", "3600")),
+        max_chars=int(os.getenv("TURN_CACHE_MAX_CHARS", "32")),
+        enabled=os.getenv("TURN_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+    )
+
+
+# 全局轮次回复缓存
+turn_cache = _create_turn_cache_from_env()